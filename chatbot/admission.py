@@ -0,0 +1,259 @@
+import os
+import math
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+
+from telemetry import registry
+
+# Per process. Keep CHAT_MAX_IN_FLIGHT <= LLM_MAX_CONCURRENCY so admitted
+# requests never block on the LLM client's own semaphore.
+CHAT_MAX_IN_FLIGHT = int(os.getenv("CHAT_MAX_IN_FLIGHT", "8"))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "8"))
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "2.0"))
+# async_app.py waits for the LLM on the event loop, not in a thread, so an
+# admitted chat costs a coroutine and a connection; its pool is much larger
+ASYNC_CHAT_MAX_IN_FLIGHT = int(os.getenv("ASYNC_CHAT_MAX_IN_FLIGHT", "256"))
+ASYNC_CHAT_MAX_QUEUE = int(os.getenv("ASYNC_CHAT_MAX_QUEUE", "256"))
+# Requests per minute per client address, with bursts of CHAT_RATE_BURST; 0 disables
+CHAT_RATE_LIMIT = float(os.getenv("CHAT_RATE_LIMIT", "30"))
+CHAT_RATE_BURST = int(os.getenv("CHAT_RATE_BURST", "10"))
+PREDICT_MAX_IN_FLIGHT = int(os.getenv("PREDICT_MAX_IN_FLIGHT", "4"))
+PREDICT_MAX_QUEUE = int(os.getenv("PREDICT_MAX_QUEUE", "8"))
+PREDICT_QUEUE_TIMEOUT = float(os.getenv("PREDICT_QUEUE_TIMEOUT", "1.0"))
+
+ADMISSIONS = registry.counter(
+    "chatbot_admission_total", "Admission decisions by pool and outcome", ("pool", "outcome"),
+)
+ADMISSION_WAIT = registry.histogram(
+    "chatbot_admission_wait_seconds", "Time admitted requests waited for a slot", ("pool",),
+)
+
+
+class Rejected(Exception):
+    """Request turned away before doing the expensive work.
+
+    ``reason`` is "rate_limited" (answer 429) or "queue_full", "deadline" or
+    "timeout" (answer 503); ``retry_after`` is a hint in whole seconds.
+    """
+
+    def __init__(self, pool, reason, retry_after=1):
+        super().__init__(f"{pool}: {reason}")
+        self.pool = pool
+        self.reason = reason
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+    @property
+    def status(self):
+        return 429 if self.reason == "rate_limited" else 503
+
+
+class Slot:
+    """An admitted request's hold on the pool; release is idempotent."""
+
+    def __init__(self, controller):
+        self._controller = controller
+        self._started = time.perf_counter()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(time.perf_counter() - self._started)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class AdmissionController:
+    """Bounded concurrency with a bounded, deadline-limited wait queue.
+
+    At most ``max_in_flight`` requests hold a slot; up to ``max_queue`` more
+    may wait for one, each for at most ``queue_timeout`` seconds. A request
+    is rejected immediately when the queue is full or when the expected wait,
+    estimated from an average of recent slot hold times, already exceeds the
+    deadline, so callers hear "busy" in microseconds instead of timing out.
+    """
+
+    def __init__(self, name, max_in_flight, max_queue, queue_timeout):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self._avg_hold = None
+        self._cond = threading.Condition()
+        self._counts = {"admitted": 0, "queue_full": 0, "deadline": 0, "timeout": 0}
+
+    def _expected_wait(self):
+        if self._avg_hold is None:
+            return 0.0
+        # the queue ahead of us, plus this request, drains max_in_flight at a time
+        return (self.queued + 1) / self.max_in_flight * self._avg_hold
+
+    def _reject(self, reason, retry_after):
+        self._counts[reason] += 1
+        ADMISSIONS.inc(pool=self.name, outcome=reason)
+        raise Rejected(self.name, reason, retry_after)
+
+    def acquire(self):
+        """Return a :class:`Slot`, waiting up to ``queue_timeout``; raises :class:`Rejected`."""
+        start = time.perf_counter()
+        with self._cond:
+            if self.in_flight >= self.max_in_flight or self.queued:
+                if self.queued >= self.max_queue:
+                    self._reject("queue_full", self._expected_wait())
+                expected = self._expected_wait()
+                if expected > self.queue_timeout:
+                    self._reject("deadline", expected)
+                deadline = start + self.queue_timeout
+                self.queued += 1
+                try:
+                    while self.in_flight >= self.max_in_flight:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            # pass on a wake-up this waiter may have consumed
+                            self._cond.notify()
+                            self._reject("timeout", self._expected_wait())
+                        self._cond.wait(remaining)
+                finally:
+                    self.queued -= 1
+            self.in_flight += 1
+            self._counts["admitted"] += 1
+        ADMISSIONS.inc(pool=self.name, outcome="admitted")
+        ADMISSION_WAIT.observe(time.perf_counter() - start, pool=self.name)
+        return Slot(self)
+
+    def _record_hold(self, held):
+        self._avg_hold = held if self._avg_hold is None else 0.8 * self._avg_hold + 0.2 * held
+
+    def _release(self, held):
+        with self._cond:
+            self.in_flight -= 1
+            self._record_hold(held)
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "queue_timeout_seconds": self.queue_timeout,
+                "avg_hold_seconds": round(self._avg_hold, 4) if self._avg_hold is not None else None,
+                **self._counts,
+            }
+
+
+class AsyncAdmissionController(AdmissionController):
+    """:class:`AdmissionController` for one asyncio event loop.
+
+    Same limits, rejections and stats, but queued requests wait on futures
+    instead of a thread: a cancelled waiter (client gone) just leaves the
+    queue, and a slot handed to a waiter that was cancelled before it could
+    run is passed straight on. Use from the loop's thread only.
+    """
+
+    def __init__(self, name, max_in_flight, max_queue, queue_timeout):
+        super().__init__(name, max_in_flight, max_queue, queue_timeout)
+        self._waiters = deque()
+
+    async def acquire(self):
+        """Return a :class:`Slot`, waiting up to ``queue_timeout``; raises :class:`Rejected`."""
+        start = time.perf_counter()
+        if self.in_flight >= self.max_in_flight or self._waiters:
+            if self.queued >= self.max_queue:
+                self._reject("queue_full", self._expected_wait())
+            expected = self._expected_wait()
+            if expected > self.queue_timeout:
+                self._reject("deadline", expected)
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self.queued += 1
+            try:
+                # asyncio.wait neither cancels the future on timeout nor
+                # swallows our own cancellation
+                await asyncio.wait([waiter], timeout=self.queue_timeout)
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # a slot was handed over after all; give it back
+                    self._release(0.0, record=False)
+                raise
+            finally:
+                self.queued -= 1
+                if not waiter.done():
+                    waiter.cancel()
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            if waiter.cancelled():
+                self._reject("timeout", self._expected_wait())
+            # the releasing request counted the slot for us
+        else:
+            self.in_flight += 1
+        self._counts["admitted"] += 1
+        ADMISSIONS.inc(pool=self.name, outcome="admitted")
+        ADMISSION_WAIT.observe(time.perf_counter() - start, pool=self.name)
+        return Slot(self)
+
+    def _release(self, held, record=True):
+        if record:
+            self._record_hold(held)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class RateLimiter:
+    """Per-client token bucket: ``per_minute`` sustained, ``burst`` at once.
+
+    Buckets live in an LRU of ``max_clients`` entries; an evicted client
+    simply starts again with a full bucket.
+    """
+
+    def __init__(self, name, per_minute, burst, max_clients=10000):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def check(self, client):
+        """Take one token for ``client``; raises :class:`Rejected` if there is none."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            self._buckets[client] = (tokens - 1 if allowed else tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            if not allowed:
+                self.limited += 1
+        if not allowed:
+            ADMISSIONS.inc(pool=self.name, outcome="rate_limited")
+            raise Rejected(self.name, "rate_limited", (1 - tokens) / self.rate)
+
+    def stats(self):
+        return {
+            "per_minute": round(self.rate * 60, 2),
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "rate_limited": self.limited,
+        }
@@ -1,25 +1,62 @@
 import os
+import hmac
 import json
-import pickle
+import time
 import logging
+import threading
 from datetime import datetime
 from pathlib import Path
 
-import pandas as pd
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+_IMPORT_STARTED = time.perf_counter()
+
 # Import core chatbot functions
 from chatbot_core import (
     load_vector_store,
+    embed_query,
     retrieve_documents,
     call_mistral_api,
-    load_documents,
-    split_documents,
-    build_vector_store,
+    stream_mistral_api,
+    count_prompt_tokens,
+    context_assembler,
+    llm_client,
+    RETRIEVAL_TOP_K,
+)
+from indexer import manifest_path, update_index
+from feedback_store import FeedbackStore
+from intents import IntentRouter
+from interaction_log import InteractionLog, default_range, parse_range_bound
+from model_registry import ModelRegistry
+from features import FEATURE_COLUMNS, build_features, feature_key, predict_rows
+from cache import TTLCache
+from semantic_cache import SemanticCache
+from sessions import SESSION_ID_RE, SessionStore, client_key
+from embeddings import get_embedding_service
+from admission import (
+    CHAT_MAX_IN_FLIGHT, CHAT_MAX_QUEUE, CHAT_QUEUE_TIMEOUT, CHAT_RATE_BURST, CHAT_RATE_LIMIT,
+    PREDICT_MAX_IN_FLIGHT, PREDICT_MAX_QUEUE, PREDICT_QUEUE_TIMEOUT,
+    AdmissionController, RateLimiter, Rejected,
+)
+from telemetry import (
+    CHAT_RESPONSES,
+    PROFILER_ENABLED,
+    PROFILE_MAX_SECONDS,
+    activate,
+    configure_logging,
+    current_trace,
+    finish_request,
+    observe_stage,
+    profiler,
+    registry,
+    span,
+    start_trace,
 )
 
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
 # -------------------------------------------------------------------
 # Environment & Config
 # -------------------------------------------------------------------
@@ -32,95 +69,597 @@ CORS(app, origins=[
     "http://localhost:3000"
 ])
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Paths & Globals
 VECTOR_DIR = os.getenv("VECTOR_DIR", "govconnect_KB")
-MODEL_PATH = os.getenv("MODEL_PATH", "models/lightgbm_model_task_1.pkl")
+MODEL_PATH = os.getenv("MODEL_PATH", "lightgbm_model_task_1.pkl")
 TASK_FREQ_PATH = "task_freq.json"
 QUEUE_BINS_PATH = "queue_bins.json"
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "5"))
+VECTOR_RELOAD_INTERVAL = float(os.getenv("VECTOR_RELOAD_INTERVAL", "10"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "true").lower() == "true"
+# "background" binds the port immediately and warms up in a thread; "sync"
+# finishes warming up before the module import returns
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background")
+
+NO_RESULTS_MESSAGE = (
+    "I couldn't find relevant information. Please rephrase your question or ask about "
+    "Sri Lankan government services (e.g., NIC-related processes)."
+)
+CHAT_ERROR_MESSAGE = "An error occurred while processing your request. Please try again later."
+BUSY_MESSAGE = "The assistant is busy right now. Please try again in a moment."
 
 db = None
-lgbm_model = None
-task_freq_map = {}
-queue_bins = None
+_startup = {
+    "state": "pending",
+    "pid": None,
+    "t0": _IMPORT_STARTED,
+    "phases": {"imports": round(_IMPORT_SECONDS, 3)},
+    "errors": {},
+    "ready_seconds": None,
+}
+_startup_lock = threading.Lock()
+_vector_state = {"fingerprint": None, "checked": 0.0}
+model_registry = ModelRegistry(
+    MODEL_PATH, TASK_FREQ_PATH, QUEUE_BINS_PATH,
+    check_interval=MODEL_RELOAD_INTERVAL,
+)
+feedback_store = FeedbackStore()
+interaction_log = InteractionLog()
+sessions = SessionStore()
+prediction_cache = TTLCache(maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+model_registry.on_reload(lambda _bundle: prediction_cache.clear())
+semantic_cache = SemanticCache(
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    maxsize=SEMANTIC_CACHE_SIZE,
+    ttl=SEMANTIC_CACHE_TTL,
+)
+intent_router = IntentRouter(enabled=INTENT_FAST_PATH)
+# /chat LLM calls and /predict_time get separate pools; probes and /metrics
+# bypass both, so they answer even while chat is saturated
+chat_admission = AdmissionController("chat", CHAT_MAX_IN_FLIGHT, CHAT_MAX_QUEUE, CHAT_QUEUE_TIMEOUT)
+predict_admission = AdmissionController(
+    "predict", PREDICT_MAX_IN_FLIGHT, PREDICT_MAX_QUEUE, PREDICT_QUEUE_TIMEOUT,
+)
+chat_rate_limiter = RateLimiter("chat", CHAT_RATE_LIMIT, CHAT_RATE_BURST)
 
 
 # -------------------------------------------------------------------
 # Vector Store Initialization
 # -------------------------------------------------------------------
+def _manifest_fingerprint():
+    try:
+        st = os.stat(manifest_path(VECTOR_DIR))
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
 def initialize_vector_store():
-    """Initialize or load the vector store at startup."""
+    """Initialize or load the vector store at startup.
+
+    Runs the incremental indexer, so only documents added or changed since
+    the last build are re-embedded.
+    """
     global db
     try:
-        vector_path = Path(VECTOR_DIR, "index.faiss")
-        if not vector_path.exists():
-            logger.info("Vector DB not found. Creating new one...")
-            documents = load_documents()
-            chunks = split_documents(documents)
-            db = build_vector_store(chunks)
-            logger.info("Vector store created successfully.")
-        else:
-            logger.info("Loading existing vector DB...")
-            db = load_vector_store()
-            logger.info("Vector store loaded successfully.")
+        logger.info("Syncing vector DB with the knowledge base...")
+        # parse in-process: forking a pool from this threaded process can
+        # deadlock on locks held by other threads
+        db, report = update_index(vector_dir=VECTOR_DIR, workers=1)
+        logger.info(
+            f"Vector store ready: {report['vectors']} vectors "
+            f"(+{len(report['added'])} ~{len(report['changed'])} -{len(report['removed'])} files)."
+        )
     except Exception as e:
         logger.error(f"Failed to initialize vector store: {e}")
         db = None
+    _vector_state["fingerprint"] = _manifest_fingerprint()
+
+
+def refresh_vector_store():
+    """Hot-swap the served store if another process updated the index on disk."""
+    global db
+    now = time.monotonic()
+    if now - _vector_state["checked"] < VECTOR_RELOAD_INTERVAL:
+        return
+    _vector_state["checked"] = now
+
+    fingerprint = _manifest_fingerprint()
+    if fingerprint is None or fingerprint == _vector_state["fingerprint"]:
+        return
+    try:
+        fresh = load_vector_store(VECTOR_DIR)
+    except Exception as e:
+        logger.error(f"Failed to reload vector store: {e}")
+        return
+    _vector_state["fingerprint"] = fingerprint
+    db = fresh
+    logger.info("Vector store reloaded from disk.")
+
+
+def vector_store_generation():
+    """Identify the FAISS store currently being served.
+
+    Changes when the store object is replaced in-process or when the
+    manifest publishes a new build on disk, and is used to invalidate
+    answers cached against the previous index.
+    """
+    try:
+        st = os.stat(manifest_path(VECTOR_DIR))
+        on_disk = (st.st_ino, st.st_mtime_ns, st.st_size)
+    except OSError:
+        on_disk = None
+    return (id(db), on_disk)
 
 
 # -------------------------------------------------------------------
-# Routes
+# Chat Pipeline
 # -------------------------------------------------------------------
-@app.route("/health", methods=["GET"])
-def health_check():
-    """Health check endpoint."""
-    return jsonify({
+class ChatPlan:
+    """Outcome of the stages that run before the LLM call.
+
+    Either ``response`` is already set (templated intent, cache hit, nothing
+    retrieved) and can be returned as is, or, once :func:`retrieve_context`
+    ran, ``context`` holds the assembled context to send to Mistral.
+    ``history`` is the session's conversation so far, if the request belongs
+    to one, and ``owner`` the client it belongs to.
+    """
+
+    def __init__(self, query, query_vector=None, docs=None, response=None,
+                 sources_found=0, cached=False, intent=None, context=None,
+                 prompt_tokens=None, session_id=None, history=None, owner=None):
+        self.query = query
+        self.session_id = session_id
+        self.history = history
+        self.owner = owner
+        self.intent = intent
+        self.query_vector = query_vector
+        self.docs = docs
+        self.context = context
+        self.prompt_tokens = prompt_tokens
+        self.response = response
+        self.sources_found = sources_found
+        self.cached = cached
+        self.store = None
+
+    def source(self, answered=False):
+        """Where the response came from, for the chat responses metric."""
+        if self.intent:
+            return "template"
+        if self.cached:
+            return "semantic_cache"
+        return "llm" if answered else "no_results"
+
+    def payload(self):
+        body = {"response": self.response}
+        if self.intent:
+            body["intent"] = self.intent
+        if self.sources_found:
+            body["sources_found"] = self.sources_found
+        if self.cached:
+            body["cached"] = True
+        if self.session_id:
+            body["session_id"] = self.session_id
+        return body
+
+
+class KnowledgeBaseUnavailable(Exception):
+    """The vector store is not loaded; ``body`` and ``status`` are the reply."""
+
+    def __init__(self, body, status):
+        super().__init__(body["response"])
+        self.body = body
+        self.status = status
+
+
+def serving_store():
+    """The vector store to retrieve from; raises :class:`KnowledgeBaseUnavailable`."""
+    refresh_vector_store()
+    store = db
+    if store is None and not warm_up_finished():
+        raise KnowledgeBaseUnavailable({
+            "response": "The assistant is starting up. Please try again in a moment."
+        }, 503)
+    if store is None:
+        logger.error("Vector store not loaded")
+        raise KnowledgeBaseUnavailable({
+            "response": "The knowledge base is not available. Please try again later."
+        }, 500)
+    return store
+
+
+def plan_chat(query, session_id=None, owner=None):
+    """Classify the intent, then embed and consult the semantic cache.
+
+    These are the cheap stages, run before admission control so greetings
+    and cache hits are answered even while the chat pool is saturated. If
+    the returned plan has no ``response``, :func:`retrieve_context` builds
+    the LLM context. Greetings, small talk and off-topic messages are
+    answered from templates without touching the embedding model, FAISS or
+    the LLM, so they work while the knowledge base is unavailable; other
+    messages raise :class:`KnowledgeBaseUnavailable` then. Blocking
+    (embedding), so async callers should run it in an executor.
+
+    Within a session, follow-up questions skip the semantic cache (their
+    answer depends on the conversation); one-word follow-ups ("why?") are
+    retrieved rather than answered as unclear. Only sessions started by
+    ``owner`` (see sessions.client_key) are continued.
+    """
+    with span("session"):
+        history = sessions.get(session_id, owner) if session_id else None
+    follow_up = history is not None and bool(history.turns)
+    with span("intent"):
+        intent, template = intent_router.route(query, follow_up)
+    if template is not None:
+        return ChatPlan(query, response=template, intent=intent, session_id=session_id)
+
+    store = serving_store()
+    with span("embed"):
+        query_vector = embed_query(store, query)
+    if not follow_up:
+        with span("semantic_cache"):
+            semantic_cache.sync(vector_store_generation())
+            hit = semantic_cache.lookup(query_vector)
+        if hit is not None:
+            logger.info(f"Semantic cache hit ({hit.similarity:.3f})")
+            return ChatPlan(query, query_vector, response=hit.answer,
+                            sources_found=hit.sources_found, cached=True,
+                            session_id=session_id, history=history, owner=owner)
+
+    plan = ChatPlan(query, query_vector, session_id=session_id, history=history, owner=owner)
+    plan.store = store
+    return plan
+
+
+def retrieve_context(plan):
+    """Retrieve for a plan without a response and assemble its LLM context.
+
+    Within a session, the query vector is blended with those of the recent
+    turns. Sets ``plan.response`` if nothing relevant was found. Blocking
+    (FAISS), and run inside an admission slot together with the LLM call.
+    """
+    with span("retrieve"):
+        search_vector = sessions.blend(plan.history, plan.query_vector)
+        relevant_docs = retrieve_documents(plan.store, plan.query, top_k=RETRIEVAL_TOP_K,
+                                           embedding=search_vector)
+    if not relevant_docs:
+        plan.response = NO_RESULTS_MESSAGE
+        return plan
+
+    with span("context"):
+        context = context_assembler.assemble(relevant_docs)
+        prompt_tokens = count_prompt_tokens(plan.query, context.text, plan.history)
+    context_assembler.record(context, prompt_tokens, len(relevant_docs))
+    logger.info(
+        f"Context: {context.used}/{len(relevant_docs)} chunks, {context.tokens} tokens "
+        f"({context.duplicates} duplicate, {context.over_budget} over budget); "
+        f"prompt ~{prompt_tokens} tokens"
+    )
+    plan.docs = relevant_docs
+    plan.sources_found = len(relevant_docs)
+    plan.context = context
+    plan.prompt_tokens = prompt_tokens
+    return plan
+
+
+def complete_chat(plan, answer=None, user_ip=None):
+    """Record the interaction and return the response body.
+
+    ``answer`` is a freshly generated reply to cache; plans that were
+    answered before the LLM call are passed without one.
+    """
+    with span("record"):
+        if answer is not None:
+            if answer and not (plan.history and plan.history.turns):
+                semantic_cache.store(plan.query_vector, answer, query=plan.query,
+                                     sources_found=plan.sources_found)
+            plan.response = answer
+        if plan.session_id and plan.query_vector is not None:
+            sessions.append(plan.session_id, plan.query, plan.response, plan.query_vector,
+                            owner=plan.owner)
+        interaction_log.record(plan.query, plan.response, user_ip)
+    CHAT_RESPONSES.inc(source=plan.source(answered=answer is not None))
+    return plan.payload()
+
+
+def parse_chat_request(data):
+    """Validate a /chat body; returns ``(query, session_id, (error_body, status))``.
+
+    ``session_id`` is optional and chosen by the client (e.g. a UUID); without
+    one every message is answered on its own.
+    """
+    query = data.get("message", "").strip() if isinstance(data, dict) else ""
+    if not query:
+        return None, None, ({"error": "Message cannot be empty."}, 400)
+    session_id = data.get("session_id") or None
+    if session_id is not None and not (isinstance(session_id, str) and SESSION_ID_RE.match(session_id)):
+        return None, None, ({"error": "session_id must be 8-64 letters, digits, '-' or '_'."}, 400)
+    return query, session_id, None
+
+
+def chat_error_payload(e):
+    return {
+        "response": CHAT_ERROR_MESSAGE,
+        "error": str(e) if app.debug else "Internal server error",
+    }
+
+
+def rejected_response(e, body=None):
+    """429/503 with ``Retry-After`` for a request turned away by admission control."""
+    body = body or {"response": BUSY_MESSAGE}
+    body["error"] = e.reason
+    return jsonify(body), e.status, {"Retry-After": str(e.retry_after)}
+
+
+def is_admin_request():
+    """True if the request carries ADMIN_TOKEN; admin routes are closed while it is unset."""
+    token = request.headers.get("X-Admin-Token")
+    return bool(ADMIN_TOKEN and token) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def warm_up_finished():
+    return _startup["state"] in ("ready", "failed")
+
+
+def startup_payload():
+    return {
+        "state": _startup["state"],
+        "phases_seconds": dict(_startup["phases"]),
+        "ready_seconds": _startup["ready_seconds"],
+        "errors": dict(_startup["errors"]),
+    }
+
+
+def health_payload():
+    return {
         "status": "healthy",
         "message": "GovConnect Chatbot API is running",
         "timestamp": datetime.now().isoformat(),
         "vector_store_loaded": db is not None,
-    })
+        "model": model_registry.status(),
+        "startup": startup_payload(),
+    }
+
+
+def readiness_payload():
+    """``(body, status)`` for /readyz: 200 once warm-up finished with an index."""
+    ready = _startup["state"] == "ready" and db is not None
+    body = {
+        "status": "ready" if ready else "not_ready",
+        "vector_store_loaded": db is not None,
+        "model_loaded": model_registry.status()["loaded"],
+        "startup": startup_payload(),
+    }
+    return body, 200 if ready else 503
+
+
+# -------------------------------------------------------------------
+# Request Tracing
+# -------------------------------------------------------------------
+# Probes and scrapes are counted in the metrics but not logged
+QUIET_ENDPOINTS = {"/health", "/livez", "/readyz", "/metrics"}
+
+
+@app.before_request
+def begin_trace():
+    start_trace(request.headers.get("X-Request-ID"))
+
+
+@app.after_request
+def end_trace(response):
+    """Tag the response with its trace ID; metrics and the request log line
+    are written once the body, streamed or not, has been sent."""
+    trace = current_trace()
+    if trace is None:
+        return response
+    response.headers["X-Request-ID"] = trace.trace_id
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    method, status = request.method, response.status_code
+
+    def finish():
+        activate(trace)
+        fields = finish_request(trace, endpoint, method, status)
+        if endpoint not in QUIET_ENDPOINTS:
+            logger.info(f"{method} {endpoint} {status}", extra={"fields": fields})
+
+    response.call_on_close(finish)
+    return response
+
+
+# -------------------------------------------------------------------
+# Routes
+# -------------------------------------------------------------------
+@app.route("/health", methods=["GET"])
+def health_check():
+    """Health check endpoint."""
+    return jsonify(health_payload())
+
+
+@app.route("/livez", methods=["GET"])
+def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return jsonify({"status": "alive"})
+
+
+@app.route("/readyz", methods=["GET"])
+def readiness():
+    """Readiness probe: 503 until the index and models are loaded and warmed up."""
+    body, status = readiness_payload()
+    return jsonify(body), status
 
 
 @app.route("/chat", methods=["POST"])
 def chat_with_bot():
     """Main chat endpoint for the React frontend."""
     try:
-        data = request.json
-        query = data.get("message", "").strip() if data else ""
-
-        if not query:
-            return jsonify({"error": "Message cannot be empty."}), 400
-        if db is None:
-            logger.error("Vector store not loaded")
-            return jsonify({
-                "response": "The knowledge base is not available. Please try again later."
-            }), 500
+        query, session_id, error = parse_chat_request(request.json)
+        if error:
+            return error
+        chat_rate_limiter.check(request.remote_addr)
 
         logger.info(f"Processing query: {query[:100]}...")
 
-        relevant_docs = retrieve_documents(db, query, top_k=5)
-        if not relevant_docs:
-            return jsonify({
-                "response": "I couldn't find relevant information. Please rephrase your question or ask about Sri Lankan government services (e.g., NIC-related processes)."
-            })
+        answer = None
+        plan = plan_chat(query, session_id, client_key(request.remote_addr))
+        if plan.response is None:
+            # templates and cache hits never queue; retrieval and the LLM call do
+            with span("admission"):
+                slot = chat_admission.acquire()
+            with slot:
+                retrieve_context(plan)
+                if plan.response is None:
+                    with span("llm"):
+                        answer = call_mistral_api(query, plan.context, plan.history)
+                    logger.info(f"Successfully processed query from {request.remote_addr}")
 
-        answer = call_mistral_api(query, relevant_docs)
-        logger.info(f"Successfully processed query from {request.remote_addr}")
+        return jsonify(complete_chat(plan, answer, user_ip=request.remote_addr))
 
-        return jsonify({"response": answer, "sources_found": len(relevant_docs)})
+    except Rejected as e:
+        logger.warning(f"Chat request rejected: {e.reason}")
+        return rejected_response(e)
+    except KnowledgeBaseUnavailable as e:
+        return jsonify(e.body), e.status
+    except Exception as e:
+        logger.error(f"Error processing chat request: {e}")
+        return jsonify(chat_error_payload(e)), 500
+
+
+def _sse(payload, event=None):
+    """Encode one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def sse_response(tokens, on_complete=None, **done_fields):
+    """Forward ``tokens`` to the client as SSE ``data`` events.
+
+    The stream ends with a ``done`` event carrying ``done_fields``, or an
+    ``error`` event if the token source raises mid-stream. ``on_complete`` is
+    called with the full answer once the stream finished cleanly.
+    """
+    def generate():
+        parts = []
+        try:
+            for token in tokens:
+                parts.append(token)
+                yield _sse({"token": token})
+        except Exception as e:
+            logger.error(f"Error streaming chat response: {e}")
+            yield _sse(chat_error_payload(e), event="error")
+            return
+        if on_complete is not None:
+            on_complete("".join(parts).strip())
+        yield _sse(done_fields, event="done")
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+def timed_stream(tokens, trace):
+    """Pass ``tokens`` through, recording time to first token and the full stream.
+
+    The response body is iterated after the view returned, so ``trace`` is
+    re-activated for the stages recorded while streaming.
+    """
+    activate(trace)
+    start = time.perf_counter()
+    first = True
+    try:
+        for token in tokens:
+            if first:
+                observe_stage("llm_first_token", time.perf_counter() - start)
+                first = False
+            yield token
+    finally:
+        observe_stage("llm_stream", time.perf_counter() - start)
+
+
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    """Streaming variant of /chat that sends answer tokens as server-sent events."""
+    try:
+        query, session_id, error = parse_chat_request(request.json)
+        if error:
+            return error
+        chat_rate_limiter.check(request.remote_addr)
+
+        logger.info(f"Streaming query: {query[:100]}...")
+
+        user_ip = request.remote_addr
+        plan = plan_chat(query, session_id, client_key(request.remote_addr))
+        slot = None
+        if plan.response is None:
+            with span("admission"):
+                slot = chat_admission.acquire()
+            try:
+                retrieve_context(plan)
+            except Exception:
+                slot.release()
+                raise
+        if plan.response is not None:
+            if slot is not None:
+                slot.release()
+            done = complete_chat(plan, user_ip=user_ip)
+            done.pop("response")
+            done.setdefault("sources_found", plan.sources_found)
+            return sse_response([plan.response], **done)
+
+        response = sse_response(
+            timed_stream(stream_mistral_api(query, plan.context, plan.history), current_trace()),
+            on_complete=lambda answer: complete_chat(plan, answer, user_ip=user_ip),
+            sources_found=plan.sources_found,
+        )
+        # the slot is held until the stream has been sent or abandoned
+        response.call_on_close(slot.release)
+        return response
 
+    except Rejected as e:
+        logger.warning(f"Chat request rejected: {e.reason}")
+        return rejected_response(e)
+    except KnowledgeBaseUnavailable as e:
+        return jsonify(e.body), e.status
     except Exception as e:
         logger.error(f"Error processing chat request: {e}")
-        return jsonify({
-            "response": "An error occurred while processing your request. Please try again later.",
-            "error": str(e) if app.debug else "Internal server error",
-        }), 500
+        return jsonify(chat_error_payload(e)), 500
+
+
+@app.route("/chat/session/<session_id>", methods=["DELETE"])
+def end_session(session_id):
+    """Forget a conversation, e.g. when the user clears the chat.
+
+    Only the client that started the session can end it.
+    """
+    return jsonify({"deleted": sessions.delete(session_id, client_key(request.remote_addr))})
+
+
+@app.route("/reindex", methods=["POST"])
+def reindex():
+    """Re-embed added/changed documents and hot-swap the served index."""
+    global db
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        data = request.get_json(silent=True) or {}
+        # in-process parsing, as at startup (no fork from a threaded server)
+        fresh, report = update_index(vector_dir=VECTOR_DIR, rebuild=bool(data.get("rebuild")),
+                                     workers=1)
+        db = fresh
+        _vector_state["fingerprint"] = _manifest_fingerprint()
+        return jsonify(report)
+    except Exception as e:
+        logger.error(f"Error re-indexing knowledge base: {e}")
+        return jsonify({"error": "Failed to re-index knowledge base"}), 500
 
 
 @app.route("/feedback", methods=["POST"])
@@ -140,19 +679,7 @@ def submit_feedback():
             "user_ip": request.remote_addr,
         }
 
-        feedback_path = "feedback.json"
-        feedback_logs = []
-        if os.path.exists(feedback_path):
-            try:
-                with open(feedback_path, "r", encoding="utf-8") as f:
-                    feedback_logs = json.load(f)
-            except json.JSONDecodeError:
-                pass
-
-        feedback_logs.append(feedback_entry)
-
-        with open(feedback_path, "w", encoding="utf-8") as f:
-            json.dump(feedback_logs, f, indent=2, ensure_ascii=False)
+        feedback_store.add(feedback_entry)
 
         return jsonify({"message": "Thank you for your feedback!"})
     except Exception as e:
@@ -160,31 +687,73 @@ def submit_feedback():
         return jsonify({"error": "Failed to save feedback"}), 500
 
 
+@app.route("/feedback", methods=["GET"])
+def list_feedback():
+    """Paginated feedback entries, newest first."""
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        page = request.args.get("page", 1, type=int)
+        per_page = request.args.get("per_page", 50, type=int)
+        return jsonify(feedback_store.page(page, per_page))
+    except Exception as e:
+        logger.error(f"Error reading feedback: {e}")
+        return jsonify({"error": "Failed to read feedback"}), 500
+
+
+@app.route("/feedback/summary", methods=["GET"])
+def feedback_summary():
+    """Aggregated feedback: totals, average rating, distribution, daily counts."""
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        days = request.args.get("days", 30, type=int)
+        return jsonify(feedback_store.summary(days))
+    except Exception as e:
+        logger.error(f"Error summarizing feedback: {e}")
+        return jsonify({"error": "Failed to summarize feedback"}), 500
+
+
 @app.route("/stats", methods=["GET"])
 def get_stats():
-    """Get basic statistics about chatbot usage."""
+    """Get basic statistics about chatbot usage.
+
+    Interaction counts come from the pre-aggregated counters. Pass
+    ``start``/``end`` (``YYYY-MM-DD``, or ``YYYY-MM-DDTHH`` with
+    ``granularity=hour``) to get per-bucket counts for a time range.
+    """
     try:
         stats = {
             "vector_store_loaded": db is not None,
             "total_documents": getattr(getattr(db, "index", None), "ntotal", "unknown") if db else 0,
             "service_status": "running",
+            "prediction_cache": prediction_cache.stats(),
+            "semantic_cache": semantic_cache.stats(),
+            "intents": intent_router.stats(),
+            "context": context_assembler.stats(),
+            "llm": llm_client.stats(),
+            "sessions": sessions.stats(),
+            "admission": {
+                "chat": chat_admission.stats(),
+                "chat_rate_limit": chat_rate_limiter.stats(),
+                "predict": predict_admission.stats(),
+            },
+            "embeddings": get_embedding_service().stats(),
         }
 
-        log_path = "chat_logs.json"
-        if os.path.exists(log_path):
-            try:
-                with open(log_path, "r", encoding="utf-8") as f:
-                    logs = json.load(f)
-                stats["total_interactions"] = len(logs)
-                today = datetime.now().strftime("%Y-%m-%d")
-                stats["today_interactions"] = sum(
-                    log.get("timestamp", "").startswith(today) for log in logs
-                )
-            except Exception:
-                stats["total_interactions"] = 0
-                stats["today_interactions"] = 0
-        else:
-            stats.update(total_interactions=0, today_interactions=0)
+        stats.update(interaction_log.stats())
+
+        granularity = "hour" if request.args.get("granularity") == "hour" else "day"
+        if "start" in request.args or "end" in request.args or "granularity" in request.args:
+            default_start, default_end = default_range(granularity)
+            start = parse_range_bound(request.args.get("start"), granularity, default_start)
+            end = parse_range_bound(request.args.get("end"), granularity, default_end)
+            stats["range"] = {
+                "start": start,
+                "end": end,
+                "granularity": granularity,
+                **interaction_log.count_range(start, end, granularity),
+            }
 
         return jsonify(stats)
     except Exception as e:
@@ -192,6 +761,36 @@ def get_stats():
         return jsonify({"error": "Failed to get stats"}), 500
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus metrics: request and per-stage latency histograms, counters."""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/debug/profile", methods=["GET"])
+def debug_profile():
+    """Sample this worker's stacks for ``seconds`` (default 10); folded format.
+
+    Disabled unless PROFILER_ENABLED=true, and admin-only.
+    """
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Endpoint not found"}), 404
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        seconds = min(float(request.args.get("seconds", 10)), PROFILE_MAX_SECONDS)
+    except ValueError:
+        return jsonify({"error": "seconds must be a number"}), 400
+    result = profiler.capture(seconds, include_idle=request.args.get("idle") == "1")
+    if result is None:
+        return jsonify({"error": "A profile is already being captured"}), 409
+    folded, samples = result
+    return Response(folded, mimetype="text/plain", headers={
+        "X-Profile-Samples": str(samples),
+        "X-Profile-Pid": str(os.getpid()),
+    })
+
+
 # -------------------------------------------------------------------
 # Error Handlers
 # -------------------------------------------------------------------
@@ -208,53 +807,92 @@ def internal_error(_):
 # -------------------------------------------------------------------
 # Model Utilities
 # -------------------------------------------------------------------
-def load_model_and_mappings():
-    """Load trained model and its auxiliary mappings."""
-    global lgbm_model, task_freq_map, queue_bins
-    try:
-        with open(MODEL_PATH, "rb") as f:
-            lgbm_model = pickle.load(f)
-        logger.info("LightGBM model loaded successfully.")
+REQUIRED_BOOKING_FIELDS = [
+    "appointment_date", "appointment_time", "task_id",
+    "queue_number", "num_documents",
+]
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "500"))
 
-        if os.path.exists(TASK_FREQ_PATH):
-            with open(TASK_FREQ_PATH, "r") as f:
-                task_freq_map = json.load(f)
 
-        if os.path.exists(QUEUE_BINS_PATH):
-            with open(QUEUE_BINS_PATH, "r") as f:
-                queue_bins = json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load model: {e}")
+def preprocess_input(data: dict, bundle):
+    """Preprocess raw input into a feature vector for the model."""
+    import pandas as pd
+    return build_features(pd.DataFrame([data]), bundle.task_freq_map, bundle.queue_bins)
 
 
-def preprocess_input(data: dict):
-    """Preprocess raw input into a feature vector for the model."""
-    load_model_and_mappings()
-    df = pd.DataFrame([data])
+def predict_one(data: dict, bundle):
+    """Predict a single booking, using the pandas-free encoder when it can.
 
-    df["appointment_datetime"] = pd.to_datetime(
-        df["appointment_date"] + " " + df["appointment_time"]
-    )
-    df["day_of_week"] = df["appointment_datetime"].dt.dayofweek
-    df["hour_of_day"] = df["appointment_datetime"].dt.hour
-    df["is_weekend"] = df["day_of_week"].isin([5, 6]).astype(int)
+    Predictions are memoized on the engineered feature vector (plus the model
+    version), so bookings that land in the same task/hour/weekday/queue bucket
+    skip the LightGBM call.
+    """
+    with span("features"):
+        try:
+            row = bundle.encoder.encode(data)
+        except (KeyError, TypeError, ValueError):
+            row = preprocess_input(data, bundle).iloc[0].tolist()
 
-    df["task_freq"] = df["task_id"].map(task_freq_map).fillna(0)
+    key = (bundle.version,) + feature_key(row)
+    with span("prediction_cache"):
+        prediction = prediction_cache.get(key)
+    if prediction is None:
+        with span("predict"):
+            prediction = float(predict_rows(bundle.model, [row])[0])
+        prediction_cache.set(key, prediction)
+    return prediction
 
-    if queue_bins:
-        df["queue_bucket"] = pd.cut(
-            df["queue_number"], bins=queue_bins,
-            labels=False, include_lowest=True
-        )
-    else:
-        df["queue_bucket"] = 0
 
-    drop_cols = [
-        "booking_id", "citizen_id", "booking_date", "appointment_date",
-        "appointment_time", "check_in_time", "check_out_time",
-        "satisfaction_rating", "task_id", "queue_number", "appointment_datetime",
+def validate_bookings(bookings):
+    """Split a batch into a clean DataFrame and per-row validation errors.
+
+    Returns ``(df, errors)`` where ``df`` is indexed by the position of each
+    valid booking in the request and ``errors`` maps position -> message.
+    """
+    import pandas as pd
+
+    errors = {}
+    rows = {}
+    for i, booking in enumerate(bookings):
+        if not isinstance(booking, dict):
+            errors[i] = "Booking must be a JSON object"
+            continue
+        missing = [f for f in REQUIRED_BOOKING_FIELDS if booking.get(f) in (None, "")]
+        if missing:
+            errors[i] = f"Missing required fields: {', '.join(missing)}"
+            continue
+        if not isinstance(booking["task_id"], (str, int, float)):
+            errors[i] = "task_id must be a string or number"
+            continue
+        rows[i] = booking
+
+    if not rows:
+        return pd.DataFrame(columns=REQUIRED_BOOKING_FIELDS), errors
+
+    df = pd.DataFrame.from_dict(rows, orient="index")
+    df["queue_number"] = pd.to_numeric(df["queue_number"], errors="coerce")
+    df["num_documents"] = pd.to_numeric(df["num_documents"], errors="coerce")
+    # each row on its own: "09:30" and "09:30:00" may be mixed in one batch
+    parsed = pd.to_datetime(
+        df["appointment_date"].astype(str) + " " + df["appointment_time"].astype(str),
+        errors="coerce", format="mixed",
+    )
+    # normalized, so build_features sees one format
+    df["appointment_date"] = parsed.dt.strftime("%Y-%m-%d")
+    df["appointment_time"] = parsed.dt.strftime("%H:%M:%S")
+
+    checks = [
+        (parsed.isna(), "Invalid appointment_date/appointment_time"),
+        (df["queue_number"].isna(), "queue_number must be numeric"),
+        (df["num_documents"].isna(), "num_documents must be numeric"),
     ]
-    return df.drop(columns=[c for c in drop_cols if c in df.columns], errors="ignore")
+    bad = pd.Series(False, index=df.index)
+    for mask, message in checks:
+        for i in df.index[mask & ~bad]:
+            errors[int(i)] = message
+        bad |= mask
+
+    return df[~bad], errors
 
 
 @app.route("/predict_time", methods=["POST"])
@@ -264,22 +902,141 @@ def predict_time():
         if not request.json:
             return jsonify({"error": "Invalid request. JSON body required"}), 400
 
-        X = preprocess_input(request.json)
-        if lgbm_model is None:
+        bundle = model_registry.get()
+        if bundle is None:
             return jsonify({"error": "Model not loaded"}), 500
 
-        prediction = float(lgbm_model.predict(X)[0])
+        with predict_admission.acquire():
+            prediction = predict_one(request.json, bundle)
         return jsonify({"predicted_completion_time_minutes": round(prediction, 2)})
+    except Rejected as e:
+        return rejected_response(e, {"error": "Too many prediction requests"})
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         return jsonify({"error": "Failed to make prediction"}), 500
 
 
+@app.route("/predict_time/batch", methods=["POST"])
+def predict_time_batch():
+    """Predict completion times for a list of bookings with one model call."""
+    try:
+        data = request.json
+        bookings = data.get("bookings") if isinstance(data, dict) else data
+        if not isinstance(bookings, list) or not bookings:
+            return jsonify({"error": "Invalid request. Non-empty 'bookings' array required"}), 400
+        if len(bookings) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch too large. Maximum is {MAX_BATCH_SIZE} bookings"}), 413
+
+        bundle = model_registry.get()
+        if bundle is None:
+            return jsonify({"error": "Model not loaded"}), 500
+
+        with predict_admission.acquire():
+            with span("validate"):
+                df, errors = validate_bookings(bookings)
+            predictions = {}
+            if len(df):
+                with span("features"):
+                    X = build_features(df, bundle.task_freq_map, bundle.queue_bins)
+                with span("predict"):
+                    values = bundle.model.predict(X)
+                for i, value in zip(X.index, values):
+                    predictions[int(i)] = round(float(value), 2)
+
+        results = []
+        for i in range(len(bookings)):
+            if i in predictions:
+                results.append({"index": i, "predicted_completion_time_minutes": predictions[i]})
+            else:
+                results.append({"index": i, "error": errors.get(i, "Failed to make prediction")})
+
+        return jsonify({
+            "results": results,
+            "succeeded": len(predictions),
+            "failed": len(bookings) - len(predictions),
+        })
+    except Rejected as e:
+        return rejected_response(e, {"error": "Too many prediction requests"})
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        return jsonify({"error": "Failed to make predictions"}), 500
+
+
 # -------------------------------------------------------------------
 # Startup
 # -------------------------------------------------------------------
-with app.app_context():
-    initialize_vector_store()
+# Dummy questions run once at startup so the first real request doesn't
+# pay for model loading, tokenizer setup or cold FAISS pages
+WARMUP_QUERIES = [
+    "How do I apply for a National Identity Card?",
+    "What documents do I need to renew my passport?",
+]
+
+
+def _run_phase(name, fn):
+    start = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        logger.error(f"Startup phase {name} failed: {e}")
+        _startup["errors"][name] = str(e)
+    finally:
+        _startup["phases"][name] = round(time.perf_counter() - start, 3)
+
+
+def _migrate_logs():
+    migrated = feedback_store.migrate_json()
+    if migrated:
+        logger.info(f"Migrated {migrated} feedback entries from feedback.json")
+    migrated = interaction_log.migrate_json()
+    if migrated:
+        logger.info(f"Imported {migrated} interactions from chat_logs.json")
+
+
+def _load_embedding_model():
+    service = get_embedding_service()
+    service.model
+    service.tokenizer
+
+
+def _run_warmup_queries():
+    store = db
+    if store is not None:
+        for query in WARMUP_QUERIES:
+            vector = embed_query(store, query)
+            docs = retrieve_documents(store, query, top_k=RETRIEVAL_TOP_K, embedding=vector)
+            count_prompt_tokens(query, context_assembler.assemble(docs).text)
+    bundle = model_registry.get()
+    if bundle is not None:
+        predict_rows(bundle.model, [[0.0] * len(FEATURE_COLUMNS)])
+
+
+def warm_up():
+    """Load the index and models, then exercise them; records per-phase timings."""
+    _startup["state"] = "warming"
+    _run_phase("vector_store", initialize_vector_store)
+    _run_phase("model", model_registry.load)
+    _run_phase("migrations", _migrate_logs)
+    _run_phase("embedding_model", _load_embedding_model)
+    _run_phase("warmup_queries", _run_warmup_queries)
+    _startup["state"] = "ready" if db is not None else "failed"
+    _startup["ready_seconds"] = round(time.perf_counter() - _startup["t0"], 3)
+    logger.info(f"Startup {_startup['state']} in {_startup['ready_seconds']}s: {_startup['phases']}")
+
+
+def start_warm_up(background=True):
+    """Run :func:`warm_up` once per process, in a daemon thread unless ``background=False``."""
+    with _startup_lock:
+        if _startup["pid"] == os.getpid():
+            return
+        _startup["pid"] = os.getpid()
+    if background:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    else:
+        warm_up()
+
+
+start_warm_up(background=WARMUP_MODE != "sync")
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 5001))
@@ -0,0 +1,223 @@
+"""
+Asyncio serving mode for the GovConnect Chatbot API.
+
+Serves /health, /chat and /predict_time with the same JSON contract as the
+Flask app, but the Mistral call goes through the pooled, retrying
+``AsyncLLMClient`` and embedding/FAISS/LightGBM work runs on a bounded
+thread pool, so a slow LLM response no longer pins a worker thread.
+
+Run with:
+    hypercorn async_app:app --bind 0.0.0.0:5001
+or:
+    SERVER_MODE=async python run.py
+"""
+
+import os
+import asyncio
+import logging
+import contextvars
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from quart import Quart, Response, request, jsonify
+from quart_cors import cors
+
+import app as flask_app
+from admission import (
+    ASYNC_CHAT_MAX_IN_FLIGHT, ASYNC_CHAT_MAX_QUEUE, CHAT_QUEUE_TIMEOUT, PREDICT_MAX_IN_FLIGHT,
+    PREDICT_MAX_QUEUE, PREDICT_QUEUE_TIMEOUT, AsyncAdmissionController, Rejected,
+)
+from chatbot_core import build_mistral_request
+from llm_client import AsyncLLMClient, LLMClientError
+from sessions import client_key
+from telemetry import current_trace, finish_request, registry, span, start_trace
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", "4"))
+
+app = Quart(__name__)
+app = cors(app, allow_origin=[
+    "http://localhost:5173", "http://localhost:5174",
+    "http://localhost:5175", "http://localhost:5176",
+    "http://localhost:3000"
+])
+
+executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="chatbot-cpu")
+llm_client = None
+# Event-loop pools: a request cancelled while queued (client disconnected)
+# never ends up holding a slot. Chat is sized for I/O-bound concurrency.
+chat_admission = AsyncAdmissionController(
+    "chat", ASYNC_CHAT_MAX_IN_FLIGHT, ASYNC_CHAT_MAX_QUEUE, CHAT_QUEUE_TIMEOUT,
+)
+predict_admission = AsyncAdmissionController(
+    "predict", PREDICT_MAX_IN_FLIGHT, PREDICT_MAX_QUEUE, PREDICT_QUEUE_TIMEOUT,
+)
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run CPU-bound or blocking work on the bounded executor.
+
+    The request's context (and so its trace) is carried into the thread.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(executor, partial(ctx.run, fn, *args, **kwargs))
+
+
+async def admit(controller):
+    """Wait on the loop for a slot of ``controller``; raises ``Rejected``."""
+    with span("admission"):
+        return await controller.acquire()
+
+
+def rejected_response(e, body=None):
+    """Quart counterpart of ``app.rejected_response``."""
+    body = body or {"response": flask_app.BUSY_MESSAGE}
+    body["error"] = e.reason
+    return jsonify(body), e.status, {"Retry-After": str(e.retry_after)}
+
+
+@app.before_serving
+async def open_llm_client():
+    global llm_client
+    # as many provider calls as admitted chats, so none waits on the client
+    llm_client = AsyncLLMClient(max_concurrency=ASYNC_CHAT_MAX_IN_FLIGHT)
+
+
+@app.after_serving
+async def close_llm_client():
+    if llm_client is not None:
+        await llm_client.aclose()
+    executor.shutdown(wait=False)
+
+
+async def call_mistral_api_async(query, context, history=None):
+    """Async counterpart of ``chatbot_core.call_mistral_api``."""
+    url, headers, body = build_mistral_request(query, context, history=history)
+    try:
+        payload = await llm_client.chat(url, headers, body)
+        return payload["choices"][0]["message"]["content"].strip()
+    except LLMClientError as e:
+        logger.error(f"Mistral API request failed: {e}")
+        raise Exception(f"Failed to get response from AI service: {str(e)}")
+    except (KeyError, IndexError) as e:
+        logger.error(f"Unexpected API response format: {e}")
+        raise Exception("Received unexpected response from AI service")
+
+
+@app.before_request
+async def begin_trace():
+    start_trace(request.headers.get("X-Request-ID"))
+
+
+@app.after_request
+async def end_trace(response):
+    trace = current_trace()
+    if trace is None:
+        return response
+    response.headers["X-Request-ID"] = trace.trace_id
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    fields = finish_request(trace, endpoint, request.method, response.status_code)
+    if endpoint not in flask_app.QUIET_ENDPOINTS:
+        logger.info(f"{request.method} {endpoint} {response.status_code}", extra={"fields": fields})
+    return response
+
+
+# -------------------------------------------------------------------
+# Routes
+# -------------------------------------------------------------------
+@app.route("/health", methods=["GET"])
+async def health_check():
+    """Health check endpoint."""
+    return jsonify(flask_app.health_payload())
+
+
+@app.route("/livez", methods=["GET"])
+async def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return jsonify({"status": "alive"})
+
+
+@app.route("/readyz", methods=["GET"])
+async def readiness():
+    """Readiness probe: 503 until the index and models are loaded and warmed up."""
+    body, status = flask_app.readiness_payload()
+    return jsonify(body), status
+
+
+@app.route("/chat", methods=["POST"])
+async def chat_with_bot():
+    """Main chat endpoint for the React frontend."""
+    try:
+        query, session_id, error = flask_app.parse_chat_request(await request.get_json(silent=True))
+        if error:
+            return error
+        flask_app.chat_rate_limiter.check(request.remote_addr)
+
+        logger.info(f"Processing query: {query[:100]}...")
+
+        answer = None
+        plan = await run_blocking(flask_app.plan_chat, query, session_id,
+                                  client_key(request.remote_addr))
+        if plan.response is None:
+            # templates and cache hits never queue; retrieval and the LLM call do
+            with await admit(chat_admission):
+                await run_blocking(flask_app.retrieve_context, plan)
+                if plan.response is None:
+                    with span("llm"):
+                        answer = await call_mistral_api_async(query, plan.context, plan.history)
+                    logger.info(f"Successfully processed query from {request.remote_addr}")
+
+        # complete_chat writes the session turn to SQLite, so keep it off the loop
+        return jsonify(await run_blocking(flask_app.complete_chat, plan, answer,
+                                          user_ip=request.remote_addr))
+
+    except Rejected as e:
+        logger.warning(f"Chat request rejected: {e.reason}")
+        return rejected_response(e)
+    except flask_app.KnowledgeBaseUnavailable as e:
+        return jsonify(e.body), e.status
+    except Exception as e:
+        logger.error(f"Error processing chat request: {e}")
+        return jsonify(flask_app.chat_error_payload(e)), 500
+
+
+@app.route("/metrics", methods=["GET"])
+async def metrics():
+    """Prometheus metrics: request and per-stage latency histograms, counters."""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/predict_time", methods=["POST"])
+async def predict_time():
+    """Predict completion time using LightGBM model."""
+    try:
+        data = await request.get_json(silent=True)
+        if not data:
+            return jsonify({"error": "Invalid request. JSON body required"}), 400
+
+        # get() may stat or load the model file, so keep it off the loop
+        bundle = await run_blocking(flask_app.model_registry.get)
+        if bundle is None:
+            return jsonify({"error": "Model not loaded"}), 500
+
+        with await admit(predict_admission):
+            prediction = await run_blocking(flask_app.predict_one, data, bundle)
+        return jsonify({"predicted_completion_time_minutes": round(prediction, 2)})
+    except Rejected as e:
+        return rejected_response(e, {"error": "Too many prediction requests"})
+    except Exception as e:
+        logger.error(f"Prediction error: {e}")
+        return jsonify({"error": "Failed to make prediction"}), 500
+
+
+@app.errorhandler(404)
+async def not_found(_):
+    return jsonify({"error": "Endpoint not found"}), 404
+
+
+if __name__ == "__main__":
+    port = int(os.getenv("PORT", 5001))
+    logger.info(f"Starting GovConnect Chatbot API (async) on port {port}")
+    app.run(host="0.0.0.0", port=port)
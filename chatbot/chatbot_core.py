@@ -1,5 +1,6 @@
 import os
-import requests
+import json
+import logging
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
@@ -7,58 +8,40 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-from langchain_community.document_loaders import DirectoryLoader, UnstructuredMarkdownLoader
-from langchain.text_splitter import MarkdownHeaderTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from transformers import AutoTokenizer
+from embeddings import get_embedding_service
+from llm_client import LLMClient, LLMClientError
+from context_builder import AssembledContext, ContextAssembler
+from chunker import Chunker
+from vector_index import open_store
+
+# Per-request messages go through logging (with the request's trace ID);
+# one-off setup steps below still print
+logger = logging.getLogger(__name__)
 
 # ===== Configuration =====
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 MODEL_ID = os.getenv("MISTRAL_MODEL_ID", "ft:open-mistral-7b:0ffd4d8a:20250718:0b9abfb2")
+MISTRAL_API_URL = os.getenv("MISTRAL_API_URL", "https://api.mistral.ai/v1/chat/completions")
 VECTOR_DIR = os.getenv("VECTOR_DIR", "govconnect_KB")
-EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")  
 DATA_DIR = os.getenv("DATA_DIR", "data")
-MAX_TOKENS = int(os.getenv("MAX_TOKENS", "512"))  
+# Chunks retrieved per question; see scripts/retrieval_benchmark.py
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
 
-# Initialize tokenizer
-try:
-    TOKENIZER = AutoTokenizer.from_pretrained(EMBED_MODEL)
-except Exception as e:
-    print(f"Warning: Could not load tokenizer: {e}")
-    TOKENIZER = None
+# Shared, pooled client for every call to the LLM provider
+llm_client = LLMClient()
+# Formats, de-duplicates and token-budgets retrieved chunks for the prompt
+context_assembler = ContextAssembler()
+# Recursive, token-aware splitting of the knowledge base (see chunker.py)
+chunker = Chunker()
 
 # ===== Utility Functions =====
-def trim_long_chunks(chunks, max_tokens=MAX_TOKENS):
-    """Split chunks that exceed token limit into smaller ones."""
-    if not TOKENIZER:
-        return chunks
-    
-    print(f"[DEBUG] Trimming chunks to max {max_tokens} tokens...")
-    trimmed = []
-    for idx, chunk in enumerate(chunks):
-        tokens = TOKENIZER.encode(chunk.page_content, truncation=False)
-        if len(tokens) > max_tokens:
-            words = chunk.page_content.split()
-            midpoint = len(words) // 2
-            chunk1 = chunk.copy()
-            chunk1.page_content = " ".join(words[:midpoint])
-
-            chunk2 = chunk.copy()
-            chunk2.page_content = " ".join(words[midpoint:])
-
-            trimmed.extend([chunk1, chunk2])
-            print(f"[DEBUG] Chunk {idx} split due to size.")
-        else:
-            trimmed.append(chunk)
-    print(f"[DEBUG] Total chunks after trimming: {len(trimmed)}")
-    return trimmed
-
 def load_documents(data_dir=None):
     """Load Markdown NIC documents from directory."""
     if data_dir is None:
         data_dir = DATA_DIR
     
+    from langchain_community.document_loaders import DirectoryLoader, UnstructuredMarkdownLoader
+
     print(f"[DEBUG] Loading markdown documents from {data_dir}...")
     
     if not os.path.exists(data_dir):
@@ -69,32 +52,24 @@ def load_documents(data_dir=None):
     print(f"[DEBUG] Loaded {len(documents)} documents.")
     return documents
 
-def split_documents(documents):
-    """Split NIC docs into structured chunks by headers."""
-    print(f"[DEBUG] Splitting documents by headers...")
-    splitter = MarkdownHeaderTextSplitter(headers_to_split_on=[
-        ("#", "H1"), ("##", "H2"), ("###", "H3")
-    ])
-
-    all_chunks = []
-    for doc in documents:
-        markdown_text = doc.page_content
-        chunks = splitter.split_text(markdown_text)
-        for chunk in chunks:
-            chunk.metadata["source_file"] = doc.metadata.get("source", "unknown_file.md")
-            chunk.metadata["section"] = chunk.metadata.get("header", "General")
-        all_chunks.extend(chunks)
-
-    print(f"[DEBUG] Split into {len(all_chunks)} chunks.")
-    return trim_long_chunks(all_chunks)
+def split_documents(documents, verbose=True):
+    """Split NIC docs into header-aware chunks that fit the embedding window."""
+    if verbose:
+        print(f"[DEBUG] Splitting documents by headers...")
+    all_chunks = chunker.chunk(documents)
+    if verbose:
+        print(f"[DEBUG] Split into {len(all_chunks)} chunks.")
+    return all_chunks
 
 def build_vector_store(chunks, vector_dir=None):
     """Create FAISS vector store from document chunks."""
     if vector_dir is None:
         vector_dir = VECTOR_DIR
     
+    from langchain_community.vectorstores import FAISS
+
     print(f"[DEBUG] Building FAISS vector store...")
-    embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+    embeddings = get_embedding_service()
     db = FAISS.from_documents(chunks, embeddings)
     
     # Create directory if it doesn't exist
@@ -103,42 +78,53 @@ def build_vector_store(chunks, vector_dir=None):
     print(f"[DEBUG] Vector store saved at {vector_dir}.")
     return db
 
-def load_vector_store(vector_dir=None):
-    """Load existing FAISS vector store."""
+def load_vector_store(vector_dir=None, exact=False):
+    """Load existing FAISS vector store.
+
+    Serves the HNSW/IVF/quantized index built next to it if there is one
+    (see vector_index.py); ``exact=True`` always loads the flat store.
+    Documents are read lazily from ``docstore.sqlite``; stores that only
+    have a legacy pickled ``index.pkl`` are still loaded from it.
+    """
     if vector_dir is None:
         vector_dir = VECTOR_DIR
     
+    from langchain_community.vectorstores import FAISS
+
     print(f"[DEBUG] Loading FAISS vector store from {vector_dir}...")
     
     if not os.path.exists(vector_dir):
         raise FileNotFoundError(f"Vector store directory not found: {vector_dir}")
     
-    embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-    db = FAISS.load_local(vector_dir, embeddings, allow_dangerous_deserialization=True)
+    embeddings = get_embedding_service()
+    db = open_store(vector_dir, embeddings, exact=exact)
+    if db is None:
+        print(f"[WARNING] No docstore.sqlite in {vector_dir}; unpickling legacy index.pkl. "
+              f"Run the indexer or 'python docstore.py convert {vector_dir}' to migrate.")
+        db = FAISS.load_local(vector_dir, embeddings, allow_dangerous_deserialization=True)
     print(f"[DEBUG] Vector store loaded successfully.")
     return db
 
-def retrieve_documents(db, query, top_k=4):
-    """Retrieve top matching documents for query."""
-    retriever = db.as_retriever(search_kwargs={"k": top_k})
-    docs = retriever.invoke(query)
-    print(f"[DEBUG] Retrieved {len(docs)} relevant chunks.")
+def embed_query(db, query):
+    """Embed a query with the same model the vector store was built with."""
+    embedder = db.embedding_function
+    if hasattr(embedder, "embed_query"):
+        return embedder.embed_query(query)
+    return embedder(query)
+
+def retrieve_documents(db, query, top_k=RETRIEVAL_TOP_K, embedding=None):
+    """Retrieve top matching documents for query.
+
+    Pass ``embedding`` to reuse a query vector that was already computed.
+    """
+    if embedding is None:
+        embedding = embed_query(db, query)
+    docs = db.similarity_search_by_vector(embedding, k=top_k)
+    logger.debug(f"Retrieved {len(docs)} relevant chunks.")
     return docs
 
-def call_mistral_api(query, context):
-    """Send query + context to Mistral API."""
-    print(f"[DEBUG] Calling Mistral API...")
-    
-    if not MISTRAL_API_KEY:
-        raise ValueError("MISTRAL_API_KEY environment variable is not set")
-    
-    url = "https://api.mistral.ai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {MISTRAL_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    system_message = (
+# Static part of the system prompt, built once at import
+SYSTEM_PROMPT = (
     "You are GovConnect Assistant — a trusted, friendly, and professional AI assistant that helps citizens of Sri Lanka "
     "with government services. You specialize in:\n"
     "- National Identity Card (NIC)\n"
@@ -168,20 +154,73 @@ def call_mistral_api(query, context):
     "- User: 'How do I renew my NIC?' → Assistant: Provide clear step-by-step instructions.\n"
     "- User: 'Tell me about passports' → Assistant: Provide structured guidance from the context.\n"
     "- User: 'How do I get a land permit?' → Assistant: 'That’s not in my knowledge base. For the most accurate details, please contact the relevant government office.'\n\n"
+)
 
+CONTEXT_TEMPLATE = (
     "CONTEXT (Knowledge Base):\n"
     "---\n"
-    f"{context}\n"
+    "{context}\n"
     "---\n\n"
-
     "Please respond strictly based on the above context and interaction rules."
 )
 
+SUMMARY_TEMPLATE = (
+    "\n\nEARLIER IN THIS CONVERSATION:\n"
+    "{summary}"
+)
+
+_system_prompt_tokens = None
+
+def as_context_text(context):
+    """Prompt text for ``context``: a string, an assembled context or raw documents."""
+    if isinstance(context, str):
+        return context
+    if isinstance(context, AssembledContext):
+        return context.text
+    return context_assembler.assemble(context).text
+
+def count_prompt_tokens(query, context_text, history=None):
+    """Estimated input tokens for one request, under the shared tokenizer."""
+    global _system_prompt_tokens
+    service = get_embedding_service()
+    if _system_prompt_tokens is None:
+        _system_prompt_tokens = service.count_tokens(SYSTEM_PROMPT)
+    tokens = (
+        _system_prompt_tokens
+        + service.count_tokens(CONTEXT_TEMPLATE.format(context=context_text))
+        + service.count_tokens(query)
+    )
+    if history is not None:
+        if history.summary:
+            tokens += service.count_tokens(SUMMARY_TEMPLATE.format(summary=history.summary))
+        tokens += sum(service.count_tokens_batch(t for turn in history.turns for t in turn))
+    return tokens
+
+def build_mistral_request(query, context, stream=False, history=None):
+    """Build the (url, headers, body) triple for a Mistral chat completion.
+
+    ``history`` is an optional conversation (see sessions.py): its summary
+    is appended to the system message and its recent turns are replayed
+    as user/assistant messages before ``query``.
+    """
+    if not MISTRAL_API_KEY:
+        raise ValueError("MISTRAL_API_KEY environment variable is not set")
     
-    messages = [
-        {"role": "system", "content": system_message},
-        {"role": "user", "content": query}
-    ]
+    url = MISTRAL_API_URL
+    headers = {
+        "Authorization": f"Bearer {MISTRAL_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    
+    system_message = SYSTEM_PROMPT + CONTEXT_TEMPLATE.format(context=as_context_text(context))
+    if history is not None and history.summary:
+        system_message += SUMMARY_TEMPLATE.format(summary=history.summary)
+    
+    messages = [{"role": "system", "content": system_message}]
+    for question, answer in (history.turns if history is not None else ()):
+        messages.append({"role": "user", "content": question})
+        messages.append({"role": "assistant", "content": answer})
+    messages.append({"role": "user", "content": query})
 
     body = {
         "model": MODEL_ID,
@@ -189,22 +228,55 @@ def call_mistral_api(query, context):
         "temperature": 0.3,
         "max_tokens": 1000
     }
+    if stream:
+        body["stream"] = True
+    return url, headers, body
+
+def call_mistral_api(query, context, history=None):
+    """Send query + context (and any conversation history) to Mistral API."""
+    logger.debug("Calling Mistral API...")
+    url, headers, body = build_mistral_request(query, context, history=history)
     
     try:
-        response = requests.post(url, headers=headers, json=body, timeout=30)
-        response.raise_for_status()
-        answer = response.json()["choices"][0]["message"]["content"]
+        payload = llm_client.chat(url, headers, body)
+        answer = payload["choices"][0]["message"]["content"]
         return answer.strip()
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Mistral API request failed: {e}")
+    except LLMClientError as e:
+        logger.error(f"Mistral API request failed: {e}")
         raise Exception(f"Failed to get response from AI service: {str(e)}")
-    except KeyError as e:
-        print(f"[ERROR] Unexpected API response format: {e}")
+    except (KeyError, IndexError) as e:
+        logger.error(f"Unexpected API response format: {e}")
         raise Exception("Received unexpected response from AI service")
     except Exception as e:
-        print(f"[ERROR] Unexpected error calling Mistral API: {e}")
+        logger.error(f"Unexpected error calling Mistral API: {e}")
         raise Exception(f"AI service error: {str(e)}")
 
+def stream_mistral_api(query, context, history=None):
+    """Send query + context to Mistral API and yield answer tokens as they arrive."""
+    logger.debug("Streaming from Mistral API...")
+    url, headers, body = build_mistral_request(query, context, stream=True, history=history)
+    
+    try:
+        for line in llm_client.stream(url, headers, body):
+            if not line or not line.startswith("data:"):
+                continue
+            payload = line[len("data:"):].strip()
+            if payload == "[DONE]":
+                return
+            delta = json.loads(payload)["choices"][0].get("delta", {})
+            token = delta.get("content")
+            if token:
+                yield token
+    except LLMClientError as e:
+        logger.error(f"Mistral API request failed: {e}")
+        raise Exception(f"Failed to get response from AI service: {str(e)}")
+    except (KeyError, IndexError, ValueError) as e:
+        logger.error(f"Unexpected API response format: {e}")
+        raise Exception("Received unexpected response from AI service")
+    # Mistral ends every stream with [DONE]; without it the answer was cut off
+    logger.error("Mistral API stream ended before [DONE]")
+    raise Exception("AI service response was cut off")
+
 def validate_environment():
     """Validate that all required environment variables are set."""
     required_vars = ["MISTRAL_API_KEY"]
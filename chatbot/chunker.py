@@ -0,0 +1,202 @@
+import os
+import re
+
+from embeddings import get_embedding_service
+
+# all-MiniLM-L6-v2 embeds at most 256 tokens including [CLS] and [SEP];
+# anything longer is silently truncated by the model.
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "254"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "48"))
+
+HEADERS = [("#", "H1"), ("##", "H2"), ("###", "H3")]
+
+# Coarsest to finest; text is split on the first level that breaks it up
+_SEPARATORS = [
+    (re.compile(r"\n\s*\n"), "\n\n"),
+    (re.compile(r"\n"), "\n"),
+    (re.compile(r"(?<=[.!?])\s+"), " "),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def _headings(metadata):
+    return [metadata[key] for _, key in HEADERS if metadata.get(key)]
+
+
+class Chunker:
+    """Markdown chunker that keeps every chunk inside the embedding window.
+
+    Documents are split on headers first. Sections over ``max_tokens`` are
+    split recursively on blank lines, lines, sentences and finally words,
+    and the pieces are packed back together up to ``max_tokens`` with
+    ``overlap`` tokens carried over between consecutive chunks. Afterwards,
+    neighbouring chunks of the same file are merged while either is below
+    ``min_tokens`` and the result still fits.
+    """
+
+    def __init__(self, max_tokens=CHUNK_MAX_TOKENS, overlap=CHUNK_OVERLAP_TOKENS,
+                 min_tokens=CHUNK_MIN_TOKENS):
+        if overlap >= max_tokens:
+            raise ValueError("overlap must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.min_tokens = min_tokens
+
+    def settings(self):
+        return {"max_tokens": self.max_tokens, "overlap": self.overlap, "min_tokens": self.min_tokens}
+
+    def count(self, texts):
+        return get_embedding_service().count_tokens_batch(texts)
+
+    # ----------------------------------------------------------------
+    # Public API
+    # ----------------------------------------------------------------
+    def chunk(self, documents):
+        """Split ``documents`` into chunks; each gets a ``tokens`` metadata field."""
+        sections = self.split_sections(documents)
+        chunks = self.fit(sections)
+        return self.merge_small(chunks)
+
+    def split_sections(self, documents):
+        from langchain.text_splitter import MarkdownHeaderTextSplitter
+
+        splitter = MarkdownHeaderTextSplitter(headers_to_split_on=HEADERS)
+        sections = []
+        for doc in documents:
+            for section in splitter.split_text(doc.page_content):
+                headings = _headings(section.metadata)
+                section.metadata["source_file"] = doc.metadata.get("source", "unknown_file.md")
+                section.metadata["section"] = headings[-1] if headings else "General"
+                sections.append(section)
+        return sections
+
+    def fit(self, sections):
+        """Recursively split every section that is over the token budget."""
+        sizes = self.count([s.page_content for s in sections])
+        chunks = []
+        for section, size in zip(sections, sizes):
+            if size <= self.max_tokens:
+                section.metadata["tokens"] = size
+                chunks.append(section)
+                continue
+            for text, tokens in self._split(section.page_content, 0):
+                piece = section.copy()
+                piece.metadata = dict(section.metadata, tokens=tokens)
+                piece.page_content = text
+                chunks.append(piece)
+        return chunks
+
+    def merge_small(self, chunks):
+        """Merge undersized neighbours from the same file while they fit."""
+        merged = []
+        for chunk in chunks:
+            prev = merged[-1] if merged else None
+            if prev is None or prev.metadata["source_file"] != chunk.metadata["source_file"]:
+                merged.append(chunk)
+                continue
+            size = chunk.metadata["tokens"]
+            if prev.metadata["tokens"] >= self.min_tokens and size >= self.min_tokens:
+                merged.append(chunk)
+                continue
+
+            # keep the heading of the absorbed section, since it leaves the metadata
+            prev_headings, headings = _headings(prev.metadata), _headings(chunk.metadata)
+            label = headings[-1] if headings and headings != prev_headings else None
+            text = f"{label}\n{chunk.page_content}" if label else chunk.page_content
+            joined = f"{prev.page_content}\n\n{text}"
+            tokens = self.count([joined])[0]
+            if tokens > self.max_tokens:
+                merged.append(chunk)
+                continue
+
+            common = {}
+            for (_, key), a, b in zip(HEADERS, prev_headings, headings):
+                if a != b:
+                    break
+                common[key] = a
+            metadata = {k: v for k, v in prev.metadata.items() if k not in dict(HEADERS).values()}
+            metadata.update(common, tokens=tokens)
+            metadata["section"] = list(common.values())[-1] if common else "General"
+            prev.page_content = joined
+            prev.metadata = metadata
+        return merged
+
+    # ----------------------------------------------------------------
+    # Recursive splitting
+    # ----------------------------------------------------------------
+    def _split(self, text, level):
+        """Return ``[(text, tokens), ...]`` pieces of ``text`` that fit the budget."""
+        if level >= len(_SEPARATORS):
+            return self._split_chars(text)
+        pattern, joiner = _SEPARATORS[level]
+        units = [u.strip() for u in pattern.split(text) if u.strip()]
+        if len(units) <= 1:
+            return self._split(text, level + 1)
+
+        pieces = []
+        for unit, size in zip(units, self.count(units)):
+            if size > self.max_tokens:
+                pieces.extend(self._split(unit, level + 1))
+            else:
+                pieces.append((unit, size))
+        return self._pack(pieces, joiner)
+
+    def _split_chars(self, text):
+        """Last resort for a single "word" over the budget: halve it."""
+        size = self.count([text])[0]
+        if size <= self.max_tokens or len(text) < 2:
+            return [(text, size)]
+        mid = len(text) // 2
+        return self._split_chars(text[:mid]) + self._split_chars(text[mid:])
+
+    def _pack(self, pieces, joiner):
+        """Greedily join pieces up to ``max_tokens`` with trailing overlap.
+
+        Piece sizes are summed rather than re-counted; word-level tokenizers
+        never merge tokens across whitespace, so the sum is exact.
+        """
+        chunks, current, size = [], [], 0
+        for text, tokens in pieces:
+            if current and size + tokens > self.max_tokens:
+                chunks.append((joiner.join(t for t, _ in current), size))
+                carry, carried = [], 0
+                for prev_text, prev_tokens in reversed(current):
+                    if carried + prev_tokens > self.overlap or \
+                            carried + prev_tokens + tokens > self.max_tokens:
+                        break
+                    carry.insert(0, (prev_text, prev_tokens))
+                    carried += prev_tokens
+                current, size = carry, carried
+            current.append((text, tokens))
+            size += tokens
+        if current:
+            chunks.append((joiner.join(t for t, _ in current), size))
+        return chunks
+
+
+def chunk_size_stats(sizes, max_tokens=CHUNK_MAX_TOKENS):
+    """Count, percentiles and a power-of-two histogram of chunk token sizes."""
+    sizes = sorted(sizes)
+    if not sizes:
+        return {"chunks": 0}
+
+    def pct(p):
+        return sizes[min(len(sizes) - 1, int(p / 100 * len(sizes)))]
+
+    histogram, low, high = {}, 0, 16
+    while low < max(max_tokens, sizes[-1]):
+        histogram[f"{low + 1}-{high}"] = sum(low < s <= high for s in sizes)
+        low, high = high, high * 2
+    return {
+        "chunks": len(sizes),
+        "total_tokens": sum(sizes),
+        "min": sizes[0],
+        "max": sizes[-1],
+        "mean": round(sum(sizes) / len(sizes), 1),
+        "p50": pct(50),
+        "p90": pct(90),
+        "p99": pct(99),
+        "over_budget": sum(s > max_tokens for s in sizes),
+        "histogram": histogram,
+    }
@@ -13,7 +13,8 @@ class Config:
     
     # Vector Store Configuration
     VECTOR_DIR = os.getenv("VECTOR_DIR", "govconnect_nic")
-    EMBED_MODEL = os.getenv("EMBED_MODEL", "BAAI/bge-base-en-v1.5")
+    # Must match the model the FAISS index was built with (384-d MiniLM)
+    EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
     DATA_DIR = os.getenv("DATA_DIR", "data")
     MAX_TOKENS = int(os.getenv("MAX_TOKENS", "1024"))
     
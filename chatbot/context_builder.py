@@ -0,0 +1,142 @@
+import os
+import re
+import threading
+from pathlib import Path
+
+from embeddings import get_embedding_service
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.85"))
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def chunk_label(doc):
+    """Short "file > heading > subheading" label for a retrieved chunk."""
+    meta = doc.metadata or {}
+    source = meta.get("source_file") or meta.get("source") or ""
+    parts = [Path(source).stem] if source else []
+    headings = [meta[h] for h in ("H1", "H2", "H3") if meta.get(h)]
+    if not headings and meta.get("section") not in (None, "", "General"):
+        headings = [meta["section"]]
+    # the H1 usually repeats the file name
+    if parts and headings and headings[0].lower() == parts[0].lower():
+        headings = headings[1:]
+    return " > ".join(parts + headings) or "Knowledge base"
+
+
+def _shingles(text):
+    return set(_WORD_RE.findall(text.lower()))
+
+
+def _similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _truncate(text, max_tokens, count_tokens):
+    """Cut ``text`` at a word boundary so it fits in ``max_tokens``."""
+    words = text.split()
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(" ".join(words[:mid])) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(words[:lo])
+
+
+class AssembledContext:
+    """Prompt-ready context plus what was kept and dropped to build it."""
+
+    def __init__(self, text, tokens, used, duplicates, over_budget):
+        self.text = text
+        self.tokens = tokens
+        self.used = used
+        self.duplicates = duplicates
+        self.over_budget = over_budget
+
+    def __str__(self):
+        return self.text
+
+
+class ContextAssembler:
+    """Turns retrieved chunks into a compact, de-duplicated, budgeted context.
+
+    Chunks are taken in retrieval order. Exact and near-duplicate chunks
+    (word-set Jaccard >= ``duplicate_threshold``) are skipped, and chunks
+    are added until ``token_budget`` tokens of the shared embedding tokenizer
+    are used; the first chunk is truncated rather than dropped.
+    """
+
+    def __init__(self, token_budget=CONTEXT_TOKEN_BUDGET,
+                 duplicate_threshold=DUPLICATE_THRESHOLD, count_tokens=None):
+        self.token_budget = token_budget
+        self.duplicate_threshold = duplicate_threshold
+        self._count_tokens = count_tokens
+        self._lock = threading.Lock()
+        self._totals = {
+            "requests": 0,
+            "chunks_in": 0,
+            "chunks_used": 0,
+            "duplicates_dropped": 0,
+            "over_budget_dropped": 0,
+            "context_tokens": 0,
+            "prompt_tokens": 0,
+        }
+
+    def count_tokens(self, text):
+        if self._count_tokens is not None:
+            return self._count_tokens(text)
+        return get_embedding_service().count_tokens(text)
+
+    def assemble(self, docs):
+        blocks, seen, used = [], [], 0
+        duplicates = over_budget = 0
+        for doc in docs:
+            content = " ".join(doc.page_content.split())
+            if not content:
+                continue
+            words = _shingles(content)
+            if any(_similarity(words, other) >= self.duplicate_threshold for other in seen):
+                duplicates += 1
+                continue
+
+            header = f"[{len(blocks) + 1}] {chunk_label(doc)}"
+            cost = self.count_tokens(f"{header}\n{content}")
+            remaining = self.token_budget - used
+            if cost > remaining:
+                if blocks:
+                    over_budget += 1
+                    continue
+                content = _truncate(content, remaining - self.count_tokens(header) - 1,
+                                    self.count_tokens)
+                cost = self.count_tokens(f"{header}\n{content}")
+            seen.append(words)
+            blocks.append(f"{header}\n{content}")
+            used += cost
+
+        return AssembledContext("\n\n".join(blocks), used, len(blocks), duplicates, over_budget)
+
+    def record(self, context, prompt_tokens, chunks_in):
+        """Accumulate per-request totals for :meth:`stats`."""
+        with self._lock:
+            t = self._totals
+            t["requests"] += 1
+            t["chunks_in"] += chunks_in
+            t["chunks_used"] += context.used
+            t["duplicates_dropped"] += context.duplicates
+            t["over_budget_dropped"] += context.over_budget
+            t["context_tokens"] += context.tokens
+            t["prompt_tokens"] += prompt_tokens
+
+    def stats(self):
+        with self._lock:
+            totals = dict(self._totals)
+        n = totals["requests"]
+        totals["token_budget"] = self.token_budget
+        totals["avg_context_tokens"] = round(totals["context_tokens"] / n, 1) if n else 0.0
+        totals["avg_prompt_tokens"] = round(totals["prompt_tokens"] / n, 1) if n else 0.0
+        return totals
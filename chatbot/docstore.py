@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Pickle-free, on-disk docstore for the FAISS vector store.
+
+Chunk text and metadata live in an SQLite file next to ``index.faiss``,
+keyed by docstore id, together with the FAISS position -> id map. Serving
+processes open it read-only and fetch rows only for the top-k hits, so
+startup cost and resident memory do not grow with the corpus.
+
+Usage:
+    python docstore.py convert govconnect_nic   # legacy index.pkl -> docstore.sqlite
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from collections.abc import Mapping
+
+DOCSTORE_NAME = "docstore.sqlite"
+LEGACY_DOCSTORE_NAME = "index.pkl"
+
+_SCHEMA = """
+CREATE TABLE docs (
+    id TEXT PRIMARY KEY,
+    page_content TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE positions (
+    pos INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL
+);
+"""
+
+
+class StaleDocstoreError(RuntimeError):
+    """The docstore file was replaced after the store using it was opened."""
+
+
+class ReadOnlyDocstoreError(RuntimeError):
+    """A serving docstore was asked to change; updates go through the indexer."""
+
+
+class _Reader:
+    """Per-thread, per-process read-only connections to one SQLite file.
+
+    The file is pinned when the reader is created: connections opened later
+    (by a new thread or a forked worker) must find the same inode, otherwise
+    the FAISS index loaded next to it belongs to another build and its
+    positions would map to the wrong documents. Reload the store instead.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._identity = self._stat()
+        self.connect()
+
+    def _stat(self):
+        st = os.stat(self.path)
+        return st.st_dev, st.st_ino
+
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            if self._stat() != self._identity:
+                conn.close()
+                raise StaleDocstoreError(f"{self.path} was replaced since the store was opened")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+class SQLiteDocstore:
+    """Read-only LangChain docstore that loads each document on demand.
+
+    Implements the ``Docstore`` interface (``search``/``add``/``delete``)
+    without subclassing it, so importing this module stays cheap.
+    """
+
+    def __init__(self, path, reader=None):
+        self.path = Path(path)
+        self._reader = reader or _Reader(path)
+
+    def search(self, search):
+        from langchain_core.documents import Document
+
+        row = self._reader.connect().execute(
+            "SELECT page_content, metadata FROM docs WHERE id = ?", (search,)
+        ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts):
+        raise ReadOnlyDocstoreError("SQLiteDocstore is read-only; use the indexer to update it")
+
+    def delete(self, ids):
+        raise ReadOnlyDocstoreError("SQLiteDocstore is read-only; use the indexer to update it")
+
+    def __len__(self):
+        return self._reader.connect().execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+
+class SQLiteIdMap(Mapping):
+    """FAISS position -> docstore id, looked up per hit instead of held in memory."""
+
+    def __init__(self, path, reader=None):
+        self._reader = reader or _Reader(path)
+
+    def __getitem__(self, pos):
+        row = self._reader.connect().execute(
+            "SELECT doc_id FROM positions WHERE pos = ?", (int(pos),)
+        ).fetchone()
+        if row is None:
+            raise KeyError(pos)
+        return row[0]
+
+    def __iter__(self):
+        for (pos,) in self._reader.connect().execute("SELECT pos FROM positions ORDER BY pos"):
+            yield pos
+
+    def __len__(self):
+        return self._reader.connect().execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+    def values(self):
+        return [doc_id for (doc_id,) in self._reader.connect().execute(
+            "SELECT doc_id FROM positions ORDER BY pos"
+        )]
+
+
+def write_docstore(path, docstore, index_to_docstore_id):
+    """Write every document referenced by ``index_to_docstore_id`` to a new file."""
+    path = Path(path)
+    path.unlink(missing_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.executescript(_SCHEMA)
+            rows = []
+            for doc_id in index_to_docstore_id.values():
+                doc = docstore.search(doc_id)
+                rows.append((doc_id, doc.page_content,
+                             json.dumps(doc.metadata, ensure_ascii=False, default=str)))
+            conn.executemany("INSERT INTO docs VALUES (?, ?, ?)", rows)
+            conn.executemany(
+                "INSERT INTO positions VALUES (?, ?)",
+                ((int(pos), doc_id) for pos, doc_id in index_to_docstore_id.items()),
+            )
+    finally:
+        conn.close()
+
+
+def read_all(path):
+    """Load a docstore file fully into memory, for the indexer to modify."""
+    from langchain_core.documents import Document
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        docs = {
+            doc_id: Document(id=doc_id, page_content=text, metadata=json.loads(meta))
+            for doc_id, text, meta in conn.execute("SELECT id, page_content, metadata FROM docs")
+        }
+        ids = dict(conn.execute("SELECT pos, doc_id FROM positions"))
+    finally:
+        conn.close()
+    return InMemoryDocstore(docs), ids
+
+
+def read_legacy(vector_dir):
+    """Unpickle a LangChain ``index.pkl``. Only for trusted, locally built stores."""
+    import pickle
+    with open(Path(vector_dir, LEGACY_DOCSTORE_NAME), "rb") as f:
+        return pickle.load(f)
+
+
+def open_docstore(path):
+    """``(docstore, index_to_docstore_id)`` over one pinned SQLite file."""
+    reader = _Reader(path)
+    return SQLiteDocstore(path, reader), SQLiteIdMap(path, reader)
+
+
+def has_docstore(vector_dir):
+    return Path(vector_dir, DOCSTORE_NAME).exists()
+
+
+def convert_legacy(vector_dir):
+    """Write ``docstore.sqlite`` from the pickled docstore; returns document count."""
+    docstore, index_to_docstore_id = read_legacy(vector_dir)
+    tmp = Path(vector_dir, f".{DOCSTORE_NAME}.tmp")
+    write_docstore(tmp, docstore, index_to_docstore_id)
+    os.replace(tmp, Path(vector_dir, DOCSTORE_NAME))
+    return len(index_to_docstore_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="Convert a legacy index.pkl to docstore.sqlite")
+    convert.add_argument("vector_dir")
+    args = parser.parse_args()
+
+    count = convert_legacy(args.vector_dir)
+    print(f"Wrote {count} documents to {Path(args.vector_dir, DOCSTORE_NAME)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import os
+import threading
+
+import numpy as np
+
+from cache import TTLCache
+
+EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+
+
+def normalize_query(text):
+    """Cache key for a query: case- and whitespace-insensitive."""
+    return " ".join(text.lower().split())
+
+
+class EmbeddingService:
+    """Single, lazily loaded embedding model and tokenizer for the process.
+
+    Used for indexing, querying and token counting so there is exactly one
+    copy of the transformer in memory. Query embeddings are memoized in an
+    LRU keyed on the normalized query text, so repeated questions skip the
+    forward pass entirely.
+
+    It is registered as a virtual subclass of LangChain's ``Embeddings``
+    on first construction rather than inheriting from it, so importing
+    this module does not pull in langchain_core.
+    """
+
+    def __init__(self, model_name=EMBED_MODEL, cache_size=EMBED_CACHE_SIZE):
+        from langchain_core.embeddings import Embeddings
+        Embeddings.register(EmbeddingService)
+
+        self.model_name = model_name
+        self.query_cache = TTLCache(maxsize=cache_size)
+        self._model = None
+        self._tokenizer = None
+        self._tokenizer_failed = False
+        self._lock = threading.Lock()
+
+    # ----------------------------------------------------------------
+    # Lazy resources
+    # ----------------------------------------------------------------
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from langchain_huggingface import HuggingFaceEmbeddings
+                    print(f"[DEBUG] Loading embedding model {self.model_name}...")
+                    self._model = HuggingFaceEmbeddings(model_name=self.model_name)
+        return self._model
+
+    @property
+    def tokenizer(self):
+        """The model's tokenizer, or ``None`` if it could not be loaded."""
+        if self._tokenizer is None and not self._tokenizer_failed:
+            with self._lock:
+                if self._tokenizer is None and not self._tokenizer_failed:
+                    try:
+                        from transformers import AutoTokenizer
+                        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                    except Exception as e:
+                        print(f"Warning: Could not load tokenizer: {e}")
+                        self._tokenizer_failed = True
+        return self._tokenizer
+
+    # ----------------------------------------------------------------
+    # Embeddings interface
+    # ----------------------------------------------------------------
+    def embed_documents(self, texts):
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text):
+        key = normalize_query(text)
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            return cached.tolist()
+        vector = self.model.embed_query(text)
+        self.query_cache.set(key, np.asarray(vector, dtype=np.float32))
+        return vector
+
+    # ----------------------------------------------------------------
+    # Tokens
+    # ----------------------------------------------------------------
+    def count_tokens(self, text):
+        """Token count under the embedding tokenizer (word count as a fallback)."""
+        tokenizer = self.tokenizer
+        if tokenizer is None:
+            return len(text.split())
+        return len(tokenizer.encode(text, add_special_tokens=False, truncation=False))
+
+    def count_tokens_batch(self, texts):
+        """``count_tokens`` for many texts with a single tokenizer call."""
+        texts = list(texts)
+        tokenizer = self.tokenizer
+        if tokenizer is None:
+            return [len(text.split()) for text in texts]
+        if not texts:
+            return []
+        ids = tokenizer(texts, add_special_tokens=False, truncation=False)["input_ids"]
+        return [len(i) for i in ids]
+
+    # ----------------------------------------------------------------
+    # Reporting
+    # ----------------------------------------------------------------
+    def model_bytes(self):
+        if self._model is None:
+            return 0
+        client = getattr(self._model, "_client", None) or getattr(self._model, "client", None)
+        if client is None or not hasattr(client, "parameters"):
+            return None
+        return sum(p.numel() * p.element_size() for p in client.parameters())
+
+    def stats(self):
+        cache = self.query_cache.stats()
+        # float32 vectors; bookkeeping overhead is small next to the payload
+        cache["approx_bytes"] = sum(v.nbytes for v in self.query_cache.values())
+        return {
+            "model": self.model_name,
+            "model_loaded": self._model is not None,
+            "tokenizer_loaded": self._tokenizer is not None,
+            "model_bytes": self.model_bytes(),
+            "query_cache": cache,
+        }
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service():
+    """Return the process-wide :class:`EmbeddingService`."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+    return _service
@@ -0,0 +1,99 @@
+import math
+from bisect import bisect_left
+from datetime import datetime
+
+import numpy as np
+
+FEATURE_COLUMNS = [
+    "num_documents", "day_of_week", "hour_of_day",
+    "is_weekend", "task_freq", "queue_bucket",
+]
+
+
+def build_features(df, task_freq_map, queue_bins):
+    """Run the feature pipeline over every row of ``df`` in one vectorized pass."""
+    import pandas as pd
+
+    # per element, as the one-row-at-a-time original did: "09:30" and
+    # "09:30:00" may share a batch
+    appointment_datetime = pd.to_datetime(
+        df["appointment_date"].astype(str) + " " + df["appointment_time"].astype(str),
+        format="mixed",
+    )
+    features = pd.DataFrame(index=df.index)
+    features["num_documents"] = df["num_documents"]
+    features["day_of_week"] = appointment_datetime.dt.dayofweek
+    features["hour_of_day"] = appointment_datetime.dt.hour
+    features["is_weekend"] = features["day_of_week"].isin([5, 6]).astype(int)
+
+    features["task_freq"] = df["task_id"].map(task_freq_map).fillna(0)
+
+    if queue_bins:
+        features["queue_bucket"] = pd.cut(
+            df["queue_number"], bins=queue_bins,
+            labels=False, include_lowest=True
+        )
+    else:
+        features["queue_bucket"] = 0
+
+    return features[FEATURE_COLUMNS]
+
+
+class FeatureEncoder:
+    """Pandas-free encoder for a single booking.
+
+    Produces the same feature vector as ``build_features`` for one row:
+    plain ``datetime`` parsing instead of ``pd.to_datetime``, a dict lookup
+    instead of ``Series.map`` and a bisect over ``queue_bins`` instead of
+    ``pd.cut(labels=False, include_lowest=True)``. Inputs it cannot handle
+    raise ``ValueError``/``TypeError``/``KeyError`` so callers can fall back
+    to the pandas path.
+    """
+
+    def __init__(self, task_freq_map, queue_bins):
+        self.task_freq = {k: float(v) for k, v in (task_freq_map or {}).items()}
+        self.queue_bins = [float(b) for b in queue_bins] if queue_bins else None
+
+    def queue_bucket(self, queue_number):
+        """Mirror ``pd.cut``: right-closed bins, first bin closed on the left."""
+        if not self.queue_bins:
+            return 0
+        bins = self.queue_bins
+        x = float(queue_number)
+        if math.isnan(x) or x < bins[0] or x > bins[-1]:
+            return math.nan
+        if x == bins[0]:
+            return 0
+        return bisect_left(bins, x) - 1
+
+    def encode(self, data: dict):
+        """Return the feature vector for one booking in ``FEATURE_COLUMNS`` order."""
+        date = data["appointment_date"]
+        time = data["appointment_time"]
+        if not isinstance(date, str) or not isinstance(time, str):
+            raise TypeError("appointment_date and appointment_time must be strings")
+        appointment = datetime.fromisoformat(f"{date} {time}")
+
+        day_of_week = appointment.weekday()
+        return [
+            float(data["num_documents"]),
+            day_of_week,
+            appointment.hour,
+            int(day_of_week in (5, 6)),
+            self.task_freq.get(data["task_id"], 0.0),
+            self.queue_bucket(data["queue_number"]),
+        ]
+
+
+def feature_key(row):
+    """Hashable cache key for an encoded row; NaN buckets collapse to ``None``."""
+    return tuple(None if isinstance(v, float) and math.isnan(v) else v for v in row)
+
+
+def predict_rows(model, rows):
+    """Predict on already-encoded rows, skipping sklearn's input validation."""
+    X = np.asarray(rows, dtype=np.float64)
+    booster = getattr(model, "booster_", None)
+    if booster is not None:
+        return booster.predict(X)
+    return model.predict(X)
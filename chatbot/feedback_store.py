@@ -0,0 +1,152 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+FEEDBACK_DB = os.getenv("FEEDBACK_DB", "feedback.db")
+LEGACY_FEEDBACK_JSON = "feedback.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    rating,
+    message TEXT,
+    bot_response TEXT,
+    user_query TEXT,
+    user_ip TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON feedback (timestamp);
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    applied_at TEXT NOT NULL
+);
+"""
+
+_COLUMNS = ("timestamp", "rating", "message", "bot_response", "user_query", "user_ip")
+
+
+def _row(entry):
+    """Column values for an entry; non-scalar JSON values are stored as text."""
+    values = []
+    for column in _COLUMNS:
+        value = entry.get(column, "")
+        if not isinstance(value, (str, int, float, type(None))):
+            value = json.dumps(value, ensure_ascii=False)
+        values.append(value)
+    return tuple(values)
+
+
+class FeedbackStore:
+    """Append-only feedback log in an embedded SQLite database.
+
+    Each submission is a single-row INSERT, so appends cost the same no
+    matter how much feedback has been collected. WAL mode lets readers run
+    alongside the writer, and SQLite's file locking keeps concurrent
+    threads and worker processes from losing entries.
+    """
+
+    def __init__(self, path=FEEDBACK_DB):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        # a connection inherited across fork() must not be reused
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ----------------------------------------------------------------
+    # Writes
+    # ----------------------------------------------------------------
+    def add(self, entry):
+        """Append one feedback entry and return its id."""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                f"INSERT INTO feedback ({', '.join(_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                _row(entry),
+            )
+        return cursor.lastrowid
+
+    def migrate_json(self, json_path=LEGACY_FEEDBACK_JSON):
+        """Import the legacy ``feedback.json`` array once; returns rows imported."""
+        if not os.path.exists(json_path):
+            return 0
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            done = conn.execute(
+                "SELECT 1 FROM migrations WHERE name = ?", (json_path,)
+            ).fetchone()
+            if done:
+                return 0
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                entries = []
+            conn.executemany(
+                f"INSERT INTO feedback ({', '.join(_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                [_row(e) for e in entries if isinstance(e, dict)],
+            )
+            conn.execute(
+                "INSERT INTO migrations (name, applied_at) VALUES (?, ?)",
+                (json_path, datetime.now().isoformat()),
+            )
+        return len(entries)
+
+    # ----------------------------------------------------------------
+    # Reads
+    # ----------------------------------------------------------------
+    def page(self, page=1, per_page=50):
+        """Newest-first page of feedback entries plus the total count.
+
+        ``user_ip`` is stored for abuse handling but never returned.
+        """
+        page = max(1, page)
+        per_page = max(1, min(per_page, 500))
+        conn = self._connect()
+        total = conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+        rows = conn.execute(
+            "SELECT id, timestamp, rating, message, bot_response, user_query "
+            "FROM feedback ORDER BY id DESC LIMIT ? OFFSET ?",
+            (per_page, (page - 1) * per_page),
+        ).fetchall()
+        return {
+            "items": [dict(r) for r in rows],
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+        }
+
+    def summary(self, days=30):
+        """Totals, average numeric rating, rating distribution and daily counts."""
+        conn = self._connect()
+        total, average = conn.execute(
+            "SELECT COUNT(*), AVG(CASE WHEN typeof(rating) IN ('integer', 'real') "
+            "THEN rating END) FROM feedback"
+        ).fetchone()
+        distribution = conn.execute(
+            "SELECT rating, COUNT(*) AS n FROM feedback GROUP BY rating ORDER BY rating"
+        ).fetchall()
+        daily = conn.execute(
+            "SELECT substr(timestamp, 1, 10) AS day, COUNT(*) AS n FROM feedback "
+            "GROUP BY day ORDER BY day DESC LIMIT ?",
+            (days,),
+        ).fetchall()
+        return {
+            "total": total,
+            "average_rating": round(average, 3) if average is not None else None,
+            "ratings": {str(r["rating"]): r["n"] for r in distribution},
+            "daily": {r["day"]: r["n"] for r in reversed(daily)},
+        }
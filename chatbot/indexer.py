@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Incremental knowledge-base indexer.
+
+Keeps a manifest of per-file content hashes and chunk IDs next to the FAISS
+index, so only added or changed markdown files are re-embedded and the
+vectors of removed files are deleted. Each update is written to a new,
+immutable build directory and published by atomically replacing the
+manifest, which names the build; running services watch the manifest to
+hot-swap.
+
+Files are parsed and chunked (see chunker.py) in a process pool, and
+chunks are embedded in fixed-size batches as parsing proceeds. The report includes per-stage timings and a checksum of
+the indexed chunks that is stable across runs over the same inputs.
+
+Usage:
+    python indexer.py                 # update VECTOR_DIR from DATA_DIR
+    python indexer.py --rebuild       # ignore the manifest and re-embed everything
+    python indexer.py --workers 8 --batch-size 128
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from chatbot_core import DATA_DIR, VECTOR_DIR, chunker, split_documents
+from chunker import chunk_size_stats
+from vector_index import (
+    ANN_INDEX_NAME, INDEX_PARAMS, INDEX_TYPE, INDEX_TYPES, MANIFEST_NAME, PARAMS_NAME,
+    load_mutable_store, open_store, save_store, store_dir, write_ann_index,
+)
+from docstore import DOCSTORE_NAME, LEGACY_DOCSTORE_NAME, has_docstore
+from embeddings import EMBED_MODEL, get_embedding_service
+from telemetry import record_ingest
+
+# 3: file keys are relative to the data directory
+MANIFEST_VERSION = 3
+BUILD_PREFIX = "build-"
+# Builds always kept on disk: the current one and the one it replaced
+INDEX_KEEP_BUILDS = int(os.getenv("INDEX_KEEP_BUILDS", "2"))
+# Older builds are deleted once superseded for longer than the services'
+# reload interval plus this grace, so no process is still reading them
+VECTOR_RELOAD_INTERVAL = float(os.getenv("VECTOR_RELOAD_INTERVAL", "10"))
+INDEX_PRUNE_GRACE = float(os.getenv("INDEX_PRUNE_GRACE", "60"))
+INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", str(min(4, os.cpu_count() or 1))))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+_update_lock = threading.Lock()
+
+
+# -------------------------------------------------------------------
+# Manifest
+# -------------------------------------------------------------------
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan_data_dir(data_dir):
+    """Map every markdown file under ``data_dir`` to its content hash.
+
+    Keys are POSIX paths relative to ``data_dir``, so the manifest does not
+    depend on how the directory was spelled on the command line.
+    """
+    files = {}
+    for path in sorted(Path(data_dir).rglob("*.md")):
+        relative = path.relative_to(data_dir)
+        if any(part.startswith(".") for part in relative.parts):
+            continue
+        files[relative.as_posix()] = file_sha256(path)
+    return files
+
+
+def manifest_path(vector_dir):
+    return Path(vector_dir, MANIFEST_NAME)
+
+
+def _relative_keys(files, data_dir):
+    """Re-key a version 2 manifest, whose keys are paths as given, relative to ``data_dir``."""
+    root = Path(data_dir).resolve()
+    rekeyed = {}
+    for key, entry in files.items():
+        try:
+            rekeyed[Path(key).resolve().relative_to(root).as_posix()] = entry
+        except ValueError:
+            # outside data_dir: reported as removed
+            rekeyed[key] = entry
+    return rekeyed
+
+
+def load_manifest(vector_dir, data_dir=None):
+    """Return the manifest, or ``None`` if missing or built with another model/chunking.
+
+    Version 2 manifests are upgraded in memory when ``data_dir`` is given.
+    """
+    path = manifest_path(vector_dir)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") == 2 and data_dir is not None:
+        manifest["files"] = _relative_keys(manifest.get("files", {}), data_dir)
+        manifest["version"] = MANIFEST_VERSION
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("embed_model") != EMBED_MODEL:
+        return None
+    if manifest.get("chunking") != chunker.settings():
+        return None
+    return manifest
+
+
+def chunk_ids(path, sha, count):
+    """Deterministic vector IDs for the chunks of one file revision."""
+    prefix = hashlib.sha256(f"{path}\0{sha}".encode("utf-8")).hexdigest()[:16]
+    return [f"{prefix}-{i:04d}" for i in range(count)]
+
+
+def index_checksum(db):
+    """SHA-256 over every indexed chunk's id, text and metadata, in id order."""
+    digest = hashlib.sha256()
+    for doc_id in sorted(db.index_to_docstore_id.values()):
+        doc = db.docstore.search(doc_id)
+        digest.update(json.dumps(
+            [doc_id, doc.page_content, doc.metadata],
+            sort_keys=True, ensure_ascii=False, default=str,
+        ).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# -------------------------------------------------------------------
+# Pipeline stages
+# -------------------------------------------------------------------
+def parse_file(path):
+    """Load and chunk one markdown file; runs in a worker process."""
+    from langchain_community.document_loaders import UnstructuredMarkdownLoader
+    start = time.perf_counter()
+    chunks = split_documents(UnstructuredMarkdownLoader(path).load(), verbose=False)
+    return path, chunks, time.perf_counter() - start
+
+
+def load_file_chunks(path):
+    _, chunks, _ = parse_file(path)
+    return chunks
+
+
+def iter_parsed(paths, workers=INDEX_WORKERS):
+    """Yield ``parse_file`` results in input order, parsing ahead in a pool.
+
+    The pool forks, so multi-threaded callers (the API) must pass ``workers=1``.
+    """
+    if workers <= 1 or len(paths) < 2:
+        for path in paths:
+            yield parse_file(path)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        yield from pool.map(parse_file, paths)
+
+
+class _Timer:
+    def __init__(self):
+        self.seconds = {}
+
+    def add(self, stage, start):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + time.perf_counter() - start
+
+    def report(self):
+        return {stage: round(s, 3) for stage, s in self.seconds.items()}
+
+
+def _embed_batch(db, batch, embeddings, timer):
+    """Embed ``[(doc, id), ...]`` in one call and add it to ``db`` (created if None)."""
+    from langchain_community.vectorstores import FAISS
+
+    texts = [doc.page_content for doc, _ in batch]
+    metadatas = [doc.metadata for doc, _ in batch]
+    ids = [doc_id for _, doc_id in batch]
+
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    timer.add("embed", start)
+
+    start = time.perf_counter()
+    pairs = list(zip(texts, vectors))
+    if db is None:
+        db = FAISS.from_embeddings(pairs, embeddings, metadatas=metadatas, ids=ids)
+    else:
+        db.add_embeddings(pairs, metadatas=metadatas, ids=ids)
+    timer.add("index", start)
+    return db
+
+
+# -------------------------------------------------------------------
+# Index update
+# -------------------------------------------------------------------
+def save_atomically(db, vector_dir, manifest, index_type=INDEX_TYPE, index_params=None):
+    """Write ``db`` as a new build and publish it with a single rename.
+
+    The index, docstore and derived index are written to a temp dir that
+    is renamed to ``build-*`` once complete. Nothing is visible to readers
+    until ``manifest.json``, now naming that build, replaces the old one, so
+    a crash at any point leaves the previous build served intact. Returns
+    the served index's record (see :func:`vector_index.write_ann_index`).
+    """
+    vector_dir = Path(vector_dir)
+    vector_dir.mkdir(parents=True, exist_ok=True)
+    build = f"{BUILD_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    tmp_dir = Path(tempfile.mkdtemp(prefix=".build-", dir=vector_dir))
+    try:
+        os.chmod(tmp_dir, 0o755)
+        save_store(db, tmp_dir)
+        record, _ = write_ann_index(db, tmp_dir, index_type, index_params)
+        os.replace(tmp_dir, vector_dir / build)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    manifest["index"] = record
+    manifest["build"] = build
+    fd, tmp_manifest = tempfile.mkstemp(prefix=".manifest-", dir=vector_dir)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_manifest, 0o644)
+        os.replace(tmp_manifest, vector_dir / MANIFEST_NAME)
+    except BaseException:
+        Path(tmp_manifest).unlink(missing_ok=True)
+        raise
+    prune_builds(vector_dir, build)
+    return record
+
+
+def prune_builds(vector_dir, current, keep=INDEX_KEEP_BUILDS, min_age=None):
+    """Delete superseded builds and leftovers of crashed updates.
+
+    The ``keep`` newest builds always stay. An older build is deleted only
+    once the build that replaced it is ``min_age`` seconds old (by default
+    the reload interval plus ``INDEX_PRUNE_GRACE``). Files of the unversioned
+    layout count as the oldest build. Temp dirs are only removed after an
+    hour, as another worker may be writing one.
+    """
+    if min_age is None:
+        min_age = VECTOR_RELOAD_INTERVAL + INDEX_PRUNE_GRACE
+    vector_dir = Path(vector_dir)
+    builds = sorted(p.name for p in vector_dir.glob(BUILD_PREFIX + "*") if p.is_dir())
+    now = time.time()
+
+    def superseded_long_ago(successor):
+        try:
+            return now - (vector_dir / successor).stat().st_mtime > min_age
+        except OSError:
+            return False
+
+    for i, name in enumerate(builds[:-keep] if keep > 0 else []):
+        if name != current and superseded_long_ago(builds[i + 1]):
+            shutil.rmtree(vector_dir / name, ignore_errors=True)
+    if builds and len(builds) >= keep and superseded_long_ago(builds[0]):
+        legacy = [name for name in ("index.faiss", DOCSTORE_NAME, LEGACY_DOCSTORE_NAME,
+                                    ANN_INDEX_NAME, PARAMS_NAME)
+                  if Path(vector_dir, name).exists()]
+        if legacy:
+            print(f"[DEBUG] Removing unversioned index files from {vector_dir}, "
+                  f"superseded by {builds[0]}: {', '.join(legacy)}")
+            for name in legacy:
+                Path(vector_dir, name).unlink(missing_ok=True)
+    cutoff = now - 3600
+    for path in list(vector_dir.glob(".build-*")) + list(vector_dir.glob(".manifest-*")):
+        if path.stat().st_mtime < cutoff:
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+
+def _index_matches(manifest, index_type, index_params):
+    record = manifest.get("index") or {}
+    return record.get("type", "flat") == index_type and record.get("overrides", {}) == (index_params or {})
+
+
+def update_index(data_dir=None, vector_dir=None, rebuild=False,
+                 workers=INDEX_WORKERS, batch_size=EMBED_BATCH_SIZE, progress=None,
+                 index_type=INDEX_TYPE, index_params=None):
+    """Bring the on-disk index in line with ``data_dir``.
+
+    The store on disk is only loaded into memory when files were added,
+    changed or removed (or the index type changed), and the instance being
+    served is never mutated. Returns ``(db, report)``; ``db`` is the store
+    opened for serving (memory-mapped index, lazy SQLite docstore), ready
+    to be swapped in. ``progress``, if given, is called
+    with ``(files_done, files_total, chunks_embedded)`` after each file.
+
+    ``index_type``/``index_params`` select the served FAISS index (see
+    vector_index.py); changing them only rebuilds that index from the flat
+    store, without re-embedding.
+    """
+    if index_params is None:
+        index_params = INDEX_PARAMS
+    data_dir = data_dir or DATA_DIR
+    vector_dir = vector_dir or VECTOR_DIR
+    start = time.perf_counter()
+    timer = _Timer()
+
+    with _update_lock:
+        stage = time.perf_counter()
+        current = scan_data_dir(data_dir)
+        manifest = None if rebuild else load_manifest(vector_dir, data_dir)
+        if manifest is not None and not Path(store_dir(vector_dir), "index.faiss").exists():
+            manifest = None
+        timer.add("scan", stage)
+
+        indexed = manifest["files"] if manifest else {}
+        added = [p for p in current if p not in indexed]
+        changed = [p for p in current if p in indexed and indexed[p]["sha256"] != current[p]]
+        removed = [p for p in indexed if p not in current]
+
+        report = {
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "full_rebuild": manifest is None,
+        }
+        embeddings = get_embedding_service()
+        if manifest is not None and not (added or changed or removed):
+            record = manifest.get("index") or {"type": "flat"}
+            # unversioned and pickled stores are rewritten as a build
+            if not (_index_matches(manifest, index_type, index_params)
+                    and manifest.get("build") and has_docstore(store_dir(vector_dir))):
+                stage = time.perf_counter()
+                db = load_mutable_store(vector_dir, embeddings)
+                timer.add("load", stage)
+                stage = time.perf_counter()
+                manifest.update(updated_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+                record = save_atomically(db, vector_dir, manifest, index_type, index_params)
+                timer.add("save", stage)
+            served = open_store(vector_dir, embeddings)
+            report.update(
+                vectors=served.index.ntotal,
+                index=record,
+                checksum=manifest.get("checksum") or index_checksum(served),
+                timings=timer.report(),
+                seconds=round(time.perf_counter() - start, 3),
+            )
+            record_ingest(report)
+            return served, report
+
+        db = None
+        if manifest is not None:
+            stage = time.perf_counter()
+            db = load_mutable_store(vector_dir, embeddings)
+            timer.add("load", stage)
+        stale_ids = [i for p in changed + removed for i in indexed[p]["ids"]]
+        if db is not None and stale_ids:
+            stage = time.perf_counter()
+            db.delete(stale_ids)
+            timer.add("delete", stage)
+
+        files = {p: indexed[p] for p in current if p in indexed and p not in changed}
+        todo = added + changed
+        pending, embedded, parse_cpu = [], 0, 0.0
+
+        stage = time.perf_counter()
+        parsed = iter_parsed([str(Path(data_dir, p)) for p in todo], workers)
+        for done, (path, (_, chunks, seconds)) in enumerate(zip(todo, parsed), 1):
+            timer.add("parse", stage)
+            parse_cpu += seconds
+
+            ids = chunk_ids(path, current[path], len(chunks))
+            files[path] = {"sha256": current[path], "ids": ids}
+            pending.extend(zip(chunks, ids))
+            while len(pending) >= batch_size:
+                db = _embed_batch(db, pending[:batch_size], embeddings, timer)
+                embedded += batch_size
+                pending = pending[batch_size:]
+            if progress:
+                progress(done, len(todo), embedded)
+            stage = time.perf_counter()
+
+        if pending:
+            db = _embed_batch(db, pending, embeddings, timer)
+            embedded += len(pending)
+            if progress:
+                progress(len(todo), len(todo), embedded)
+
+        if db is None:
+            raise ValueError(f"No documents to index in {data_dir}")
+
+        checksum = index_checksum(db)
+        stage = time.perf_counter()
+        record = save_atomically(db, vector_dir, {
+            "version": MANIFEST_VERSION,
+            "embed_model": EMBED_MODEL,
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "checksum": checksum,
+            "chunking": chunker.settings(),
+            "files": dict(sorted(files.items())),
+        }, index_type, index_params)
+        timer.add("save", stage)
+
+        timings = timer.report()
+        timings["parse_cpu"] = round(parse_cpu, 3)
+        report.update(
+            vectors=db.index.ntotal,
+            index=record,
+            chunks_embedded=embedded,
+            chunk_sizes=chunk_size_stats(
+                [db.docstore.search(i).metadata.get("tokens", 0) for i in db.index_to_docstore_id.values()],
+                chunker.max_tokens,
+            ),
+            checksum=checksum,
+            timings=timings,
+            seconds=round(time.perf_counter() - start, 3),
+        )
+        print(
+            f"[DEBUG] Index updated: +{len(added)} ~{len(changed)} -{len(removed)} files, "
+            f"{report['vectors']} vectors in {report['seconds']}s."
+        )
+        record_ingest(report)
+        return open_store(vector_dir, embeddings), report
+
+
+def _print_progress(done, total, embedded):
+    sys.stderr.write(f"\r[index] files {done}/{total}, chunks embedded {embedded}")
+    if done == total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--vector-dir", default=VECTOR_DIR)
+    parser.add_argument("--rebuild", action="store_true", help="Re-embed every document")
+    parser.add_argument("--workers", type=int, default=INDEX_WORKERS,
+                        help="Processes used to parse markdown (1 = in-process)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE,
+                        help="Chunks per embedding call")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=INDEX_TYPE,
+                        help="FAISS index served to the app")
+    parser.add_argument("--index-params", type=json.loads, default=None,
+                        help='JSON build/search parameters, e.g. \'{"M": 16, "efSearch": 32}\'')
+    parser.add_argument("--quiet", action="store_true", help="No progress output")
+    args = parser.parse_args()
+
+    _, report = update_index(
+        args.data_dir, args.vector_dir, rebuild=args.rebuild,
+        workers=args.workers, batch_size=args.batch_size,
+        progress=None if args.quiet else _print_progress,
+        index_type=args.index_type, index_params=args.index_params,
+    )
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import re
+import threading
+from collections import Counter
+
+# Intent that is handed on to retrieval and the LLM
+SERVICE = "service"
+
+# Any of these anywhere in the message means it is (or may be) a real
+# service question, and it is never answered from a template.
+SERVICE_KEYWORDS = {
+    "nic", "identity", "id", "card", "birth", "certificate", "certificates",
+    "driver", "drivers", "driving", "license", "licence", "licenses", "licences",
+    "vehicle", "vehicles", "registration", "register", "registered", "passport",
+    "passports", "visa", "renew", "renewal", "replace", "replacement", "lost",
+    "apply", "application", "applications", "form", "forms", "document",
+    "documents", "fee", "fees", "office", "appointment", "appointments",
+    "department", "dmt", "drp", "correction", "amend", "amendment", "citizen",
+    "citizenship", "permit", "land", "marriage", "death", "tax", "service",
+    "services", "government", "required", "requirements", "process",
+    "procedure", "status",
+}
+
+GREETING_WORDS = {
+    "hi", "hii", "hiii", "hello", "helo", "hey", "heya", "hola", "yo",
+    "greetings", "ayubowan", "vanakkam", "morning", "afternoon", "evening",
+    "good", "there", "sir", "madam",
+}
+THANKS_WORDS = {"thanks", "thank", "thx", "ty", "you", "so", "much", "great", "ok", "okay", "cool", "nice"}
+GOODBYE_WORDS = {"bye", "goodbye", "see", "you", "later", "cya", "good", "night", "take", "care"}
+
+SMALL_TALK_PHRASES = {
+    "how are you", "how are u", "how r u", "how areyou", "how is it going",
+    "how are things", "whats up", "what is up", "sup", "wassup",
+    "how was your day", "are you ok", "are you there",
+}
+IDENTITY_PHRASES = {
+    "who are you", "what are you", "who r u", "what is your name",
+    "whats your name", "are you a bot", "are you human", "are you a robot",
+    "who made you", "who created you", "what can you do", "help",
+}
+
+# Topics that are clearly not government services
+OUT_OF_SCOPE_KEYWORDS = {
+    "weather", "cricket", "football", "movie", "movies", "song", "songs",
+    "music", "joke", "jokes", "recipe", "cook", "cooking", "bitcoin", "crypto",
+    "stock", "stocks", "girlfriend", "boyfriend", "game", "games", "python",
+    "javascript", "code", "homework", "poem", "horoscope", "lottery",
+}
+
+ABUSE_WORDS = {"idiot", "stupid", "dumb", "useless", "fool", "shut", "hate"}
+
+TEMPLATES = {
+    "greeting": "Hello! How can I help you with Sri Lankan government services today?",
+    "small_talk": "I'm doing well, thank you! How can I assist you with government services today?",
+    "identity": (
+        "I'm GovConnect Assistant. I can help with National Identity Cards (NIC), birth "
+        "certificates, driver's licenses, vehicle registration and passports. What would "
+        "you like to know?"
+    ),
+    "thanks": "You're welcome! Let me know if there's anything else I can help you with.",
+    "goodbye": "Goodbye! Feel free to come back any time you need help with government services.",
+    "abuse": (
+        "I'm sorry if I haven't been helpful. Could you tell me which government service "
+        "you need help with?"
+    ),
+    "out_of_scope": (
+        "I don't have that specific information in my knowledge base. I can help with NIC, "
+        "birth certificates, driver's licenses, vehicle registration and passports."
+    ),
+    "unclear": (
+        "Sorry, I didn't quite understand that. Could you tell me which government service "
+        "you need help with, for example NIC, passports or driver's licenses?"
+    ),
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text):
+    return _TOKEN_RE.findall(text.lower().replace("'", ""))
+
+
+def _only(tokens, vocabulary):
+    return bool(tokens) and all(t in vocabulary for t in tokens)
+
+
+def classify(text, follow_up=False):
+    """Return the intent name for ``text``; ``SERVICE`` means escalate.
+
+    ``follow_up`` is set when the message continues a conversation, where
+    a lone word ("why?", "fees?") refers to the previous answer.
+    """
+    tokens = _tokens(text)
+    if not tokens:
+        return "unclear"
+    words = set(tokens)
+    phrase = " ".join(tokens)
+    if tokens[0] in GREETING_WORDS and tokens[0] != "good":
+        # "hi how are you", "hello who are you"
+        phrase = " ".join(tokens[1:]) or phrase
+    if phrase in SMALL_TALK_PHRASES:
+        return "small_talk"
+    if phrase in IDENTITY_PHRASES:
+        return "identity"
+    if _only(tokens, GREETING_WORDS):
+        return "greeting"
+    if _only(tokens, THANKS_WORDS) and words & {"thanks", "thank", "thx", "ty"}:
+        return "thanks"
+    if _only(tokens, GOODBYE_WORDS) and words & {"bye", "goodbye", "cya", "later", "night"}:
+        return "goodbye"
+    if words & SERVICE_KEYWORDS:
+        return SERVICE
+    if words & ABUSE_WORDS:
+        return "abuse"
+    if words & OUT_OF_SCOPE_KEYWORDS:
+        return "out_of_scope"
+    if len(tokens) == 1 and not follow_up:
+        # a lone word that names no service: "test", keyboard mashing
+        return "unclear"
+    return SERVICE
+
+
+class IntentRouter:
+    """Answers greetings, small talk and off-topic messages from templates.
+
+    Classification is keyword/phrase matching on the normalized message, so
+    it runs in microseconds; anything that mentions a service, or that the
+    rules don't recognise, is escalated to retrieval and the LLM.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def route(self, text, follow_up=False):
+        """Return ``(intent, template_response)``; the response is ``None`` to escalate."""
+        intent = classify(text, follow_up) if self.enabled else SERVICE
+        with self._lock:
+            self.counts[intent] += 1
+        return intent, TEMPLATES.get(intent)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        answered = total - counts.get(SERVICE, 0)
+        return {
+            "enabled": self.enabled,
+            "counts": counts,
+            "answered_locally": answered,
+            "local_rate": round(answered / total, 4) if total else 0.0,
+        }
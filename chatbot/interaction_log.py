@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+
+INTERACTIONS_DB = os.getenv("INTERACTIONS_DB", "interactions.db")
+LEGACY_CHAT_LOG = "chat_logs.json"
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "100"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    query TEXT,
+    answer TEXT,
+    user_ip TEXT
+);
+CREATE TABLE IF NOT EXISTS hourly_counts (
+    hour TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS totals (
+    name TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    applied_at TEXT NOT NULL
+);
+"""
+
+# timestamps are stored as "YYYY-MM-DD HH:MM:SS", matching chat_logs.json
+_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class InteractionLog:
+    """Chat interaction log with pre-aggregated per-hour/per-day counters.
+
+    ``record`` only enqueues; a background thread drains the queue in
+    batches and, in the same transaction as the inserts, bumps the hourly,
+    daily and total counters. Stats are then answered from the counter
+    tables without ever scanning the interaction history.
+    """
+
+    def __init__(self, path=INTERACTIONS_DB, batch_size=LOG_BATCH_SIZE,
+                 flush_interval=LOG_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_pid = None
+        self._writer_lock = threading.Lock()
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        atexit.register(self.flush)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ----------------------------------------------------------------
+    # Writes
+    # ----------------------------------------------------------------
+    def record(self, query, answer, user_ip=None, timestamp=None):
+        """Queue one interaction for the background writer."""
+        self._ensure_writer()
+        timestamp = timestamp or datetime.now().strftime(_TS_FORMAT)
+        self._queue.put((timestamp, query, answer, user_ip))
+
+    def _ensure_writer(self):
+        # Threads do not survive fork(), so each worker process starts its own
+        if self._writer_pid == os.getpid() and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer_pid != os.getpid() or not self._writer.is_alive():
+                self._queue = queue.Queue()
+                self._writer = threading.Thread(
+                    target=self._run, name="interaction-log", daemon=True
+                )
+                self._writer_pid = os.getpid()
+                self._writer.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} interactions: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, rows):
+        conn = self._connect()
+        with conn:
+            self._apply(conn, rows)
+
+    @staticmethod
+    def _apply(conn, rows):
+        """Insert ``rows`` and bump the counters inside the caller's transaction."""
+        hourly, daily = {}, {}
+        for timestamp, *_ in rows:
+            hourly[timestamp[:13]] = hourly.get(timestamp[:13], 0) + 1
+            daily[timestamp[:10]] = daily.get(timestamp[:10], 0) + 1
+
+        conn.executemany(
+            "INSERT INTO interactions (timestamp, query, answer, user_ip) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        conn.executemany(
+            "INSERT INTO hourly_counts (hour, count) VALUES (?, ?) "
+            "ON CONFLICT(hour) DO UPDATE SET count = count + excluded.count",
+            hourly.items(),
+        )
+        conn.executemany(
+            "INSERT INTO daily_counts (day, count) VALUES (?, ?) "
+            "ON CONFLICT(day) DO UPDATE SET count = count + excluded.count",
+            daily.items(),
+        )
+        conn.execute(
+            "INSERT INTO totals (name, count) VALUES ('interactions', ?) "
+            "ON CONFLICT(name) DO UPDATE SET count = count + excluded.count",
+            (len(rows),),
+        )
+
+    def flush(self):
+        """Block until everything queued so far has been written."""
+        if self._writer_pid == os.getpid() and self._writer.is_alive():
+            self._queue.join()
+
+    def migrate_json(self, json_path=LEGACY_CHAT_LOG):
+        """Import the legacy ``chat_logs.json`` array once; returns rows imported."""
+        if not os.path.exists(json_path):
+            return 0
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            done = conn.execute(
+                "SELECT 1 FROM migrations WHERE name = ?", (json_path,)
+            ).fetchone()
+            if done:
+                return 0
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                entries = []
+            rows = [
+                (e["timestamp"], e.get("query", ""), e.get("answer", ""), e.get("user_ip"))
+                for e in entries if isinstance(e, dict) and e.get("timestamp")
+            ]
+            if rows:
+                self._apply(conn, rows)
+            conn.execute(
+                "INSERT INTO migrations (name, applied_at) VALUES (?, ?)",
+                (json_path, datetime.now().isoformat()),
+            )
+        return len(rows)
+
+    # ----------------------------------------------------------------
+    # Reads
+    # ----------------------------------------------------------------
+    def total(self):
+        row = self._connect().execute(
+            "SELECT count FROM totals WHERE name = 'interactions'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def count_day(self, day):
+        row = self._connect().execute(
+            "SELECT count FROM daily_counts WHERE day = ?", (day,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def count_range(self, start, end, granularity="day"):
+        """Counts per bucket for ``start <= bucket <= end``.
+
+        ``start``/``end`` are ``YYYY-MM-DD`` for daily buckets or
+        ``YYYY-MM-DD HH`` for hourly ones; only the counter rows inside the
+        range are read.
+        """
+        table, key = ("hourly_counts", "hour") if granularity == "hour" else ("daily_counts", "day")
+        rows = self._connect().execute(
+            f"SELECT {key}, count FROM {table} WHERE {key} BETWEEN ? AND ? ORDER BY {key}",
+            (start, end),
+        ).fetchall()
+        buckets = dict(rows)
+        return {"total": sum(buckets.values()), "buckets": buckets}
+
+    def stats(self):
+        today = datetime.now().strftime("%Y-%m-%d")
+        return {
+            "total_interactions": self.total(),
+            "today_interactions": self.count_day(today),
+            "pending_writes": self._queue.qsize(),
+        }
+
+
+def parse_range_bound(value, granularity, default):
+    """Normalise a ``start``/``end`` query parameter to a bucket key."""
+    if not value:
+        return default
+    value = value.replace("T", " ")
+    if granularity == "hour":
+        return value[:13] if len(value) >= 13 else f"{value[:10]} 00"
+    return value[:10]
+
+
+def default_range(granularity, days=7):
+    now = datetime.now()
+    if granularity == "hour":
+        return (now - timedelta(hours=23)).strftime("%Y-%m-%d %H"), now.strftime("%Y-%m-%d %H")
+    return (now - timedelta(days=days - 1)).strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d")
@@ -0,0 +1,381 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_ACQUIRE_TIMEOUT = float(os.getenv("LLM_ACQUIRE_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMClientError(Exception):
+    """Raised when the LLM provider could not produce a completion."""
+
+
+class CircuitOpenError(LLMClientError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+
+class RetryableStatus(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"LLM provider returned HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+# -------------------------------------------------------------------
+# Policies
+# -------------------------------------------------------------------
+class RetryPolicy:
+    """Jittered exponential backoff that honours ``Retry-After``."""
+
+    def __init__(self, max_retries=LLM_MAX_RETRIES, base=LLM_BACKOFF_BASE, cap=LLM_BACKOFF_MAX):
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to sleep before retry number ``attempt`` (1-based).
+
+        Returns ``None`` when the provider asked us to wait longer than ``cap``,
+        in which case the caller should give up rather than retry early.
+        """
+        if attempt > self.max_retries:
+            return None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.cap else None
+        # "Full jitter": uniform over [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.cap, self.base * (2 ** attempt)))
+
+    @staticmethod
+    def parse_retry_after(value):
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """Fail fast after ``threshold`` consecutive failures.
+
+    After ``reset_timeout`` seconds one trial call is let through (half-open);
+    its outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, reset_timeout=LLM_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+class LLMMetrics:
+    """Per-process counters for calls to the LLM provider."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, latency, ok, usage=None):
+        with self._lock:
+            self.calls += 1
+            if ok:
+                self.successes += 1
+            else:
+                self.failures += 1
+            self._latencies.append(latency)
+            if usage:
+                self.prompt_tokens += usage.get("prompt_tokens", 0) or 0
+                self.completion_tokens += usage.get("completion_tokens", 0) or 0
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+
+        def pct(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)},
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+# -------------------------------------------------------------------
+# Clients
+# -------------------------------------------------------------------
+class _BaseLLMClient:
+    def __init__(self, retry_policy=None, breaker=None, metrics=None,
+                 max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT):
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = metrics or LLMMetrics()
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            self.metrics.record_rejected()
+            raise CircuitOpenError("AI service is temporarily unavailable (circuit open)")
+
+    def _check_status(self, status, headers):
+        if status in RETRYABLE_STATUS:
+            raise RetryableStatus(status, RetryPolicy.parse_retry_after(headers.get("Retry-After")))
+
+    def stats(self):
+        snapshot = self.metrics.snapshot()
+        snapshot["circuit"] = self.breaker.state
+        snapshot["max_concurrency"] = self.max_concurrency
+        return snapshot
+
+
+class LLMClient(_BaseLLMClient):
+    """Blocking chat-completions client with a persistent connection pool.
+
+    One instance is meant to be shared by every request thread: the
+    ``requests.Session`` keeps connections alive, a semaphore caps concurrent
+    calls to the provider, 429/5xx and transport errors are retried with
+    jittered backoff, and a circuit breaker short-circuits calls while the
+    provider is down.
+    """
+
+    def __init__(self, pool_size=LLM_POOL_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=LLM_ACQUIRE_TIMEOUT):
+            self.metrics.record_rejected()
+            raise LLMClientError("Too many concurrent requests to the AI service")
+
+    def _send(self, url, headers, body, stream=False):
+        """POST with retries; returns a response whose status is not retryable."""
+        attempt = 0
+        while True:
+            self._check_breaker()
+            start = time.perf_counter()
+            recorded = False
+            try:
+                response = self.session.post(
+                    url, headers=headers, json=body, timeout=self.timeout, stream=stream
+                )
+                self._check_status(response.status_code, response.headers)
+                self.breaker.record_success()
+                recorded = True
+                return response, start
+            except (RetryableStatus, requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as e:
+                if isinstance(e, RetryableStatus):
+                    response.close()
+                self.breaker.record_failure()
+                recorded = True
+                self.metrics.record(time.perf_counter() - start, ok=False)
+                attempt += 1
+                delay = self.retry_policy.delay(attempt, getattr(e, "retry_after", None))
+                if delay is None:
+                    raise LLMClientError(str(e))
+                self.metrics.record_retry()
+                time.sleep(delay)
+            except requests.exceptions.RequestException as e:
+                # e.g. ChunkedEncodingError, TooManyRedirects: not worth a retry
+                self.breaker.record_failure()
+                recorded = True
+                self.metrics.record(time.perf_counter() - start, ok=False)
+                raise LLMClientError(str(e))
+            finally:
+                # anything else still counts, or a half-open trial would never end
+                if not recorded:
+                    self.breaker.record_failure()
+
+    def chat(self, url, headers, body):
+        """Return the decoded JSON completion for ``body``."""
+        self._acquire()
+        try:
+            response, start = self._send(url, headers, body)
+            try:
+                response.raise_for_status()
+                payload = response.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self.metrics.record(time.perf_counter() - start, ok=False)
+                raise LLMClientError(str(e))
+            self.metrics.record(time.perf_counter() - start, ok=True, usage=payload.get("usage"))
+            return payload
+        finally:
+            self._slots.release()
+
+    def stream(self, url, headers, body):
+        """Yield raw SSE lines from a streaming completion.
+
+        Retries only happen before the first byte; once tokens are flowing a
+        failure is raised to the caller.
+        """
+        self._acquire()
+        try:
+            response, start = self._send(url, headers, body, stream=True)
+            ok = False
+            try:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    yield line
+                ok = True
+            except GeneratorExit:
+                # Consumer stopped reading (e.g. after [DONE]); not a failure.
+                ok = True
+                raise
+            except requests.exceptions.RequestException as e:
+                raise LLMClientError(str(e))
+            finally:
+                response.close()
+                self.metrics.record(time.perf_counter() - start, ok=ok)
+        finally:
+            self._slots.release()
+
+
+class AsyncLLMClient(_BaseLLMClient):
+    """``httpx``-based counterpart of :class:`LLMClient` for the async app."""
+
+    def __init__(self, max_connections=LLM_MAX_CONNECTIONS, max_keepalive=LLM_POOL_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        import httpx
+
+        self._httpx = httpx
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+            ),
+        )
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    async def chat(self, url, headers, body):
+        httpx = self._httpx
+        try:
+            await asyncio.wait_for(self._slots.acquire(), LLM_ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.metrics.record_rejected()
+            raise LLMClientError("Too many concurrent requests to the AI service")
+        try:
+            attempt = 0
+            while True:
+                self._check_breaker()
+                start = time.perf_counter()
+                recorded = False
+                try:
+                    response = await self.client.post(url, headers=headers, json=body)
+                    self._check_status(response.status_code, response.headers)
+                    self.breaker.record_success()
+                    recorded = True
+                    response.raise_for_status()
+                    payload = response.json()
+                except (RetryableStatus, httpx.TransportError) as e:
+                    self.breaker.record_failure()
+                    recorded = True
+                    self.metrics.record(time.perf_counter() - start, ok=False)
+                    attempt += 1
+                    delay = self.retry_policy.delay(attempt, getattr(e, "retry_after", None))
+                    if delay is None:
+                        raise LLMClientError(str(e))
+                    self.metrics.record_retry()
+                    await asyncio.sleep(delay)
+                    continue
+                except (httpx.HTTPError, ValueError) as e:
+                    self.metrics.record(time.perf_counter() - start, ok=False)
+                    raise LLMClientError(str(e))
+                finally:
+                    # any other outcome (redirect loop, cancellation) still
+                    # counts, or a half-open trial would never end
+                    if not recorded:
+                        self.breaker.record_failure()
+                self.metrics.record(time.perf_counter() - start, ok=True, usage=payload.get("usage"))
+                return payload
+        finally:
+            self._slots.release()
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,175 @@
+import os
+import io
+import json
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+from features import FeatureEncoder
+
+logger = logging.getLogger(__name__)
+
+
+class ModelBundle:
+    """Immutable snapshot of the predictor and the mappings it was trained with."""
+
+    def __init__(self, model, task_freq_map, queue_bins, version, fingerprint,
+                 load_seconds, loaded_at):
+        self.model = model
+        self.task_freq_map = task_freq_map
+        self.queue_bins = queue_bins
+        self.encoder = FeatureEncoder(task_freq_map, queue_bins)
+        self.version = version
+        self.fingerprint = fingerprint
+        self.load_seconds = load_seconds
+        self.loaded_at = loaded_at
+
+
+class ModelRegistry:
+    """Keep the LightGBM model and its mappings warm in memory.
+
+    The bundle is loaded once and handed out by reference. When any of the
+    backing files changes on disk a new bundle is built off to the side and
+    swapped in with a single assignment, so in-flight requests keep using the
+    snapshot they already hold.
+    """
+
+    def __init__(self, model_path, task_freq_path, queue_bins_path, check_interval=5.0):
+        self.model_path = model_path
+        self.task_freq_path = task_freq_path
+        self.queue_bins_path = queue_bins_path
+        self.check_interval = check_interval
+
+        self._bundle = None
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._last_attempt = None
+        self._last_error = None
+        self._reload_count = 0
+        self._listeners = []
+
+    def on_reload(self, callback):
+        """Register ``callback(bundle)`` to run after a new bundle is swapped in."""
+        self._listeners.append(callback)
+
+    # ----------------------------------------------------------------
+    # Loading
+    # ----------------------------------------------------------------
+    def _fingerprint(self):
+        """Cheap change detector based on (mtime, size) of every backing file."""
+        parts = []
+        for path in (self.model_path, self.task_freq_path, self.queue_bins_path):
+            try:
+                st = os.stat(path)
+                parts.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                parts.append((path, None, None))
+        return tuple(parts)
+
+    def _load_bundle(self, fingerprint):
+        start = time.perf_counter()
+
+        with open(self.model_path, "rb") as f:
+            raw = f.read()
+        model = pickle.load(io.BytesIO(raw))
+        version = hashlib.sha256(raw).hexdigest()[:12]
+
+        task_freq_map = {}
+        if os.path.exists(self.task_freq_path):
+            with open(self.task_freq_path, "r") as f:
+                task_freq_map = json.load(f)
+
+        queue_bins = None
+        if os.path.exists(self.queue_bins_path):
+            with open(self.queue_bins_path, "r") as f:
+                queue_bins = json.load(f)
+
+        return ModelBundle(
+            model=model,
+            task_freq_map=task_freq_map,
+            queue_bins=queue_bins,
+            version=version,
+            fingerprint=fingerprint,
+            load_seconds=time.perf_counter() - start,
+            loaded_at=datetime.now().isoformat(),
+        )
+
+    def load(self):
+        """Load (or reload) the bundle from disk and swap it in atomically."""
+        with self._lock:
+            self._last_attempt = time.monotonic()
+            fingerprint = self._fingerprint()
+            try:
+                bundle = self._load_bundle(fingerprint)
+            except Exception as e:
+                self._last_error = str(e)
+                logger.error(f"Failed to load model from {self.model_path}: {e}")
+                return self._bundle
+
+            previous = self._bundle
+            self._bundle = bundle
+            self._last_error = None
+            self._last_check = time.monotonic()
+            if previous is not None:
+                self._reload_count += 1
+                logger.info(
+                    f"LightGBM model reloaded: {previous.version} -> {bundle.version} "
+                    f"({bundle.load_seconds * 1000:.1f} ms)"
+                )
+            else:
+                logger.info(
+                    f"LightGBM model loaded: version {bundle.version} "
+                    f"({bundle.load_seconds * 1000:.1f} ms)"
+                )
+            for callback in self._listeners:
+                try:
+                    callback(bundle)
+                except Exception as e:
+                    logger.error(f"Model reload listener failed: {e}")
+            return bundle
+
+    def maybe_reload(self):
+        """Reload if the files on disk changed since the last load.
+
+        Disk is only stat'ed once per ``check_interval`` seconds so the hot path
+        stays a couple of attribute lookups.
+        """
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return self._bundle
+        self._last_check = now
+
+        current = self._bundle
+        if current is not None and self._fingerprint() == current.fingerprint:
+            return current
+        return self.load()
+
+    def get(self):
+        """Return the current bundle, loading or hot-reloading it if needed.
+
+        While nothing is loaded, a failed load is retried at most once per
+        ``check_interval`` seconds rather than on every request.
+        """
+        if self._bundle is None:
+            last = self._last_attempt
+            if last is not None and time.monotonic() - last < self.check_interval:
+                return None
+            return self.load()
+        return self.maybe_reload()
+
+    # ----------------------------------------------------------------
+    # Reporting
+    # ----------------------------------------------------------------
+    def status(self):
+        bundle = self._bundle
+        return {
+            "loaded": bundle is not None,
+            "version": bundle.version if bundle else None,
+            "load_time_ms": round(bundle.load_seconds * 1000, 2) if bundle else None,
+            "last_reload": bundle.loaded_at if bundle else None,
+            "reload_count": self._reload_count,
+            "last_error": self._last_error,
+        }
@@ -13,24 +13,36 @@ load_dotenv()
 def main():
     """Main function to run the Flask app."""
     try:
-        # Import and run the app
-        from app import app
-        
         port = int(os.getenv('PORT', 5001))
         debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
         host = os.getenv('HOST', '0.0.0.0')
+        mode = os.getenv('SERVER_MODE', 'sync').lower()
         
         print("🤖 Starting GovConnect Chatbot API...")
         print(f"📍 Server: http://{host}:{port}")
         print(f"🔧 Debug mode: {debug}")
+        print(f"⚙️  Server mode: {mode}")
         print("🚀 Press Ctrl+C to stop")
         print("-" * 50)
         
-        app.run(
-            host=host,
-            port=port,
-            debug=debug
-        )
+        if mode == 'async':
+            import asyncio
+            from hypercorn.asyncio import serve
+            from hypercorn.config import Config as HypercornConfig
+            from async_app import app
+
+            config = HypercornConfig()
+            config.bind = [f"{host}:{port}"]
+            asyncio.run(serve(app, config))
+        else:
+            # Import and run the app
+            from app import app
+
+            app.run(
+                host=host,
+                port=port,
+                debug=debug
+            )
         
     except KeyboardInterrupt:
         print("\n👋 Shutting down GovConnect Chatbot API...")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Parity check and micro-benchmark for the /predict_time feature encoders.
+
+Compares the pandas pipeline (features.build_features) against the
+pandas-free FeatureEncoder on historical-style booking rows, then times
+both on single-row inputs.
+
+Usage:
+    python scripts/bench_features.py                   # synthetic bookings
+    python scripts/bench_features.py --csv bookings.csv
+"""
+
+import os
+import sys
+import json
+import math
+import random
+import argparse
+import timeit
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import FEATURE_COLUMNS, FeatureEncoder, build_features
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_mappings():
+    with open(os.path.join(BASE_DIR, "task_freq.json"), "r") as f:
+        task_freq_map = json.load(f)
+    with open(os.path.join(BASE_DIR, "queue_bins.json"), "r") as f:
+        queue_bins = json.load(f)
+    return task_freq_map, queue_bins
+
+
+def synthetic_bookings(task_freq_map, queue_bins, n, seed=7):
+    """Bookings shaped like the training export, covering the bin edges."""
+    rng = random.Random(seed)
+    tasks = list(task_freq_map) + ["TASK-UNKNOWN"]
+    queue_values = list(queue_bins) + [0, 0.5, 1.5, queue_bins[-1] + 1, 7]
+    start = date(2025, 1, 1)
+    rows = []
+    for i in range(n):
+        day = start + timedelta(days=rng.randrange(365))
+        rows.append({
+            "booking_id": f"BKG-{i:06d}",
+            "citizen_id": f"CIT-{rng.randrange(10**6):06d}",
+            "booking_date": (day - timedelta(days=rng.randrange(30))).isoformat(),
+            "appointment_date": day.isoformat(),
+            "appointment_time": f"{rng.randrange(8, 17):02d}:{rng.choice([0, 15, 30, 45]):02d}",
+            "check_in_time": None,
+            "check_out_time": None,
+            "satisfaction_rating": rng.randrange(1, 6),
+            "task_id": rng.choice(tasks),
+            "queue_number": rng.choice(queue_values) if i % 5 == 0 else rng.randrange(1, 60),
+            "num_documents": rng.randrange(0, 15),
+        })
+    return rows
+
+
+def same(a, b):
+    if isinstance(a, float) and math.isnan(a):
+        return isinstance(b, float) and math.isnan(b)
+    return float(a) == float(b)
+
+
+def check_parity(rows, task_freq_map, queue_bins):
+    encoder = FeatureEncoder(task_freq_map, queue_bins)
+    expected = build_features(pd.DataFrame(rows), task_freq_map, queue_bins)
+    mismatches = 0
+    for i, row in enumerate(rows):
+        got = encoder.encode(row)
+        want = [expected.iloc[i][c] for c in FEATURE_COLUMNS]
+        if not all(same(g, w) for g, w in zip(got, want)):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"Mismatch on row {i}: fast={got} pandas={want}")
+    return mismatches
+
+
+def benchmark(rows, task_freq_map, queue_bins, number):
+    encoder = FeatureEncoder(task_freq_map, queue_bins)
+    row = rows[0]
+    pandas_s = timeit.timeit(
+        lambda: build_features(pd.DataFrame([row]), task_freq_map, queue_bins), number=number
+    )
+    fast_s = timeit.timeit(lambda: encoder.encode(row), number=number)
+    return pandas_s / number, fast_s / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="Historical bookings export to check parity against")
+    parser.add_argument("--rows", type=int, default=2000, help="Synthetic rows when no CSV is given")
+    parser.add_argument("--number", type=int, default=2000, help="Iterations for the benchmark")
+    args = parser.parse_args()
+
+    task_freq_map, queue_bins = load_mappings()
+    if args.csv:
+        rows = pd.read_csv(args.csv).to_dict(orient="records")
+    else:
+        rows = synthetic_bookings(task_freq_map, queue_bins, args.rows)
+
+    mismatches = check_parity(rows, task_freq_map, queue_bins)
+    print(f"Parity: {len(rows) - mismatches}/{len(rows)} rows identical")
+
+    pandas_s, fast_s = benchmark(rows, task_freq_map, queue_bins, args.number)
+    print(f"pandas path : {pandas_s * 1e6:9.1f} us/row")
+    print(f"fast path   : {fast_s * 1e6:9.1f} us/row")
+    print(f"speedup     : {pandas_s / fast_s:9.1f}x")
+
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
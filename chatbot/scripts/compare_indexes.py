@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Compare FAISS index types on the knowledge-base vectors.
+
+Loads the exact (flat) store from VECTOR_DIR, builds every index type from
+vector_index.py over the same vectors and reports serialized size, build
+time, single-query search latency and recall@k against flat search.
+
+Queries are read one per line from --queries; without it, the first
+sentence of each indexed chunk is used as a pseudo-query.
+
+Usage:
+    python scripts/compare_indexes.py
+    python scripts/compare_indexes.py --queries questions.txt --k 5 --output report.json
+    python scripts/compare_indexes.py --types flat hnsw sq8 --params '{"hnsw": {"efSearch": 32}}'
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot_core import VECTOR_DIR, load_vector_store
+from embeddings import get_embedding_service
+from vector_index import (
+    INDEX_TYPES, build_index, factory_string, flat_vectors, index_bytes, resolve_params,
+)
+
+
+def load_queries(db, path, limit):
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = []
+        for doc_id in db.index_to_docstore_id.values():
+            text = db.docstore.search(doc_id).page_content.strip()
+            first = re.split(r"(?<=[.!?])\s+", text, maxsplit=1)[0]
+            if first:
+                queries.append(first[:300])
+    return queries[:limit]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def evaluate(index, queries, truth, k):
+    latencies, hits = [], 0
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, ids = index.search(queries[i:i + 1], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(ids[0]) & set(truth[i]))
+    return {
+        "latency_ms_p50": round(percentile(latencies, 50), 4),
+        "latency_ms_p95": round(percentile(latencies, 95), 4),
+        f"recall@{k}": round(hits / (len(queries) * k), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vector-dir", default=VECTOR_DIR)
+    parser.add_argument("--queries", help="Text file with one query per line")
+    parser.add_argument("--max-queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--params", type=json.loads, default={},
+                        help="JSON object of per-type parameter overrides")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    db = load_vector_store(args.vector_dir, exact=True)
+    vectors = flat_vectors(db.index)
+    ntotal, dim = vectors.shape
+    k = min(args.k, ntotal)
+
+    texts = load_queries(db, args.queries, args.max_queries)
+    queries = np.asarray(get_embedding_service().embed_documents(texts), dtype=np.float32)
+    _, truth = db.index.search(queries, k)
+
+    report = {
+        "vector_dir": args.vector_dir,
+        "vectors": int(ntotal),
+        "dim": int(dim),
+        "queries": len(texts),
+        "k": k,
+        "results": [],
+    }
+    for kind in args.types:
+        params = resolve_params(kind, ntotal, dim, args.params.get(kind))
+        start = time.perf_counter()
+        index = build_index(vectors, kind, params)
+        build_seconds = time.perf_counter() - start
+        result = {
+            "type": kind,
+            "factory": factory_string(kind, params),
+            "params": params,
+            "bytes": index_bytes(index),
+            "build_seconds": round(build_seconds, 4),
+        }
+        result.update(evaluate(index, queries, truth, k))
+        report["results"].append(result)
+
+    flat_bytes = vectors.nbytes or 1
+    print(f"{ntotal} vectors x {dim} dims, {len(texts)} queries, k={k}\n")
+    print(f"{'type':<7} {'factory':<18} {'bytes':>10} {'vs flat':>8} {'build s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'recall':>7}")
+    for r in report["results"]:
+        print(f"{r['type']:<7} {r['factory']:<18} {r['bytes']:>10} {r['bytes'] / flat_bytes:>8.2f} "
+              f"{r['build_seconds']:>8.3f} {r['latency_ms_p50']:>8.3f} {r['latency_ms_p95']:>8.3f} "
+              f"{r[f'recall@{k}']:>7.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
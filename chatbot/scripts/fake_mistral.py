@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Mistral chat-completions API.
+
+Answers POST /v1/chat/completions with a canned reply, either as a single
+JSON completion or, when the request sets "stream": true, as SSE chunks in
+Mistral's streaming format.
+
+Latency is ``--latency`` (+/- ``--jitter``) before the first token plus
+``--token-delay`` per token. A fraction ``--error-rate`` of requests fail
+with ``--error-status`` instead, to exercise retries and the circuit
+breaker, and ``--drop-after N`` cuts every stream off after N tokens, as a
+dropped upstream connection would. GET /stats returns request and error
+counts.
+
+Usage:
+    python scripts/fake_mistral.py --port 8001 --token-delay 0.05
+    python scripts/fake_mistral.py --latency 0.4 --jitter 0.2 --error-rate 0.02 --error-status 429
+    MISTRAL_API_URL=http://127.0.0.1:8001/v1/chat/completions \\
+    MISTRAL_API_KEY=test python app.py
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "To apply for a National Identity Card, visit your Divisional Secretariat "
+    "with your birth certificate and a completed application form."
+)
+
+
+class FakeMistralHandler(BaseHTTPRequestHandler):
+    reply = DEFAULT_REPLY
+    token_delay = 0.0
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    error_status = 503
+    drop_after = None
+    rng = random.Random()
+    counts = {"requests": 0, "stream": 0, "errors": 0}
+    _lock = threading.Lock()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _first_token_delay(self):
+        with self._lock:
+            offset = self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + offset)
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/stats":
+            self._send_json(404, {"error": "not found"})
+            return
+        with self._lock:
+            counts = dict(self.counts)
+        self._send_json(200, counts)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+
+        self._count("requests")
+        with self._lock:
+            failed = self.rng.random() < self.error_rate
+        time.sleep(self._first_token_delay())
+        if failed:
+            self._count("errors")
+            self._send_json(self.error_status, {"error": "injected failure"})
+            return
+
+        tokens = [word + " " for word in self.reply.split()]
+        if request.get("stream"):
+            self._count("stream")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            if self.drop_after is not None:
+                # the connection closes without [DONE], mid-answer
+                tokens = tokens[:self.drop_after]
+            for token in tokens:
+                time.sleep(self.token_delay)
+                chunk = {"choices": [{"index": 0, "delta": {"content": token}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            if self.drop_after is None:
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            self.close_connection = True
+            return
+
+        time.sleep(self.token_delay * len(tokens))
+        self._send_json(200, {
+            "model": request.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": self.reply}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds to wait per token")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter on --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--drop-after", type=int, help="Close streams after this many tokens, without [DONE]")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    args = parser.parse_args()
+
+    FakeMistralHandler.reply = args.reply
+    FakeMistralHandler.token_delay = args.token_delay
+    FakeMistralHandler.latency = args.latency
+    FakeMistralHandler.jitter = args.jitter
+    FakeMistralHandler.error_rate = args.error_rate
+    FakeMistralHandler.error_status = args.error_status
+    FakeMistralHandler.drop_after = args.drop_after
+    FakeMistralHandler.rng = random.Random(args.seed)
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeMistralHandler)
+    print(f"Fake Mistral listening on http://{args.host}:{args.port}/v1/chat/completions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
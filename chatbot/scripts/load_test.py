@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the chatbot API.
+
+Replays questions from chat_logs.json against /chat and /chat/stream and
+synthetic bookings against /predict_time at a fixed concurrency (closed
+loop: each client sends its next request as soon as the last one returns),
+then reports per-endpoint throughput, error rate and p50/p95/p99 latency.
+For /chat/stream the time to the first token is reported as well.
+
+With --start, the harness launches scripts/fake_mistral.py and the server
+(serve.py or run.py) pointed at it, so runs are repeatable and never touch
+the real Mistral API. Reports are JSON; --compare diffs a run against a
+saved baseline and --max-regression turns that into a pass/fail check.
+
+Replayed traffic hits the same caches and intent fast path as production
+traffic would. To load the retrieval + LLM path, add real questions with
+--questions and, with --start, switch the caches off through --server-env.
+
+Usage:
+    python scripts/load_test.py --start --concurrency 16 --duration 60 --output bench.json
+    python scripts/load_test.py --start --llm-latency 0.4 --llm-jitter 0.2 --llm-error-rate 0.02
+    python scripts/load_test.py --url http://127.0.0.1:5001 --mix chat=1 --duration 30
+    python scripts/load_test.py --start --compare bench.json --max-regression 10
+    python scripts/load_test.py --start --questions questions.txt \
+        --server-env SEMANTIC_CACHE_THRESHOLD=1.1 --server-env INTENT_FAST_PATH=false
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import signal
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+import requests
+
+from bench_features import load_mappings, synthetic_bookings
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_MIX = "chat=0.5,stream=0.2,predict=0.3"
+ENDPOINTS = {
+    "chat": "/chat",
+    "stream": "/chat/stream",
+    "predict": "/predict_time",
+}
+FALLBACK_QUESTIONS = [
+    "How do I apply for a National Identity Card?",
+    "What documents do I need for a lost NIC?",
+    "How can I renew my passport?",
+]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}; expected {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def load_questions(chat_log, extra=None):
+    """Queries from a chat_logs.json-style list of ``{"query": ...}`` entries,
+    plus one question per line from ``extra``."""
+    questions = []
+    try:
+        with open(chat_log, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        questions = [e.get("query", "").strip() for e in entries if isinstance(e, dict)]
+    except (OSError, ValueError):
+        pass
+    if extra:
+        with open(extra, "r", encoding="utf-8") as f:
+            questions.extend(line.strip() for line in f)
+    return [q for q in questions if q] or list(FALLBACK_QUESTIONS)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def latency_summary(values):
+    if not values:
+        return None
+    return {
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "mean": round(sum(values) / len(values), 2),
+        "max": round(max(values), 2),
+    }
+
+
+# -------------------------------------------------------------------
+# Requests
+# -------------------------------------------------------------------
+def send(session, base_url, endpoint, body, timeout):
+    """Send one request; returns ``(status, ttft_ms)``. ``status`` is an int or an error name."""
+    url = base_url + ENDPOINTS[endpoint]
+    if endpoint != "stream":
+        return session.post(url, json=body, timeout=timeout).status_code, None
+
+    start = time.perf_counter()
+    ttft = None
+    with session.post(url, json=body, timeout=timeout, stream=True) as response:
+        if response.status_code != 200:
+            return response.status_code, None
+        status = "incomplete"
+        for line in response.iter_lines(decode_unicode=True):
+            if ttft is None and line.startswith("data:"):
+                ttft = (time.perf_counter() - start) * 1000
+            if line == "event: error":
+                status = "stream_error"
+            elif line == "event: done":
+                status = 200
+        return status, ttft
+
+
+class LoadGenerator:
+    """Closed-loop clients drawing requests from a weighted endpoint mix."""
+
+    def __init__(self, base_url, mix, questions, bookings, concurrency, timeout=120, seed=7):
+        self.base_url = base_url.rstrip("/")
+        self.mix = mix
+        self.questions = questions
+        self.bookings = bookings
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.seed = seed
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def _body(self, endpoint, rng):
+        if endpoint == "predict":
+            return rng.choice(self.bookings)
+        return {"message": rng.choice(self.questions)}
+
+    def _client(self, index, deadline):
+        rng = random.Random(self.seed + index)
+        names, weights = list(self.mix), list(self.mix.values())
+        session = requests.Session()
+        samples = []
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status, ttft = send(session, self.base_url, endpoint, self._body(endpoint, rng), self.timeout)
+            except requests.RequestException as e:
+                status, ttft = type(e).__name__, None
+            samples.append((endpoint, start, (time.perf_counter() - start) * 1000, status, ttft))
+        session.close()
+        with self._lock:
+            self.samples.extend(samples)
+
+    def run(self, duration):
+        """Run for ``duration`` seconds; returns the ``perf_counter()`` start time."""
+        start = time.perf_counter()
+        deadline = start + duration
+        threads = [
+            threading.Thread(target=self._client, args=(i, deadline), daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return start
+
+
+def summarize(samples, window_start, window_seconds):
+    """Per-endpoint and overall statistics for samples started inside the window."""
+    samples = [s for s in samples if s[1] >= window_start]
+    groups = {"all": samples}
+    for sample in samples:
+        groups.setdefault(sample[0], []).append(sample)
+
+    summary = {}
+    for name, group in groups.items():
+        ok = [s for s in group if isinstance(s[3], int) and s[3] < 400]
+        statuses = {}
+        for s in group:
+            statuses[str(s[3])] = statuses.get(str(s[3]), 0) + 1
+        entry = {
+            "requests": len(group),
+            "errors": len(group) - len(ok),
+            "error_rate": round((len(group) - len(ok)) / len(group), 4) if group else 0.0,
+            "throughput_rps": round(len(group) / window_seconds, 2),
+            "latency_ms": latency_summary([s[2] for s in ok]),
+            "status": statuses,
+        }
+        ttft = [s[4] for s in ok if s[4] is not None]
+        if ttft:
+            entry["ttft_ms"] = latency_summary(ttft)
+        summary[name] = entry
+    return summary
+
+
+# -------------------------------------------------------------------
+# Comparison
+# -------------------------------------------------------------------
+def compare(report, baseline):
+    """Change per endpoint, positive = worse.
+
+    Latency and throughput changes are relative (%); the error-rate change
+    is in percentage points.
+    """
+    rows = []
+    for name, current in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        for metric in ("p50", "p95", "p99"):
+            old = (before.get("latency_ms") or {}).get(metric)
+            new = (current.get("latency_ms") or {}).get(metric)
+            if old and new is not None:
+                rows.append((name, f"{metric} ms", old, new, (new - old) / old * 100))
+        old, new = before["throughput_rps"], current["throughput_rps"]
+        if old:
+            rows.append((name, "rps", old, new, (old - new) / old * 100))
+        rows.append((name, "error rate", before["error_rate"], current["error_rate"],
+                     (current["error_rate"] - before["error_rate"]) * 100))
+    return rows
+
+
+def print_report(report):
+    print(f"\n{report['concurrency']} clients, {report['measured_seconds']}s measured, mix {report['mix']}\n")
+    print(f"{'endpoint':<9} {'requests':>8} {'rps':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'ttft p95':>9}")
+    for name, e in report["endpoints"].items():
+        lat = e["latency_ms"] or {}
+        ttft = (e.get("ttft_ms") or {}).get("p95", "")
+        print(f"{name:<9} {e['requests']:>8} {e['throughput_rps']:>8} {e['error_rate']:>7.2%} "
+              f"{lat.get('p50', ''):>9} {lat.get('p95', ''):>9} {lat.get('p99', ''):>9} {ttft:>9}")
+
+
+# -------------------------------------------------------------------
+# Managed servers (--start)
+# -------------------------------------------------------------------
+def wait_ready(proc, url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{proc.args[1]} exited with {proc.returncode}")
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def start_servers(args):
+    """Launch the fake LLM and the API; returns ``(processes, base_url)``."""
+    log_dir = Path(args.log_dir)
+    llm = subprocess.Popen(
+        [sys.executable, "scripts/fake_mistral.py", "--port", str(args.llm_port),
+         "--latency", str(args.llm_latency), "--jitter", str(args.llm_jitter),
+         "--token-delay", str(args.llm_token_delay), "--error-rate", str(args.llm_error_rate),
+         "--seed", str(args.seed)],
+        cwd=BASE_DIR, stdout=open(log_dir / "fake_mistral.log", "w"), stderr=subprocess.STDOUT,
+    )
+    env = dict(
+        os.environ,
+        HOST="127.0.0.1",
+        PORT=str(args.port),
+        MISTRAL_API_URL=f"http://127.0.0.1:{args.llm_port}/v1/chat/completions",
+        MISTRAL_API_KEY=os.getenv("MISTRAL_API_KEY", "benchmark"),
+        # every simulated user shares one address; override with --server-env
+        CHAT_RATE_LIMIT="0",
+    )
+    env.update(item.split("=", 1) for item in args.server_env)
+    server = subprocess.Popen(
+        [sys.executable, f"{args.server}.py"],
+        cwd=BASE_DIR, env=env, stdout=open(log_dir / "server.log", "w"), stderr=subprocess.STDOUT,
+    )
+    processes = [server, llm]
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_ready(llm, f"http://127.0.0.1:{args.llm_port}/stats", 30)
+        wait_ready(server, f"{base_url}/readyz", args.ready_timeout)
+    except Exception:
+        stop_servers(processes)
+        raise
+    return processes, base_url
+
+
+def stop_servers(processes):
+    for proc in processes:
+        proc.send_signal(signal.SIGTERM)
+    for proc in processes:
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def fetch_json(url):
+    try:
+        response = requests.get(url, timeout=10)
+        return response.json() if response.ok else None
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5001", help="API to test (ignored with --start)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of load before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Endpoint weights (default {DEFAULT_MIX})")
+    parser.add_argument("--chat-log", default=str(BASE_DIR / "chat_logs.json"))
+    parser.add_argument("--questions", help="Text file with more questions, one per line")
+    parser.add_argument("--bookings", type=int, default=1000, help="Synthetic bookings to draw from")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--max-regression", type=float,
+                        help="Exit 1 if any compared metric regressed by more than this many percent")
+
+    managed = parser.add_argument_group("managed servers")
+    managed.add_argument("--start", action="store_true", help="Start the fake LLM and the API")
+    managed.add_argument("--server", choices=["serve", "run"], default="serve")
+    managed.add_argument("--port", type=int, default=5061)
+    managed.add_argument("--llm-port", type=int, default=8061)
+    managed.add_argument("--llm-latency", type=float, default=0.3)
+    managed.add_argument("--llm-jitter", type=float, default=0.1)
+    managed.add_argument("--llm-token-delay", type=float, default=0.01)
+    managed.add_argument("--llm-error-rate", type=float, default=0.0)
+    managed.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE",
+                         help="Extra environment for the server; repeatable")
+    managed.add_argument("--ready-timeout", type=float, default=600)
+    managed.add_argument("--log-dir", default=".")
+    args = parser.parse_args()
+
+    processes = []
+    base_url = args.url.rstrip("/")
+    if args.start:
+        processes, base_url = start_servers(args)
+
+    try:
+        task_freq_map, queue_bins = load_mappings()
+        generator = LoadGenerator(
+            base_url, args.mix, load_questions(args.chat_log, args.questions),
+            synthetic_bookings(task_freq_map, queue_bins, args.bookings, seed=args.seed),
+            args.concurrency, timeout=args.timeout, seed=args.seed,
+        )
+        started_at = datetime.now().isoformat(timespec="seconds")
+        start = generator.run(args.warmup + args.duration)
+        endpoints = summarize(generator.samples, start + args.warmup, args.duration)
+        report = {
+            "started_at": started_at,
+            "url": base_url,
+            "concurrency": args.concurrency,
+            "warmup_seconds": args.warmup,
+            "measured_seconds": args.duration,
+            "mix": args.mix,
+            "seed": args.seed,
+            "endpoints": endpoints,
+            "server_stats": fetch_json(f"{base_url}/stats"),
+        }
+        if args.start:
+            report["server"] = args.server
+            report["server_env"] = args.server_env
+            report["fake_llm"] = {
+                "latency": args.llm_latency,
+                "jitter": args.llm_jitter,
+                "token_delay": args.llm_token_delay,
+                "error_rate": args.llm_error_rate,
+                "counts": fetch_json(f"http://127.0.0.1:{args.llm_port}/stats"),
+            }
+    finally:
+        stop_servers(processes)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            rows = compare(report, json.load(f))
+        print(f"\nvs {args.compare} (positive = worse)\n")
+        print(f"{'endpoint':<9} {'metric':<11} {'baseline':>10} {'current':>10} {'change':>8}")
+        for name, metric, old, new, change in rows:
+            print(f"{name:<9} {metric:<11} {old:>10} {new:>10} {change:>+7.1f}%")
+        if args.max_regression is not None:
+            worst = [r for r in rows if r[4] > args.max_regression]
+            if worst:
+                print(f"\n{len(worst)} metric(s) regressed by more than {args.max_regression}%")
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Measure per-worker memory of the preforked server (serve.py).
+
+For each worker count, starts serve.py, waits for /readyz, sends a few
+requests to every worker so they touch the index and models, then reads
+/proc/<pid>/smaps_rollup for the master and each worker:
+
+    rss      resident pages, counting shared pages in full
+    pss      proportional share: shared pages divided by the sharers
+    private  pages only this process maps (what a worker really costs)
+
+Summing PSS over all processes gives the actual footprint of the server;
+summing RSS overstates it by every shared page times the worker count.
+Linux only.
+
+Usage:
+    python scripts/measure_workers.py
+    python scripts/measure_workers.py --workers 1 4 8 --chat --output rss.json
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+from pathlib import Path
+
+import requests
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+SAMPLE_BOOKING = {
+    "appointment_date": "2025-03-14",
+    "appointment_time": "10:30",
+    "task_id": "T1",
+    "queue_number": 12,
+    "num_documents": 2,
+}
+SAMPLE_QUESTIONS = [
+    "How do I apply for a National Identity Card?",
+    "What documents do I need for a lost NIC?",
+]
+
+
+def smaps(pid):
+    """kB values from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_mb": round(values.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(values.get("Pss", 0) / 1024, 1),
+        "private_mb": round((values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)) / 1024, 1),
+        "shared_mb": round((values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0)) / 1024, 1),
+    }
+
+
+def children(pid):
+    pids = []
+    for task in Path(f"/proc/{pid}/task").iterdir():
+        text = (task / "children").read_text().split()
+        pids.extend(int(p) for p in text)
+    return sorted(pids)
+
+
+def wait_ready(proc, base_url, workers, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"serve.py exited with {proc.returncode}")
+        try:
+            ready = requests.get(f"{base_url}/readyz", timeout=2).status_code == 200
+        except requests.RequestException:
+            ready = False
+        if ready and len(children(proc.pid)) >= workers:
+            return
+        time.sleep(0.5)
+    raise RuntimeError(f"server not ready after {timeout}s")
+
+
+def exercise(base_url, rounds, chat):
+    """Spread requests over the workers so each one touches the shared state."""
+    session = requests.Session()
+    for i in range(rounds):
+        session.get(f"{base_url}/health", timeout=30)
+        session.post(f"{base_url}/predict_time", json=SAMPLE_BOOKING, timeout=30)
+        if chat:
+            question = SAMPLE_QUESTIONS[i % len(SAMPLE_QUESTIONS)]
+            session.post(f"{base_url}/chat", json={"message": question}, timeout=120)
+        # new connections, so gthread workers other than the first get work
+        session.close()
+        session = requests.Session()
+
+
+def measure(workers, port, rounds, chat, timeout, log_dir):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port), HOST="127.0.0.1")
+    log = open(Path(log_dir, f"serve-{workers}.log"), "w")
+    proc = subprocess.Popen([sys.executable, "serve.py"], cwd=BASE_DIR, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        start = time.perf_counter()
+        wait_ready(proc, base_url, workers, timeout)
+        ready_seconds = time.perf_counter() - start
+        exercise(base_url, rounds * workers, chat)
+        master = smaps(proc.pid)
+        worker_stats = [smaps(pid) for pid in children(proc.pid)]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        log.close()
+
+    def mean(key):
+        return round(sum(w[key] for w in worker_stats) / len(worker_stats), 1)
+
+    return {
+        "workers": workers,
+        "ready_seconds": round(ready_seconds, 2),
+        "master": master,
+        "worker_rss_mb": mean("rss_mb"),
+        "worker_pss_mb": mean("pss_mb"),
+        "worker_private_mb": mean("private_mb"),
+        "total_pss_mb": round(master["pss_mb"] + sum(w["pss_mb"] for w in worker_stats), 1),
+        "total_rss_mb": round(master["rss_mb"] + sum(w["rss_mb"] for w in worker_stats), 1),
+        "per_worker": worker_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--rounds", type=int, default=5, help="Request rounds per worker")
+    parser.add_argument("--chat", action="store_true",
+                        help="Also send /chat requests (needs a reachable LLM endpoint)")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--log-dir", default=".")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    results = [measure(n, args.port, args.rounds, args.chat, args.timeout, args.log_dir)
+               for n in args.workers]
+
+    print(f"{'workers':>7} {'master rss':>10} {'worker rss':>10} {'worker pss':>10} "
+          f"{'private':>8} {'total pss':>9} {'total rss':>9}   (MB)")
+    for r in results:
+        print(f"{r['workers']:>7} {r['master']['rss_mb']:>10} {r['worker_rss_mb']:>10} "
+              f"{r['worker_pss_mb']:>10} {r['worker_private_mb']:>8} {r['total_pss_mb']:>9} "
+              f"{r['total_rss_mb']:>9}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Offline retrieval benchmark: answer quality against latency and prompt cost.
+
+Chunks DATA_DIR at every --chunk-sizes setting, embeds the chunks with every
+--models embedding model, builds every --types FAISS index over them and
+runs the labelled questions from --questions (each question lists the
+source files that answer it). For each combination and each --top-k:
+
+    recall      share of the question's source files among the top k chunks
+    mrr         1 / rank of the first chunk from a source file, 0 if none
+    ctx tok     tokens of the assembled context (same assembler as /chat)
+    prompt tok  system prompt + context + question, as sent to the LLM
+    embed ms    uncached query embedding, p50 per question
+    search ms   index search at the largest k, p50 per question
+
+The ``over`` column counts chunks longer than the model's input window;
+the model silently truncates them.
+
+Usage:
+    python scripts/retrieval_benchmark.py
+    python scripts/retrieval_benchmark.py --top-k 3 5 8 --chunk-sizes 128 254 \\
+        --models sentence-transformers/all-MiniLM-L6-v2 --types flat hnsw --output retrieval.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot_core import DATA_DIR, RETRIEVAL_TOP_K, count_prompt_tokens, load_documents
+from chunker import CHUNK_MAX_TOKENS, CHUNK_MIN_TOKENS, CHUNK_OVERLAP_TOKENS, Chunker
+from context_builder import ContextAssembler
+from embeddings import EmbeddingService
+from vector_index import INDEX_TYPES, build_index, factory_string, index_bytes, resolve_params
+
+QUESTIONS_PATH = Path(__file__).resolve().parent / "retrieval_questions.json"
+DEFAULT_MODELS = ["sentence-transformers/all-MiniLM-L6-v2", "BAAI/bge-base-en-v1.5"]
+DEFAULT_CHUNK_SIZES = [128, CHUNK_MAX_TOKENS, 510]
+
+
+def load_questions(path):
+    with open(path, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    for q in questions:
+        q["sources"] = set(q["sources"])
+    return questions
+
+
+def source_name(doc):
+    return Path(doc.metadata.get("source_file") or doc.metadata.get("source") or "").name
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def make_chunks(documents, size):
+    # Token counts come from the shared EMBED_MODEL tokenizer; MiniLM and
+    # bge-base use the same WordPiece vocabulary, so sizes hold for both.
+    chunker = Chunker(max_tokens=size, overlap=min(CHUNK_OVERLAP_TOKENS, size // 4),
+                      min_tokens=min(CHUNK_MIN_TOKENS, size // 4))
+    return chunker.chunk(documents)
+
+
+def model_window(service):
+    """Maximum input tokens of a sentence-transformers model, if it says."""
+    client = getattr(service.model, "_client", None) or getattr(service.model, "client", None)
+    return getattr(client, "max_seq_length", None)
+
+
+def embed_questions(service, questions):
+    """Query vectors and per-question latency, bypassing the query cache."""
+    model = service.model
+    model.embed_query("warm up")
+    vectors, latencies = [], []
+    for q in questions:
+        start = time.perf_counter()
+        vectors.append(model.embed_query(q["question"]))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.asarray(vectors, dtype=np.float32), latencies
+
+
+def search(index, vectors, k):
+    ranked, latencies = [], []
+    for i in range(len(vectors)):
+        start = time.perf_counter()
+        _, ids = index.search(vectors[i:i + 1], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ranked.append([int(j) for j in ids[0] if j >= 0])
+    return ranked, latencies
+
+
+def score(questions, ranked, chunks, k, assembler):
+    recall = rr = context_tokens = prompt_tokens = 0.0
+    for q, ids in zip(questions, ranked):
+        docs = [chunks[i] for i in ids[:k]]
+        sources = [source_name(doc) for doc in docs]
+        recall += len(q["sources"] & set(sources)) / len(q["sources"])
+        rr += next((1 / rank for rank, s in enumerate(sources, 1) if s in q["sources"]), 0.0)
+        context = assembler.assemble(docs)
+        context_tokens += context.tokens
+        prompt_tokens += count_prompt_tokens(q["question"], context.text)
+    n = len(questions)
+    return {
+        "recall": round(recall / n, 4),
+        "mrr": round(rr / n, 4),
+        "context_tokens": round(context_tokens / n, 1),
+        "prompt_tokens": round(prompt_tokens / n, 1),
+    }
+
+
+def run(args):
+    documents = load_documents(args.data_dir)
+    questions = load_questions(args.questions)
+    assembler = ContextAssembler()
+    top_ks = sorted(set(args.top_k))
+
+    chunk_sets = {}
+    for size in args.chunk_sizes:
+        chunk_sets[size] = make_chunks(documents, size)
+        print(f"[DEBUG] chunk size {size}: {len(chunk_sets[size])} chunks")
+
+    results = []
+    for model in args.models:
+        service = EmbeddingService(model)
+        query_vectors, embed_latencies = embed_questions(service, questions)
+        window = model_window(service)
+        for size, chunks in chunk_sets.items():
+            start = time.perf_counter()
+            doc_vectors = np.asarray(service.embed_documents([c.page_content for c in chunks]),
+                                     dtype=np.float32)
+            embed_seconds = time.perf_counter() - start
+            over_window = sum(1 for c in chunks if window and c.metadata.get("tokens", 0) > window)
+            ntotal, dim = doc_vectors.shape
+            for kind in args.types:
+                params = resolve_params(kind, ntotal, dim, args.params.get(kind))
+                index = build_index(doc_vectors, kind, params)
+                ranked, search_latencies = search(index, query_vectors, min(max(top_ks), ntotal))
+                for k in top_ks:
+                    row = {
+                        "model": model,
+                        "chunk_size": size,
+                        "chunks": ntotal,
+                        "chunks_over_window": over_window,
+                        "index": kind,
+                        "factory": factory_string(kind, params),
+                        "index_bytes": index_bytes(index),
+                        "k": k,
+                        "embed_corpus_seconds": round(embed_seconds, 3),
+                        "embed_ms_p50": round(percentile(embed_latencies, 50), 3),
+                        "embed_ms_p95": round(percentile(embed_latencies, 95), 3),
+                        "search_ms_p50": round(percentile(search_latencies, 50), 4),
+                        "search_ms_p95": round(percentile(search_latencies, 95), 4),
+                    }
+                    row.update(score(questions, ranked, chunks, k, assembler))
+                    results.append(row)
+    return {"questions": len(questions), "documents": len(documents), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--questions", default=str(QUESTIONS_PATH),
+                        help='JSON list of {"question": ..., "sources": [file names]}')
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 3, RETRIEVAL_TOP_K, 10])
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=DEFAULT_CHUNK_SIZES,
+                        help="Chunk max_tokens settings to compare")
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS)
+    parser.add_argument("--types", nargs="+", choices=INDEX_TYPES, default=["flat", "hnsw", "ivf", "sq8"])
+    parser.add_argument("--params", type=json.loads, default={},
+                        help="JSON object of per-type index parameter overrides")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = run(args)
+
+    print(f"\n{report['questions']} questions over {report['documents']} documents\n")
+    print(f"{'model':<24} {'chunk':>5} {'n':>5} {'over':>4} {'index':<6} {'k':>3} {'recall':>7} "
+          f"{'mrr':>6} {'ctx tok':>8} {'prompt tok':>10} {'embed ms':>9} {'search ms':>9}")
+    for r in report["results"]:
+        print(f"{r['model'].split('/')[-1][:24]:<24} {r['chunk_size']:>5} {r['chunks']:>5} "
+              f"{r['chunks_over_window']:>4} {r['index']:<6} {r['k']:>3} {r['recall']:>7.3f} "
+              f"{r['mrr']:>6.3f} {r['context_tokens']:>8.1f} {r['prompt_tokens']:>10.1f} "
+              f"{r['embed_ms_p50']:>9.2f} {r['search_ms_p50']:>9.4f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import time
+import threading
+
+import numpy as np
+
+
+class SemanticHit:
+    def __init__(self, answer, similarity, query, sources_found):
+        self.answer = answer
+        self.similarity = similarity
+        self.query = query
+        self.sources_found = sources_found
+
+
+class SemanticCache:
+    """Answer cache keyed on query embeddings instead of exact strings.
+
+    Vectors are L2-normalised on the way in, so a lookup is one matrix-vector
+    product against at most ``maxsize`` rows. Entries expire after ``ttl``
+    seconds and the least recently used entry is evicted when full. The cache
+    is tied to a vector-store ``generation``; calling :meth:`sync` with a new
+    generation (e.g. after the FAISS index was rebuilt) drops every entry.
+    """
+
+    def __init__(self, threshold=0.92, maxsize=512, ttl=86400):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._generation = None
+        self._reset()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _reset(self):
+        self._vectors = None
+        self._answers = []
+        self._queries = []
+        self._sources = []
+        self._expires = np.empty(0)
+        self._last_used = np.empty(0)
+
+    @staticmethod
+    def _normalize(vector):
+        v = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def sync(self, generation):
+        """Invalidate everything if the vector store changed since the last call."""
+        with self._lock:
+            if generation != self._generation:
+                if self._generation is not None:
+                    self.invalidations += 1
+                self._generation = generation
+                self._reset()
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def _drop(self, keep):
+        self._vectors = self._vectors[keep]
+        self._answers = [a for a, k in zip(self._answers, keep) if k]
+        self._queries = [q for q, k in zip(self._queries, keep) if k]
+        self._sources = [s for s, k in zip(self._sources, keep) if k]
+        self._expires = self._expires[keep]
+        self._last_used = self._last_used[keep]
+
+    def lookup(self, vector):
+        """Return a :class:`SemanticHit` for the closest fresh entry above threshold."""
+        q = self._normalize(vector)
+        now = time.monotonic()
+        with self._lock:
+            if self._vectors is None or not len(self._answers):
+                self.misses += 1
+                return None
+
+            expired = self._expires <= now
+            if expired.any():
+                self._drop(~expired)
+                if not len(self._answers):
+                    self.misses += 1
+                    return None
+
+            scores = self._vectors @ q
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self._last_used[best] = now
+            self.hits += 1
+            return SemanticHit(
+                self._answers[best], similarity, self._queries[best], self._sources[best]
+            )
+
+    def store(self, vector, answer, query="", sources_found=0):
+        v = self._normalize(vector)
+        now = time.monotonic()
+        with self._lock:
+            if self._vectors is not None and len(self._answers) >= self.maxsize:
+                keep = np.ones(len(self._answers), dtype=bool)
+                keep[int(np.argmin(self._last_used))] = False
+                self._drop(keep)
+
+            if self._vectors is None or not len(self._answers):
+                self._vectors = v[np.newaxis, :]
+            else:
+                self._vectors = np.vstack([self._vectors, v])
+            self._answers.append(answer)
+            self._queries.append(query)
+            self._sources.append(sources_found)
+            self._expires = np.append(self._expires, now + self.ttl)
+            self._last_used = np.append(self._last_used, now)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._answers),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
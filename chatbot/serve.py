@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Preforking production launcher for the GovConnect Chatbot API.
+
+Runs the Flask app under gunicorn with ``preload_app``: the master imports
+app.py and finishes warming up (FAISS index, LightGBM predictor, embedding
+model) before forking, so every worker starts ready and shares those pages
+copy-on-write. The FAISS index is memory-mapped (INDEX_MMAP), so it stays
+shared through the page cache even after a worker reloads it.
+
+The cyclic GC is kept off while the master loads and everything it built is
+moved to the permanent generation with ``gc.freeze()`` before forking;
+otherwise the first collection in each worker writes to every object header
+and un-shares the pages.
+
+Environment:
+    HOST, PORT           bind address (same as run.py)
+    WEB_CONCURRENCY      worker processes (default: CPU count)
+    GUNICORN_THREADS     threads per worker (default: admission limits + 4)
+    GUNICORN_TIMEOUT     worker timeout in seconds (default: 120)
+    TORCH_THREADS        intra-op threads per worker (default: CPUs / workers)
+    METRICS_DIR          shared metrics snapshots (default: a fresh temp dir)
+
+Usage:
+    python serve.py
+    WEB_CONCURRENCY=8 python serve.py
+"""
+
+import os
+import gc
+import sys
+import tempfile
+
+from dotenv import load_dotenv
+from gunicorn.app.base import BaseApplication
+
+load_dotenv()
+
+# Workers fork from a fully warmed master; a warm-up thread would not
+# survive the fork
+os.environ["WARMUP_MODE"] = "sync"
+# Keep the master single-threaded inside torch: an OpenMP pool started
+# before fork() can deadlock the children. Workers set TORCH_THREADS.
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+# Workers publish metric snapshots here so /metrics on any of them covers all
+os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp(prefix="chatbot-metrics-"))
+
+from admission import CHAT_MAX_IN_FLIGHT, CHAT_MAX_QUEUE, PREDICT_MAX_IN_FLIGHT, PREDICT_MAX_QUEUE  # noqa: E402
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", 5001))
+WORKERS = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+# Enough threads for every admitted or queued chat and prediction plus a few
+# spare, so health checks and cheap endpoints always find a free thread
+THREADS = int(os.getenv(
+    "GUNICORN_THREADS",
+    CHAT_MAX_IN_FLIGHT + CHAT_MAX_QUEUE + PREDICT_MAX_IN_FLIGHT + PREDICT_MAX_QUEUE + 4,
+))
+TIMEOUT = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", max(1, (os.cpu_count() or 1) // WORKERS)))
+
+
+def when_ready(server):
+    """Master, after the app is loaded and before the first fork."""
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Froze {gc.get_freeze_count()} objects before forking {WORKERS} workers")
+
+
+def post_fork(server, worker):
+    gc.enable()
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(TORCH_THREADS)
+
+
+class ChatbotApplication(BaseApplication):
+    def __init__(self, options=None):
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        gc.disable()
+        from telemetry import clear_metrics_dir
+        clear_metrics_dir()
+        from app import app
+        return app
+
+
+def main():
+    options = {
+        "bind": f"{HOST}:{PORT}",
+        "workers": WORKERS,
+        "worker_class": "gthread",
+        "threads": THREADS,
+        "timeout": TIMEOUT,
+        "preload_app": True,
+        "when_ready": when_ready,
+        "post_fork": post_fork,
+        "accesslog": "-",
+    }
+    print("🤖 Starting GovConnect Chatbot API (gunicorn)...")
+    print(f"📍 Server: http://{HOST}:{PORT}")
+    print(f"⚙️  Workers: {WORKERS} x {THREADS} threads, preloaded")
+    print("-" * 50)
+    ChatbotApplication(options).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+import os
+import re
+import json
+import hashlib
+import time
+import sqlite3
+import threading
+
+import numpy as np
+
+from embeddings import get_embedding_service
+
+SESSIONS_DB = os.getenv("SESSIONS_DB", "sessions.db")
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+# Turns kept verbatim; older ones are folded into the rolling summary
+SESSION_RECENT_TURNS = int(os.getenv("SESSION_RECENT_TURNS", "3"))
+SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", "200"))
+SESSION_ANSWER_CHARS = int(os.getenv("SESSION_ANSWER_CHARS", "600"))
+# Weight of the previous turn's query in the retrieval vector, halved per turn further back
+SESSION_QUERY_BLEND = float(os.getenv("SESSION_QUERY_BLEND", "0.3"))
+SESSION_PURGE_EVERY = int(os.getenv("SESSION_PURGE_EVERY", "100"))
+
+SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    owner TEXT,
+    updated REAL NOT NULL,
+    summary TEXT NOT NULL,
+    turns TEXT NOT NULL,
+    vectors BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated);
+CREATE TABLE IF NOT EXISTS session_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    sessions INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+"""
+
+# Approximate stored size of a row, as counted in session_totals
+_ROW_BYTES = "LENGTH(summary) + LENGTH(turns) + COALESCE(LENGTH(vectors), 0)"
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def client_key(address):
+    """Opaque owner key for a client address, so no IP is stored with the session."""
+    return hashlib.sha256(str(address).encode()).hexdigest()[:32]
+
+
+def _clip(text, limit):
+    """``text`` on one line, cut at a word boundary to at most ``limit`` characters."""
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " …"
+
+
+class Session:
+    """One conversation: a rolling summary plus the most recent turns.
+
+    ``turns`` are ``(question, answer)`` pairs, oldest first, and
+    ``vectors`` holds the query embedding of each as float16 rows.
+    """
+
+    __slots__ = ("id", "summary", "turns", "vectors")
+
+    def __init__(self, id, summary="", turns=None, vectors=None):
+        self.id = id
+        self.summary = summary
+        self.turns = turns or []
+        self.vectors = vectors if vectors is not None else np.empty((0, 0), dtype=np.float16)
+
+
+class SessionStore:
+    """Server-side conversation state in an embedded SQLite database.
+
+    Shared by every worker process, so consecutive turns need not hit the
+    same worker. A record is one row of a few hundred bytes to a few KB:
+    only the last ``recent_turns`` turns are kept verbatim (answers clipped),
+    older turns are compressed extractively into a summary of at most
+    ``summary_tokens`` tokens, and the per-turn query vectors are stored
+    as float16. Sessions idle for ``ttl`` seconds expire, and beyond
+    ``max_sessions`` the least recently used ones are deleted.
+
+    A session belongs to the ``owner`` (see :func:`client_key`) that started
+    it; calls passing another owner neither see, extend nor delete it.
+
+    The number of stored sessions and their size are kept in a counter row,
+    updated in the same transaction as every insert and delete, so stats
+    never scan the table.
+    """
+
+    def __init__(self, path=SESSIONS_DB, max_sessions=SESSION_MAX, ttl=SESSION_TTL,
+                 recent_turns=SESSION_RECENT_TURNS, summary_tokens=SESSION_SUMMARY_TOKENS,
+                 answer_chars=SESSION_ANSWER_CHARS, blend=SESSION_QUERY_BLEND):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.recent_turns = recent_turns
+        self.summary_tokens = summary_tokens
+        self.answer_chars = answer_chars
+        self.blend_weight = blend
+        self._local = threading.local()
+        self._writes = 0
+        self._counts = {"turns": 0, "folded": 0, "expired": 0, "evicted": 0}
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+            if "owner" not in columns:
+                # sessions from before owners were recorded cannot be attributed
+                conn.execute("ALTER TABLE sessions ADD COLUMN owner TEXT")
+                conn.execute("DELETE FROM sessions")
+                conn.execute("DELETE FROM session_totals")
+            # one scan when the counters are first created, never afterwards
+            conn.execute(
+                f"INSERT OR IGNORE INTO session_totals (id, sessions, bytes) "
+                f"SELECT 0, COUNT(*), COALESCE(SUM({_ROW_BYTES}), 0) FROM sessions"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ----------------------------------------------------------------
+    # Records
+    # ----------------------------------------------------------------
+    def _row_bytes(self, conn, session_id):
+        row = conn.execute(f"SELECT {_ROW_BYTES} FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return None if row is None else row[0]
+
+    @staticmethod
+    def _add_totals(conn, sessions, size):
+        conn.execute(
+            "UPDATE session_totals SET sessions = sessions + ?, bytes = bytes + ? WHERE id = 0",
+            (sessions, size),
+        )
+
+    def _remove(self, conn, where, params):
+        """Delete the rows matching ``where`` and the counters' share; returns the count."""
+        count, size = conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM({_ROW_BYTES}), 0) FROM sessions WHERE {where}", params,
+        ).fetchone()
+        if count:
+            conn.execute(f"DELETE FROM sessions WHERE {where}", params)
+            self._add_totals(conn, -count, -size)
+        return count
+
+    def _load(self, conn, session_id, owner=None):
+        row = conn.execute(
+            "SELECT owner, summary, turns, vectors FROM sessions WHERE id = ? AND updated >= ?",
+            (session_id, time.time() - self.ttl),
+        ).fetchone()
+        if row is None or (owner is not None and row[0] != owner):
+            return None
+        _, summary, turns, blob = row
+        turns = [tuple(t) for t in json.loads(turns)]
+        vectors = np.frombuffer(blob or b"", dtype=np.float16)
+        vectors = vectors.reshape(len(turns), -1) if len(turns) else vectors.reshape(0, 0)
+        return Session(session_id, summary, turns, vectors)
+
+    def get(self, session_id, owner=None):
+        """The live :class:`Session` for ``session_id`` owned by ``owner``, or ``None``."""
+        return self._load(self._connect(), session_id, owner)
+
+    def append(self, session_id, question, answer, vector, owner=None):
+        """Add a turn, folding the oldest into the summary when over ``recent_turns``.
+
+        Returns ``False`` without writing if a live session ``session_id``
+        belongs to another owner.
+        """
+        vector = np.asarray(vector, dtype=np.float16).reshape(1, -1)
+        conn = self._connect()
+        with conn:
+            # one writer at a time, so concurrent turns of a session are not lost
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT owner FROM sessions WHERE id = ? AND updated >= ?",
+                (session_id, time.time() - self.ttl),
+            ).fetchone()
+            if row is not None and owner is not None and row[0] != owner:
+                return False
+            session = self._load(conn, session_id) or Session(session_id)
+            turns = session.turns + [(_clip(question, self.answer_chars),
+                                      _clip(answer, self.answer_chars))]
+            vectors = vector if not len(session.vectors) else np.vstack([session.vectors, vector])
+            summary = session.summary
+            while len(turns) > self.recent_turns:
+                summary = self._fold(summary, *turns.pop(0))
+                vectors = vectors[1:]
+                self._counts["folded"] += 1
+            # the replaced row may be expired, so it is sized whether live or not
+            old_bytes = self._row_bytes(conn, session_id)
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, owner, updated, summary, turns, vectors) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, owner, time.time(), summary, json.dumps(turns, ensure_ascii=False),
+                 vectors.astype(np.float16).tobytes()),
+            )
+            self._add_totals(conn, old_bytes is None,
+                             self._row_bytes(conn, session_id) - (old_bytes or 0))
+        self._counts["turns"] += 1
+        self._writes += 1
+        if self._writes % SESSION_PURGE_EVERY == 0:
+            self.purge()
+        return True
+
+    def delete(self, session_id, owner=None):
+        """Drop ``session_id`` if ``owner`` (when given) started it; ``True`` if deleted."""
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if owner is None:
+                deleted = self._remove(conn, "id = ?", (session_id,))
+            else:
+                deleted = self._remove(conn, "id = ? AND owner = ?", (session_id, owner))
+        return deleted > 0
+
+    def purge(self):
+        """Delete expired sessions, then the least recently used beyond ``max_sessions``."""
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            expired = self._remove(conn, "updated < ?", (time.time() - self.ttl,))
+            evicted = self._remove(
+                conn,
+                "id IN (SELECT id FROM sessions ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+        self._counts["expired"] += expired
+        self._counts["evicted"] += evicted
+
+    # ----------------------------------------------------------------
+    # Summary and query rewriting
+    # ----------------------------------------------------------------
+    def _fold(self, summary, question, answer):
+        """Add a one-line digest of a turn, dropping the oldest lines over budget."""
+        gist = _SENTENCE_RE.split(answer, maxsplit=1)[0]
+        lines = summary.splitlines() + [f"- Asked: {_clip(question, 150)} Answer: {_clip(gist, 200)}"]
+        count = get_embedding_service().count_tokens
+        while len(lines) > 1 and count("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def blend(self, session, vector):
+        """Retrieval vector for a follow-up question.
+
+        The query vector plus the stored vectors of recent turns with
+        decaying weights (newest first), rescaled to the query's norm, so
+        "what about the fees?" retrieves in the context of the previous
+        question without embedding the history again.
+        """
+        if session is None or not len(session.vectors) or self.blend_weight <= 0:
+            return vector
+        query = np.asarray(vector, dtype=np.float32)
+        mixed = query.copy()
+        weight = self.blend_weight
+        for previous in session.vectors[::-1]:
+            mixed += weight * previous.astype(np.float32)
+            weight /= 2
+        norm = np.linalg.norm(mixed)
+        if not norm:
+            return vector
+        return (mixed * (np.linalg.norm(query) / norm)).tolist()
+
+    def stats(self):
+        """Counters only; ``active`` includes expired sessions not yet purged."""
+        sessions, size = self._connect().execute(
+            "SELECT sessions, bytes FROM session_totals WHERE id = 0"
+        ).fetchone()
+        return {
+            "active": sessions,
+            "approx_bytes": size,
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl,
+            "recent_turns": self.recent_turns,
+            "summary_tokens": self.summary_tokens,
+            **self._counts,
+        }
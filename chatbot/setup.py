@@ -13,13 +13,12 @@ from dotenv import load_dotenv
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from chatbot_core import (
-    load_documents, 
-    split_documents, 
-    build_vector_store, 
     load_vector_store,
     validate_environment
 )
 from config import Config
+from indexer import update_index
+from vector_index import store_dir
 
 def setup_environment():
     """Setup and validate the environment."""
@@ -43,7 +42,7 @@ def setup_vector_store():
     print("📚 Setting up vector store...")
     
     try:
-        vector_path = Path(Config.VECTOR_DIR, "index.faiss")
+        vector_path = Path(store_dir(Config.VECTOR_DIR), "index.faiss")
         
         if vector_path.exists():
             print("📖 Existing vector store found. Testing load...")
@@ -69,20 +68,9 @@ def setup_vector_store():
             
             print(f"📄 Found {len(md_files)} markdown files")
             
-            # Load and process documents
-            documents = load_documents()
-            if not documents:
-                print("❌ No documents loaded")
-                return False
-            
-            chunks = split_documents(documents)
-            if not chunks:
-                print("❌ No chunks created from documents")
-                return False
-            
-            # Build vector store
-            db = build_vector_store(chunks)
-            print(f"✅ Vector store created successfully with {len(chunks)} chunks")
+            # Embed the documents and write the index + manifest
+            db, report = update_index(Config.DATA_DIR, Config.VECTOR_DIR)
+            print(f"✅ Vector store created successfully with {report['vectors']} chunks")
             return True
             
     except Exception as e:
@@ -0,0 +1,471 @@
+import os
+import sys
+import json
+import time
+import uuid
+import atexit
+import bisect
+import logging
+import threading
+import contextvars
+from pathlib import Path
+from contextlib import contextmanager
+
+# Preforked workers each publish a snapshot here; /metrics on any worker
+# merges them. Unset: every process reports only its own metrics.
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+# seconds; covers sub-millisecond cache lookups up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# -------------------------------------------------------------------
+# Metrics
+# -------------------------------------------------------------------
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects it."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # per-bucket counts, then sum and count
+                entry = self._values[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(k), list(v)] for k, v in self._values.items()]
+
+
+class MetricsRegistry:
+    """Named counters and histograms rendered in the Prometheus text format.
+
+    With ``directory`` set, a daemon thread writes this process's values to
+    ``<directory>/metrics-<pid>.json`` every ``flush_interval`` seconds and
+    :meth:`render` merges every file there, so a scrape that lands on any
+    preforked worker reports the whole server. A forked child starts from
+    zero instead of re-reporting what its parent already published.
+    """
+
+    def __init__(self, directory=METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.directory = Path(directory) if directory else None
+        self.flush_interval = flush_interval
+        self._metrics = {}
+        self._publisher = None
+        self._publisher_lock = threading.Lock()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            atexit.register(self.publish)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._metrics.setdefault(name, Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._metrics.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+
+    def _after_fork(self):
+        for metric in self._metrics.values():
+            metric.reset()
+        self._publisher = None
+        self._publisher_lock = threading.Lock()
+
+    # ----------------------------------------------------------------
+    # Multi-process publishing
+    # ----------------------------------------------------------------
+    def snapshot(self):
+        return {
+            name: {
+                "type": m.type,
+                "help": m.documentation,
+                "labelnames": list(m.labelnames),
+                "buckets": list(getattr(m, "buckets", ())),
+                "values": m.snapshot(),
+            }
+            for name, m in self._metrics.items()
+        }
+
+    def ensure_publisher(self):
+        if self.directory is None or self._publisher is not None:
+            return
+        with self._publisher_lock:
+            if self._publisher is None:
+                self._publisher = threading.Thread(target=self._run, name="metrics", daemon=True)
+                self._publisher.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.publish()
+            except OSError:
+                pass
+
+    def publish(self):
+        if self.directory is None:
+            return
+        path = self.directory / f"metrics-{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def collect(self):
+        """This process's snapshot, merged with every published one if sharing."""
+        if self.directory is None:
+            return self.snapshot()
+        self.publish()
+        merged = {}
+        for path in sorted(self.directory.glob("metrics-*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    _merge(merged, json.load(f))
+            except (OSError, ValueError):
+                continue
+        return merged
+
+    def render(self):
+        lines = []
+        for name, m in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {m['help']}")
+            lines.append(f"# TYPE {name} {m['type']}")
+            names = m["labelnames"]
+            for key, value in sorted(m["values"]):
+                if m["type"] == "counter":
+                    lines.append(f"{name}{_labels(names, key)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for le, count in zip(m["buckets"], value[:-2]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(names, key, ('le', _number(le)))} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(names, key, ('le', '+Inf'))} {value[-1]}")
+                lines.append(f"{name}_sum{_labels(names, key)} {_number(value[-2])}")
+                lines.append(f"{name}_count{_labels(names, key)} {value[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge(into, snapshot):
+    for name, m in snapshot.items():
+        target = into.setdefault(name, dict(m, values=[]))
+        index = {tuple(k): v for k, v in target["values"]}
+        for key, value in m["values"]:
+            key = tuple(key)
+            if key not in index:
+                index[key] = value
+            elif m["type"] == "counter":
+                index[key] = index[key] + value
+            else:
+                index[key] = [a + b for a, b in zip(index[key], value)]
+        target["values"] = [[list(k), v] for k, v in index.items()]
+
+
+def clear_metrics_dir(directory=METRICS_DIR):
+    """Drop snapshots left by an earlier run; call before forking workers."""
+    if directory:
+        for path in Path(directory).glob("metrics-*.json"):
+            path.unlink(missing_ok=True)
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "chatbot_http_requests_total", "HTTP requests by endpoint, method and status",
+    ("endpoint", "method", "status"),
+)
+HTTP_SECONDS = registry.histogram(
+    "chatbot_http_request_seconds", "HTTP request duration, including streamed bodies",
+    ("endpoint",),
+)
+STAGE_SECONDS = registry.histogram(
+    "chatbot_stage_seconds", "Time spent in each hot-path stage", ("stage",),
+)
+CHAT_RESPONSES = registry.counter(
+    "chatbot_chat_responses_total", "Chat answers by where they came from", ("source",),
+)
+INGEST_RUNS = registry.counter(
+    "chatbot_ingest_runs_total", "Index updates by kind", ("kind",),
+)
+INGEST_SECONDS = registry.histogram(
+    "chatbot_ingest_stage_seconds", "Index update time per stage", ("stage",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+INGEST_CHUNKS = registry.counter(
+    "chatbot_ingest_chunks_total", "Chunks embedded by index updates",
+)
+
+
+def record_ingest(report):
+    """Export an :func:`indexer.update_index` report."""
+    if report.get("full_rebuild"):
+        kind = "full"
+    elif report.get("added") or report.get("changed") or report.get("removed"):
+        kind = "incremental"
+    else:
+        kind = "unchanged"
+    INGEST_RUNS.inc(kind=kind)
+    for stage, seconds in report.get("timings", {}).items():
+        INGEST_SECONDS.observe(seconds, stage=stage)
+    INGEST_SECONDS.observe(report.get("seconds", 0.0), stage="total")
+    INGEST_CHUNKS.inc(report.get("chunks_embedded", 0))
+    registry.ensure_publisher()
+
+
+# -------------------------------------------------------------------
+# Traces and spans
+# -------------------------------------------------------------------
+class Trace:
+    """Per-request trace ID plus the time spent in each stage."""
+
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def stage_ms(self):
+        return {stage: round(s * 1000, 2) for stage, s in self.stages.items()}
+
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+def start_trace(trace_id=None):
+    trace = Trace(_clean_trace_id(trace_id))
+    _current.set(trace)
+    return trace
+
+
+def activate(trace):
+    """Make ``trace`` current, e.g. inside a streamed response body."""
+    _current.set(trace)
+
+
+def current_trace():
+    return _current.get()
+
+
+def _clean_trace_id(value):
+    if not value:
+        return None
+    value = "".join(c for c in value if c.isalnum() or c in "-_")[:64]
+    return value or None
+
+
+@contextmanager
+def span(stage):
+    """Time a block into ``chatbot_stage_seconds`` and the current trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+    registry.ensure_publisher()
+
+
+def finish_request(trace, endpoint, method, status):
+    """Record the request metrics; returns the fields for the request log line."""
+    seconds = time.perf_counter() - trace.started
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=method, status=status)
+    HTTP_SECONDS.observe(seconds, endpoint=endpoint)
+    registry.ensure_publisher()
+    return {
+        "endpoint": endpoint,
+        "method": method,
+        "status": status,
+        "duration_ms": round(seconds * 1000, 2),
+        "stages_ms": trace.stage_ms(),
+    }
+
+
+# -------------------------------------------------------------------
+# Logging
+# -------------------------------------------------------------------
+class TraceIdFilter(logging.Filter):
+    """Adds ``trace_id`` ("-" outside a request) to every record."""
+
+    def filter(self, record):
+        trace = _current.get()
+        record.trace_id = trace.trace_id if trace is not None else "-"
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(
+                f"{k}={json.dumps(v, separators=(',', ':')) if isinstance(v, dict) else v}"
+                for k, v in fields.items()
+            )
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra={"fields": {...}}`` is merged in."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "trace_id": getattr(record, "trace_id", "-"),
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(fmt=LOG_FORMAT, level=LOG_LEVEL):
+    """Root logging with trace IDs; ``fmt`` is "text" or "json"."""
+    handler = logging.StreamHandler()
+    handler.addFilter(TraceIdFilter())
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter(
+            "%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s"
+        ))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+
+
+# -------------------------------------------------------------------
+# Sampling profiler
+# -------------------------------------------------------------------
+# Leaf frames of threads that are parked rather than doing work
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+    ("socketserver.py", "serve_forever"),
+}
+
+
+class SamplingProfiler:
+    """Wall-clock stack sampler for capturing hot paths in a live process.
+
+    Every ``interval`` seconds the stack of every other thread is recorded;
+    the result is in the "folded" format (``frame;frame;frame count``) read
+    by flamegraph.pl and speedscope. Only one capture runs at a time.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stack(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def capture(self, seconds, include_idle=False):
+        """Sample for ``seconds``; returns ``(folded_text, samples)``, or ``None`` if busy."""
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            me = threading.get_ident()
+            counts, samples = {}, 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                    if not include_idle and leaf in _IDLE_FRAMES:
+                        continue
+                    stack = self._stack(frame)
+                    counts[stack] = counts.get(stack, 0) + 1
+                samples += 1
+                time.sleep(self.interval)
+            lines = [f"{stack} {n}" for stack, n in sorted(counts.items(), key=lambda kv: -kv[1])]
+            return "\n".join(lines) + "\n", samples
+        finally:
+            self._lock.release()
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,96 @@
+import os
+import sys
+import shutil
+import hashlib
+import tempfile
+
+import pytest
+
+# The chatbot modules are flat files in the parent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DOCS = {
+    "nic.md": "# National Identity Card\n\nApply at your Divisional Secretariat with a birth certificate.\n",
+    "passport.md": "# Passports\n\nSubmit the application form and two photographs at the Department of Immigration.\n",
+    "licence.md": "# Driving Licence\n\nPass the written and practical tests at the Department of Motor Traffic.\n",
+}
+
+
+class FakeEmbeddings:
+    """Small deterministic stand-in for the sentence-transformers model."""
+
+    size = 16
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [b / 255.0 for b in digest[:self.size]]
+
+
+def install_fakes(mp):
+    """Route embeddings and markdown loading through local stand-ins.
+
+    Tests must not download the embedding model, nor depend on the
+    ``unstructured`` package for parsing a few plain markdown files.
+    """
+    from langchain_community import document_loaders
+    from langchain_community.document_loaders import TextLoader
+
+    from embeddings import get_embedding_service
+
+    class MarkdownLoader(TextLoader):
+        def __init__(self, path, **kwargs):
+            super().__init__(path, encoding="utf-8")
+
+    service = get_embedding_service()
+    mp.setattr(service, "_model", FakeEmbeddings())
+    mp.setattr(service, "_tokenizer_failed", True)
+    mp.setattr(document_loaders, "UnstructuredMarkdownLoader", MarkdownLoader)
+
+
+def write_docs(data_dir, docs=DOCS):
+    os.makedirs(data_dir, exist_ok=True)
+    for name, text in docs.items():
+        with open(os.path.join(data_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def pytest_configure(config):
+    # app.py and its modules read their paths at import; keep every database
+    # and index a test run creates out of the working tree
+    root = tempfile.mkdtemp(prefix="chatbot-tests-")
+    config._chatbot_root = root
+    write_docs(os.path.join(root, "data"))
+    os.environ.update(
+        DATA_DIR=os.path.join(root, "data"),
+        VECTOR_DIR=os.path.join(root, "vectors"),
+        SESSIONS_DB=os.path.join(root, "sessions.db"),
+        FEEDBACK_DB=os.path.join(root, "feedback.db"),
+        INTERACTIONS_DB=os.path.join(root, "interactions.db"),
+        WARMUP_MODE="sync",
+        HF_HUB_OFFLINE="1",
+    )
+    os.environ.setdefault("MISTRAL_API_KEY", "test")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(getattr(config, "_chatbot_root", ""), ignore_errors=True)
+
+
+@pytest.fixture
+def fake_embedder(monkeypatch):
+    install_fakes(monkeypatch)
+
+
+@pytest.fixture(scope="session")
+def chatbot_app():
+    """The Flask app module, warmed up over the test knowledge base."""
+    with pytest.MonkeyPatch.context() as mp:
+        install_fakes(mp)
+        import app
+        assert app.db is not None, "vector store failed to load"
+        yield app
+        # write queued interactions before pytest_unconfigure removes the files
+        app.interaction_log.flush()
@@ -0,0 +1,196 @@
+"""Admission control (admission.py): bounded pools and per-client rate limits."""
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+import admission
+from admission import AdmissionController, AsyncAdmissionController, RateLimiter, Rejected
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_waiter_gets_released_slot():
+    pool = AdmissionController("test", 1, 4, 5.0)
+    held = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    while pool.queued == 0:
+        time.sleep(0.001)
+    held.release()
+    waiter.join(5)
+    assert got and pool.in_flight == 1
+    got[0].release()
+    assert pool.in_flight == 0 and pool.stats()["admitted"] == 2
+
+
+def test_queue_timeout_rejects_with_503():
+    pool = AdmissionController("test", 1, 4, 0.05)
+    with pool.acquire():
+        start = time.perf_counter()
+        with pytest.raises(Rejected) as e:
+            pool.acquire()
+        assert time.perf_counter() - start >= 0.05
+    assert (e.value.reason, e.value.status, e.value.retry_after) == ("timeout", 503, 1)
+    assert pool.queued == 0 and pool.in_flight == 0
+    assert pool.stats()["timeout"] == 1
+
+
+def test_full_queue_rejects_immediately():
+    pool = AdmissionController("test", 1, 0, 5.0)
+    with pool.acquire():
+        start = time.perf_counter()
+        with pytest.raises(Rejected) as e:
+            pool.acquire()
+        assert time.perf_counter() - start < 0.5
+    assert (e.value.reason, e.value.status) == ("queue_full", 503)
+
+
+def test_expected_wait_past_deadline_rejects_immediately():
+    pool = AdmissionController("test", 1, 4, 1.0)
+    pool._avg_hold = 4.0  # recent requests held their slot for 4 s
+    with pool.acquire():
+        with pytest.raises(Rejected) as e:
+            pool.acquire()
+    # retry_after is the expected wait, in whole seconds
+    assert (e.value.reason, e.value.retry_after) == ("deadline", 4)
+
+
+def test_async_queue_timeout_rejects():
+    async def scenario():
+        pool = AsyncAdmissionController("test", 1, 4, 0.05)
+        held = await pool.acquire()
+        with pytest.raises(Rejected) as e:
+            await pool.acquire()
+        held.release()
+        return pool, e.value
+
+    pool, rejected = asyncio.run(scenario())
+    assert rejected.reason == "timeout"
+    assert pool.in_flight == 0 and pool.queued == 0
+
+
+def test_token_bucket(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    limiter = RateLimiter("test", per_minute=60, burst=2)
+
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(Rejected) as e:
+        limiter.check("a")
+    assert (e.value.reason, e.value.status, e.value.retry_after) == ("rate_limited", 429, 1)
+    limiter.check("b")  # buckets are per client
+
+    clock.now += 1.0  # one token per second refills
+    limiter.check("a")
+    with pytest.raises(Rejected):
+        limiter.check("a")
+
+    clock.now += 60  # never more than burst
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(Rejected):
+        limiter.check("a")
+    assert limiter.stats()["rate_limited"] == 3
+
+
+def test_token_bucket_evicts_least_recent_client(monkeypatch):
+    monkeypatch.setattr(admission.time, "monotonic", Clock())
+    limiter = RateLimiter("test", per_minute=60, burst=1, max_clients=2)
+    limiter.check("a")
+    limiter.check("b")
+    limiter.check("c")  # evicts "a", which starts again with a full bucket
+    limiter.check("a")
+    assert limiter.stats()["clients"] == 2
+
+
+def test_rate_limit_disabled():
+    limiter = RateLimiter("test", per_minute=0, burst=1)
+    for _ in range(100):
+        limiter.check("a")
+
+
+def test_rejections_carry_retry_after_header(chatbot_app, monkeypatch):
+    client = chatbot_app.app.test_client()
+    monkeypatch.setattr(chatbot_app, "chat_rate_limiter", RateLimiter("chat", 60, 1))
+    assert client.post("/chat", json={"message": "hello"}).status_code == 200
+    response = client.post("/chat", json={"message": "hello"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response.json["error"] == "rate_limited"
+
+
+def test_full_pool_turns_away_retrieval_but_not_greetings(chatbot_app, monkeypatch):
+    client = chatbot_app.app.test_client()
+    monkeypatch.setattr(chatbot_app, "chat_rate_limiter", RateLimiter("chat", 0, 1))
+    monkeypatch.setattr(chatbot_app, "chat_admission", AdmissionController("chat", 0, 0, 0.1))
+
+    response = client.post("/chat", json={"message": "What does a passport application need?"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json["error"] == "queue_full"
+    # templated answers never take a slot
+    assert client.post("/chat", json={"message": "hello"}).status_code == 200
+
+
+def test_async_cancelled_waiter_leaves_no_slot():
+    async def scenario():
+        pool = AsyncAdmissionController("test", 1, 4, 5.0)
+        held = await pool.acquire()
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0)
+        assert pool.queued == 1
+
+        waiter.cancel()  # client disconnected while queued
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert pool.queued == 0
+
+        held.release()
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.in_flight == 0
+
+
+def test_async_slot_handed_to_cancelled_waiter_is_returned():
+    async def scenario():
+        pool = AsyncAdmissionController("test", 1, 4, 5.0)
+        held = await pool.acquire()
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0)
+
+        held.release()   # hands the slot to the waiter...
+        waiter.cancel()  # ...which is cancelled before it resumes
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert waiter.cancelled()
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.in_flight == 0
+    assert pool.queued == 0
+
+
+def test_async_waiter_gets_released_slot():
+    async def scenario():
+        pool = AsyncAdmissionController("test", 1, 4, 5.0)
+        held = await pool.acquire()
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0)
+        held.release()
+        slot = await waiter
+        assert pool.in_flight == 1
+        slot.release()
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.in_flight == 0
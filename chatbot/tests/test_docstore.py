@@ -0,0 +1,63 @@
+"""SQLite docstore (docstore.py): read-only serving stores."""
+
+import os
+
+import pytest
+
+from conftest import write_docs
+from docstore import ReadOnlyDocstoreError, SQLiteDocstore
+from embeddings import get_embedding_service
+from indexer import update_index
+from vector_index import open_store
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Record every add/delete call on a SQLiteDocstore (they raise regardless)."""
+    calls = []
+
+    def add(self, texts):
+        calls.append(("add", texts))
+        raise ReadOnlyDocstoreError("add")
+
+    def delete(self, ids):
+        calls.append(("delete", ids))
+        raise ReadOnlyDocstoreError("delete")
+
+    monkeypatch.setattr(SQLiteDocstore, "add", add)
+    monkeypatch.setattr(SQLiteDocstore, "delete", delete)
+    return calls
+
+
+def test_add_and_delete_raise_read_only(tmp_path, fake_embedder):
+    write_docs(tmp_path / "data")
+    db, _ = update_index(str(tmp_path / "data"), str(tmp_path / "vectors"), workers=1)
+    assert isinstance(db.docstore, SQLiteDocstore)
+
+    with pytest.raises(ReadOnlyDocstoreError):
+        db.docstore.add({"id": None})
+    with pytest.raises(ReadOnlyDocstoreError):
+        db.docstore.delete(list(db.index_to_docstore_id.values())[:1])
+    assert issubclass(ReadOnlyDocstoreError, RuntimeError)
+
+
+def test_serving_path_never_writes_to_the_docstore(tmp_path, fake_embedder, writes):
+    data_dir, vector_dir = tmp_path / "data", str(tmp_path / "vectors")
+    write_docs(data_dir)
+    served, _ = update_index(str(data_dir), vector_dir, workers=1)
+
+    # an update adds, changes and removes files while the old store serves
+    write_docs(data_dir, {"birth.md": "# Birth Certificates\n\nRequest a copy from the Registrar.\n",
+                          "nic.md": "# National Identity Card\n\nThe fee is Rs. 100.\n"})
+    os.remove(data_dir / "licence.md")
+    assert served.similarity_search("identity card", k=2)
+    reloaded, report = update_index(str(data_dir), vector_dir, workers=1)
+    assert report["added"] and report["changed"] and report["removed"]
+
+    # unchanged data, reopening and searching
+    update_index(str(data_dir), vector_dir, workers=1)
+    reopened = open_store(vector_dir, get_embedding_service())
+    for store in (served, reloaded, reopened):
+        assert store.similarity_search("birth certificate", k=2)
+
+    assert writes == []
@@ -0,0 +1,64 @@
+"""
+Parity of the /predict_time feature encoders with the original implementation.
+
+fixtures/baseline_features.json holds booking rows and the features the
+original per-request ``preprocess_input`` (app.py before features.py
+existed) produced for each, with the task frequencies and queue bins it
+used. Both the vectorized ``build_features`` and the single-row
+``FeatureEncoder`` must reproduce them exactly.
+
+Run from chatbot/:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import json
+import math
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import FEATURE_COLUMNS, FeatureEncoder, build_features
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "baseline_features.json")
+
+with open(FIXTURE, "r", encoding="utf-8") as f:
+    BASELINE = json.load(f)
+CASES = BASELINE["cases"]
+
+
+def expected(case):
+    """Baseline features in FEATURE_COLUMNS order; ``None`` stands for NaN."""
+    return [case["features"][c] for c in FEATURE_COLUMNS]
+
+
+def assert_same(got, want):
+    for column, g, w in zip(FEATURE_COLUMNS, got, want):
+        if w is None:
+            assert isinstance(g, float) and math.isnan(g), f"{column}: {g!r} != NaN"
+        else:
+            assert float(g) == float(w), f"{column}: {g!r} != {w!r}"
+
+
+@pytest.mark.parametrize("case", CASES, ids=range(len(CASES)))
+def test_encoder_matches_baseline(case):
+    encoder = FeatureEncoder(BASELINE["task_freq_map"], BASELINE["queue_bins"])
+    assert_same(encoder.encode(case["input"]), expected(case))
+
+
+def test_build_features_matches_baseline():
+    df = pd.DataFrame([case["input"] for case in CASES])
+    features = build_features(df, BASELINE["task_freq_map"], BASELINE["queue_bins"])
+    assert list(features.columns) == FEATURE_COLUMNS
+    for i, case in enumerate(CASES):
+        assert_same(features.iloc[i].tolist(), expected(case))
+
+
+@pytest.mark.parametrize("case", CASES[:5], ids=range(5))
+def test_build_features_single_row_matches_baseline(case):
+    features = build_features(pd.DataFrame([case["input"]]),
+                              BASELINE["task_freq_map"], BASELINE["queue_bins"])
+    assert_same(features.iloc[0].tolist(), expected(case))
@@ -0,0 +1,75 @@
+"""Feedback store (feedback_store.py): JSON migration, pagination and summary."""
+
+import json
+
+import pytest
+
+from feedback_store import FeedbackStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeedbackStore(path=str(tmp_path / "feedback.db"))
+
+
+def entry(i, rating=5, **extra):
+    return {"timestamp": f"2025-03-{i % 28 + 1:02d} 10:00:00", "rating": rating,
+            "message": f"message {i}", "bot_response": "answer", "user_query": "question",
+            "user_ip": "10.0.0.1", **extra}
+
+
+def test_migrate_json_imports_once(store, tmp_path):
+    legacy = tmp_path / "feedback.json"
+    legacy.write_text(json.dumps([entry(1), entry(2, rating="great"), "not an entry",
+                                  entry(3, message={"nested": True})]), encoding="utf-8")
+
+    assert store.migrate_json(str(legacy)) == 4
+    assert store.page()["total"] == 3
+    # recorded in the migrations table, so a restart does not import again
+    assert store.migrate_json(str(legacy)) == 0
+    assert FeedbackStore(path=store.path).migrate_json(str(legacy)) == 0
+    assert store.page()["total"] == 3
+
+    messages = {item["message"] for item in store.page()["items"]}
+    assert '{"nested": true}' in messages
+
+
+def test_migrate_json_missing_or_corrupt(store, tmp_path):
+    assert store.migrate_json(str(tmp_path / "absent.json")) == 0
+    corrupt = tmp_path / "corrupt.json"
+    corrupt.write_text("[{", encoding="utf-8")
+    assert store.migrate_json(str(corrupt)) == 0
+    assert store.page()["total"] == 0
+
+
+def test_page_is_newest_first_and_hides_ip(store):
+    ids = [store.add(entry(i)) for i in range(7)]
+
+    first = store.page(page=1, per_page=3)
+    assert first["total"] == 7
+    assert [item["id"] for item in first["items"]] == ids[::-1][:3]
+    assert "user_ip" not in first["items"][0]
+
+    last = store.page(page=3, per_page=3)
+    assert [item["id"] for item in last["items"]] == [ids[0]]
+    assert store.page(page=4, per_page=3)["items"] == []
+
+
+def test_page_clamps_arguments(store):
+    store.add(entry(1))
+    assert store.page(page=0, per_page=0)["page"] == 1
+    assert store.page(page=0, per_page=0)["per_page"] == 1
+    assert store.page(per_page=10_000)["per_page"] == 500
+
+
+def test_summary_rolls_up_ratings_and_days(store):
+    for i, rating in enumerate([5, 4, 4, "thumbs_up"]):
+        store.add(entry(i, rating=rating))
+
+    summary = store.summary()
+    assert summary["total"] == 4
+    # text ratings are counted but left out of the average
+    assert summary["average_rating"] == pytest.approx(13 / 3, abs=1e-3)
+    assert summary["ratings"] == {"4": 2, "5": 1, "thumbs_up": 1}
+    assert summary["daily"] == {"2025-03-01": 1, "2025-03-02": 1, "2025-03-03": 1, "2025-03-04": 1}
+    assert list(store.summary(days=2)["daily"]) == ["2025-03-03", "2025-03-04"]
@@ -0,0 +1,140 @@
+"""Incremental indexer (indexer.py): add/change/remove, manifest and build pruning."""
+
+import os
+import json
+import time
+
+import pytest
+
+from conftest import DOCS, write_docs
+from indexer import BUILD_PREFIX, MANIFEST_VERSION, load_manifest, prune_builds, update_index
+from vector_index import MANIFEST_NAME, store_dir
+
+
+@pytest.fixture
+def dirs(tmp_path, fake_embedder):
+    data_dir, vector_dir = tmp_path / "data", tmp_path / "vectors"
+    write_docs(data_dir)
+    return str(data_dir), str(vector_dir)
+
+
+def update(dirs, **kwargs):
+    data_dir, vector_dir = dirs
+    return update_index(data_dir, vector_dir, workers=1, **kwargs)
+
+
+def manifest(dirs):
+    with open(os.path.join(dirs[1], MANIFEST_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def stored_ids(db):
+    return set(db.index_to_docstore_id.values())
+
+
+def test_first_run_builds_everything(dirs):
+    db, report = update(dirs)
+    assert report["full_rebuild"]
+    assert sorted(report["added"]) == sorted(DOCS)
+
+    written = manifest(dirs)
+    assert written["version"] == MANIFEST_VERSION
+    assert sorted(written["files"]) == sorted(DOCS)  # keys relative to data_dir
+    assert written["build"].startswith(BUILD_PREFIX)
+    assert str(store_dir(dirs[1])) == os.path.join(dirs[1], written["build"])
+    assert stored_ids(db) == {i for entry in written["files"].values() for i in entry["ids"]}
+    assert load_manifest(dirs[1], dirs[0])["checksum"] == report["checksum"]
+
+
+def test_unchanged_data_reuses_the_build(dirs):
+    _, first = update(dirs)
+    build = manifest(dirs)["build"]
+    db, report = update(dirs)
+    assert (report["added"], report["changed"], report["removed"]) == ([], [], [])
+    assert not report["full_rebuild"]
+    assert manifest(dirs)["build"] == build
+    assert report["checksum"] == first["checksum"]
+    assert db.index.ntotal == first["vectors"]
+
+
+def test_add_change_remove_touch_only_those_files(dirs):
+    data_dir, _ = dirs
+    update(dirs)
+    before = manifest(dirs)["files"]
+
+    write_docs(data_dir, {"birth.md": "# Birth Certificates\n\nRequest a copy from the Registrar.\n"})
+    with open(os.path.join(data_dir, "nic.md"), "a", encoding="utf-8") as f:
+        f.write("\nThe fee is Rs. 100.\n")
+    os.remove(os.path.join(data_dir, "licence.md"))
+
+    db, report = update(dirs)
+    assert (report["added"], report["changed"], report["removed"]) == (["birth.md"], ["nic.md"], ["licence.md"])
+    after = manifest(dirs)["files"]
+    assert report["chunks_embedded"] == len(after["birth.md"]["ids"]) + len(after["nic.md"]["ids"])
+
+    assert after["passport.md"] == before["passport.md"]
+    assert not set(after["nic.md"]["ids"]) & set(before["nic.md"]["ids"])
+    assert "licence.md" not in after
+    assert stored_ids(db) == {i for entry in after.values() for i in entry["ids"]}
+
+
+def test_incremental_checksum_matches_full_rebuild(dirs):
+    data_dir, _ = dirs
+    update(dirs)
+    write_docs(data_dir, {"birth.md": "# Birth Certificates\n\nRequest a copy from the Registrar.\n"})
+    _, incremental = update(dirs)
+    _, rebuilt = update(dirs, rebuild=True)
+    assert rebuilt["full_rebuild"]
+    assert rebuilt["checksum"] == incremental["checksum"]
+
+
+def make_builds(vector_dir, ages):
+    """Build dirs, oldest first, created ``ages`` seconds ago."""
+    names = []
+    for i, age in enumerate(ages):
+        name = f"{BUILD_PREFIX}2025010{i}-000000-0000000{i}"
+        (vector_dir / name).mkdir()
+        os.utime(vector_dir / name, (time.time() - age, time.time() - age))
+        names.append(name)
+    return names
+
+
+def test_prune_builds_keeps_current_and_removes_leftovers(tmp_path):
+    names = make_builds(tmp_path, [400, 300, 200, 100])
+    stale, fresh = tmp_path / ".build-stale", tmp_path / ".build-fresh"
+    stale.mkdir()
+    fresh.mkdir()
+    hour_ago = time.time() - 3700
+    os.utime(stale, (hour_ago, hour_ago))
+
+    prune_builds(tmp_path, names[-1], keep=2, min_age=70)
+
+    remaining = sorted(p.name for p in tmp_path.iterdir())
+    assert remaining == [".build-fresh"] + names[-2:]
+
+
+def test_prune_builds_spares_recently_superseded_builds(tmp_path):
+    # names[1] replaced names[0] 30 s ago: a worker may not have reloaded yet
+    names = make_builds(tmp_path, [400, 30, 10])
+    prune_builds(tmp_path, names[-1], keep=2, min_age=70)
+    assert sorted(p.name for p in tmp_path.iterdir()) == names
+
+
+def test_prune_builds_always_keeps_the_previous_build(tmp_path):
+    names = make_builds(tmp_path, [900, 800])
+    prune_builds(tmp_path, names[-1], keep=2, min_age=70)
+    assert sorted(p.name for p in tmp_path.iterdir()) == names
+
+
+def test_prune_builds_logs_removal_of_legacy_files(tmp_path, capsys):
+    (tmp_path / "index.faiss").write_bytes(b"legacy")
+    (tmp_path / "index.pkl").write_bytes(b"legacy")
+    names = make_builds(tmp_path, [10, 5])
+    prune_builds(tmp_path, names[-1], keep=2, min_age=70)
+    assert (tmp_path / "index.faiss").exists()  # first build too recent
+
+    os.utime(tmp_path / names[0], (time.time() - 100, time.time() - 100))
+    prune_builds(tmp_path, names[-1], keep=2, min_age=70)
+    assert sorted(p.name for p in tmp_path.iterdir()) == names
+    out = capsys.readouterr().out
+    assert "index.faiss" in out and "index.pkl" in out and names[0] in out
@@ -0,0 +1,61 @@
+"""Interaction log (interaction_log.py): JSON migration and counter rollups."""
+
+import json
+
+import pytest
+
+from interaction_log import InteractionLog, default_range, parse_range_bound
+
+
+@pytest.fixture
+def log(tmp_path):
+    return InteractionLog(path=str(tmp_path / "interactions.db"), flush_interval=0.01)
+
+
+def test_migrate_json_imports_once_and_fills_counters(log, tmp_path):
+    legacy = tmp_path / "chat_logs.json"
+    legacy.write_text(json.dumps([
+        {"timestamp": "2025-03-01 09:15:00", "query": "q1", "answer": "a1"},
+        {"timestamp": "2025-03-01 09:45:00", "query": "q2", "answer": "a2"},
+        {"timestamp": "2025-03-01 14:00:00", "query": "q3", "answer": "a3"},
+        {"timestamp": "2025-03-02 08:00:00", "query": "q4", "answer": "a4"},
+        {"query": "no timestamp"},
+        "not an entry",
+    ]), encoding="utf-8")
+
+    assert log.migrate_json(str(legacy)) == 4
+    assert log.migrate_json(str(legacy)) == 0
+    assert InteractionLog(path=log.path).migrate_json(str(legacy)) == 0
+
+    assert log.total() == 4
+    assert log.count_day("2025-03-01") == 3
+    assert log.count_range("2025-03-01 00", "2025-03-01 23", granularity="hour") == {
+        "total": 3, "buckets": {"2025-03-01 09": 2, "2025-03-01 14": 1},
+    }
+    assert log.count_range("2025-03-01", "2025-03-31") == {
+        "total": 4, "buckets": {"2025-03-01": 3, "2025-03-02": 1},
+    }
+
+
+def test_record_is_batched_into_counters(log):
+    for i in range(5):
+        log.record(f"q{i}", f"a{i}", user_ip="10.0.0.1", timestamp=f"2025-04-0{1 + i % 2} 12:00:00")
+    log.flush()
+
+    assert log.total() == 5
+    assert log.count_range("2025-04-01", "2025-04-02")["buckets"] == {"2025-04-01": 3, "2025-04-02": 2}
+    rows = log._connect().execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
+    assert rows == 5
+    assert log.stats()["pending_writes"] == 0
+
+
+def test_range_bounds():
+    assert parse_range_bound("2025-03-01T09:30:00", "hour", None) == "2025-03-01 09"
+    assert parse_range_bound("2025-03-01", "hour", None) == "2025-03-01 00"
+    assert parse_range_bound("2025-03-01 09:30", "day", None) == "2025-03-01"
+    assert parse_range_bound("", "day", "fallback") == "fallback"
+
+    start, end = default_range("day", days=7)
+    assert len(start) == len(end) == 10 and start < end
+    start, end = default_range("hour")
+    assert len(start) == len(end) == 13 and start < end
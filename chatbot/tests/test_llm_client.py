@@ -0,0 +1,197 @@
+"""Circuit breaker and retry behaviour of the LLM clients (llm_client.py)."""
+
+import asyncio
+
+import httpx
+import pytest
+import requests
+
+import llm_client
+from llm_client import (
+    AsyncLLMClient,
+    CircuitBreaker,
+    CircuitOpenError,
+    LLMClient,
+    LLMClientError,
+    RetryPolicy,
+)
+
+URL = "http://llm.test/v1/chat/completions"
+
+
+class Clock:
+    """time.monotonic that can be moved forward, so breaker timeouts pass instantly.
+
+    It keeps ticking with the real clock, as the asyncio event loop reads it too.
+    """
+
+    def __init__(self, monotonic):
+        self._monotonic = monotonic
+        self.offset = 0.0
+
+    def __call__(self):
+        return self._monotonic() + self.offset
+
+    def advance(self, seconds):
+        self.offset += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(llm_client.time.monotonic)
+    monkeypatch.setattr(llm_client.time, "monotonic", clock)
+    return clock
+
+
+def half_open_breaker(clock):
+    breaker = CircuitBreaker(threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.advance(30)
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def test_breaker_closed_open_half_open_closed(clock):
+    breaker = CircuitBreaker(threshold=2, reset_timeout=30)
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.advance(29)
+    assert breaker.state == "open"
+    clock.advance(1)
+    assert breaker.state == "half_open"
+    assert breaker.allow()  # the trial call
+    assert not breaker.allow()  # only one at a time
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_the_circuit(clock):
+    breaker = half_open_breaker(clock)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    clock.advance(30)
+    assert breaker.allow()
+
+
+class RaisingSession:
+    def __init__(self, exc):
+        self.exc = exc
+        self.calls = 0
+
+    def post(self, *args, **kwargs):
+        self.calls += 1
+        raise self.exc
+
+
+@pytest.mark.parametrize("exc", [
+    requests.exceptions.ChunkedEncodingError("truncated body"),
+    requests.exceptions.TooManyRedirects("redirect loop"),
+])
+def test_trial_raising_request_exception_reopens_the_circuit(clock, exc):
+    breaker = half_open_breaker(clock)
+    client = LLMClient(breaker=breaker, retry_policy=RetryPolicy(max_retries=0))
+    client.session = RaisingSession(exc)
+
+    with pytest.raises(LLMClientError):
+        client.chat(URL, {}, {})
+    assert breaker.state == "open"
+
+    # the next trial is let through once the reset timeout has passed again
+    clock.advance(30)
+    with pytest.raises(LLMClientError):
+        client.chat(URL, {}, {})
+    assert client.session.calls == 2
+
+
+def test_trial_raising_unexpected_exception_does_not_wedge_the_breaker(clock):
+    breaker = half_open_breaker(clock)
+    client = LLMClient(breaker=breaker, retry_policy=RetryPolicy(max_retries=0))
+    client.session = RaisingSession(RuntimeError("bug in an adapter"))
+
+    with pytest.raises(RuntimeError):
+        client.chat(URL, {}, {})
+    assert breaker.state == "open"
+    clock.advance(30)
+    assert breaker.allow()
+
+
+def test_open_circuit_fails_fast_without_calling_the_provider(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    client = LLMClient(breaker=breaker)
+    client.session = RaisingSession(AssertionError("provider must not be called"))
+
+    with pytest.raises(CircuitOpenError):
+        client.chat(URL, {}, {})
+    assert client.metrics.rejected == 1
+
+
+def async_client(breaker, handler):
+    client = AsyncLLMClient(breaker=breaker, retry_policy=RetryPolicy(max_retries=0))
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_async_trial_raising_http_error_reopens_the_circuit(clock):
+    breaker = half_open_breaker(clock)
+
+    def handler(request):
+        raise httpx.TooManyRedirects("redirect loop", request=request)
+
+    async def scenario():
+        client = async_client(breaker, handler)
+        with pytest.raises(LLMClientError):
+            await client.chat(URL, {}, {})
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert breaker.state == "open"
+    clock.advance(30)
+    assert breaker.allow()
+
+
+def test_async_cancelled_trial_does_not_wedge_the_breaker(clock):
+    breaker = half_open_breaker(clock)
+
+    async def handler(request):
+        await asyncio.sleep(10)
+
+    async def scenario():
+        client = async_client(breaker, handler)
+        call = asyncio.ensure_future(client.chat(URL, {}, {}))
+        await asyncio.sleep(0.01)
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert breaker.state == "open"
+    clock.advance(30)
+    assert breaker.allow()
+
+
+def test_async_trial_success_closes_the_circuit(clock):
+    breaker = half_open_breaker(clock)
+
+    def handler(request):
+        return httpx.Response(200, json={"choices": [], "usage": {"prompt_tokens": 3}})
+
+    async def scenario():
+        client = async_client(breaker, handler)
+        payload = await client.chat(URL, {}, {})
+        await client.aclose()
+        return payload
+
+    assert asyncio.run(scenario())["usage"]["prompt_tokens"] == 3
+    assert breaker.state == "closed"
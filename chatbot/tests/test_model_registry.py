@@ -0,0 +1,75 @@
+"""Model registry (model_registry.py): loading, hot reload and failed-load throttling."""
+
+import os
+import pickle
+
+import pytest
+
+import model_registry
+from model_registry import ModelRegistry
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(model_registry.time, "monotonic", clock)
+    return clock
+
+
+def registry_for(tmp_path, check_interval=5.0):
+    return ModelRegistry(str(tmp_path / "model.pkl"), str(tmp_path / "task_freq.json"),
+                         str(tmp_path / "queue_bins.json"), check_interval=check_interval)
+
+
+def write_model(tmp_path, model):
+    with open(tmp_path / "model.pkl", "wb") as f:
+        pickle.dump(model, f)
+
+
+def test_failed_load_is_retried_once_per_interval(tmp_path, clock, monkeypatch):
+    registry = registry_for(tmp_path)
+    attempts = []
+    load_bundle = registry._load_bundle
+    monkeypatch.setattr(registry, "_load_bundle", lambda fp: attempts.append(fp) or load_bundle(fp))
+
+    assert registry.get() is None
+    assert registry.get() is None
+    assert len(attempts) == 1
+    assert "model.pkl" in registry.status()["last_error"]
+
+    # the file appears; the next attempt after check_interval picks it up
+    write_model(tmp_path, {"weights": [1, 2, 3]})
+    clock.now += 4.9
+    assert registry.get() is None
+    clock.now += 0.1
+    bundle = registry.get()
+    assert bundle is not None and bundle.model == {"weights": [1, 2, 3]}
+    assert len(attempts) == 2
+    assert registry.status()["last_error"] is None
+
+
+def test_changed_model_is_reloaded_after_interval(tmp_path, clock):
+    write_model(tmp_path, "v1")
+    registry = registry_for(tmp_path)
+    first = registry.get()
+    assert first.model == "v1"
+
+    write_model(tmp_path, "version two")
+    assert registry.get() is first
+    clock.now += 5
+    assert registry.get().model == "version two"
+    assert registry.status()["reload_count"] == 1
+
+
+def test_default_model_path_loads(chatbot_app):
+    # conftest leaves MODEL_PATH unset, so warm-up used the default
+    assert "MODEL_PATH" not in os.environ
+    assert chatbot_app.model_registry.status()["loaded"]
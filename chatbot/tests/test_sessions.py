@@ -0,0 +1,88 @@
+"""Session store (sessions.py): ownership and the stats counters."""
+
+import time
+
+import pytest
+
+from sessions import SessionStore
+
+VECTOR = [0.1, 0.2, 0.3, 0.4]
+
+
+@pytest.fixture
+def store(tmp_path, fake_embedder):
+    return SessionStore(path=str(tmp_path / "sessions.db"), recent_turns=2)
+
+
+def scanned(store):
+    """What the stats counters must agree with: a full scan of the table."""
+    return store._connect().execute(
+        "SELECT COUNT(*), COALESCE(SUM(LENGTH(summary) + LENGTH(turns) + LENGTH(vectors)), 0) "
+        "FROM sessions"
+    ).fetchone()
+
+
+def counted(store):
+    stats = store.stats()
+    return stats["active"], stats["approx_bytes"]
+
+
+def test_counters_follow_appends_and_deletes(store):
+    assert counted(store) == (0, 0)
+
+    store.append("session-a", "How do I get a passport?", "Apply online.", VECTOR, owner="alice")
+    store.append("session-b", "NIC fees?", "Rs. 100.", VECTOR, owner="bob")
+    assert counted(store) == scanned(store) and counted(store)[0] == 2
+
+    # replacing a row, folding turns into the summary, changes only its size
+    for i in range(4):
+        store.append("session-a", f"Follow-up question {i}?", "A longer answer. " * 5, VECTOR, owner="alice")
+    assert counted(store) == scanned(store) and counted(store)[0] == 2
+
+    assert not store.append("session-a", "hijack", "no", VECTOR, owner="mallory")
+    assert not store.delete("session-a", owner="mallory")
+    assert counted(store) == scanned(store)
+
+    assert store.delete("session-a", owner="alice")
+    assert counted(store) == scanned(store) and counted(store)[0] == 1
+
+
+def test_counters_follow_purge(store, monkeypatch):
+    store.max_sessions = 2
+    for i in range(3):
+        store.append(f"session-{i}", "question?", "answer.", VECTOR, owner="alice")
+    store.purge()
+    assert store.stats()["evicted"] == 1
+    assert counted(store) == scanned(store) and counted(store)[0] == 2
+
+    real_time = time.time
+    monkeypatch.setattr("sessions.time.time", lambda: real_time() + store.ttl + 1)
+    store.purge()
+    assert store.stats()["expired"] == 2
+    assert counted(store) == (0, 0)
+
+
+def test_expired_session_is_replaced_not_counted_twice(store, monkeypatch):
+    store.append("session-a", "question?", "answer.", VECTOR, owner="alice")
+    real_time = time.time
+    monkeypatch.setattr("sessions.time.time", lambda: real_time() + store.ttl + 1)
+    store.append("session-a", "new question?", "new answer.", VECTOR, owner="bob")
+    assert counted(store) == scanned(store) and counted(store)[0] == 1
+
+
+def test_counters_initialised_from_existing_rows(store, tmp_path):
+    store.append("session-a", "question?", "answer.", VECTOR, owner="alice")
+    store._connect().execute("DELETE FROM session_totals")
+    store._connect().commit()
+
+    reopened = SessionStore(path=str(tmp_path / "sessions.db"))
+    assert counted(reopened) == scanned(reopened) and counted(reopened)[0] == 1
+
+
+def test_stats_does_not_scan_sessions(store):
+    store.append("session-a", "question?", "answer.", VECTOR, owner="alice")
+    statements = []
+    store._connect().set_trace_callback(statements.append)
+    store.stats()
+    store._connect().set_trace_callback(None)
+    assert statements and not any("FROM sessions" in sql for sql in statements)
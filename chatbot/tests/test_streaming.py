@@ -0,0 +1,111 @@
+"""/chat/stream against scripts/fake_mistral.py, the local Mistral stand-in."""
+
+import os
+import sys
+import json
+import time
+import socket
+import subprocess
+
+import pytest
+import requests
+
+import chatbot_core
+from llm_client import CircuitBreaker, RetryPolicy
+
+FAKE_MISTRAL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "scripts", "fake_mistral.py")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def fake_mistral(chatbot_app, monkeypatch):
+    """Start fake_mistral.py with ``args`` and point MISTRAL_API_URL at it."""
+    servers = []
+
+    def start(*args):
+        port = free_port()
+        proc = subprocess.Popen([sys.executable, FAKE_MISTRAL, "--port", str(port), *args],
+                                stdout=subprocess.DEVNULL)
+        servers.append(proc)
+        base = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                requests.get(base + "/stats", timeout=1)
+                break
+            except requests.exceptions.ConnectionError:
+                if time.monotonic() > deadline or proc.poll() is not None:
+                    raise RuntimeError("fake_mistral.py did not start")
+                time.sleep(0.05)
+        monkeypatch.setattr(chatbot_core, "MISTRAL_API_URL", base + "/v1/chat/completions")
+        return base
+
+    # fail fast: no retries, and a fresh breaker so one test's failures
+    # don't open the circuit for the next
+    client = chatbot_core.llm_client
+    monkeypatch.setattr(client, "retry_policy", RetryPolicy(max_retries=0))
+    monkeypatch.setattr(client, "breaker", CircuitBreaker())
+    yield start
+    for proc in servers:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def events(body):
+    """Parse an SSE body into (event, payload) pairs; data-only events are "message"."""
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        event, data = "message", None
+        for line in block.splitlines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        parsed.append((event, data))
+    return parsed
+
+
+def stream(app, message):
+    client = app.app.test_client()
+    response = client.post("/chat/stream", json={"message": message})
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    return events(response.get_data(as_text=True))
+
+
+def test_tokens_arrive_before_done(chatbot_app, fake_mistral):
+    fake_mistral()
+    received = stream(chatbot_app, "How do I apply for a national identity card?")
+
+    kinds = [event for event, _ in received]
+    assert kinds[0] == "message" and kinds[-1] == "done"
+    assert set(kinds[:-1]) == {"message"}
+    answer = "".join(data["token"] for _, data in received[:-1])
+    assert answer.startswith("To apply for a National Identity Card")
+    assert received[-1][1]["sources_found"] > 0
+
+
+def test_upstream_error_sends_error_event(chatbot_app, fake_mistral):
+    fake_mistral("--error-rate", "1.0", "--error-status", "503")
+    received = stream(chatbot_app, "What documents does a passport application need?")
+
+    assert received == [("error", {"response": chatbot_app.CHAT_ERROR_MESSAGE,
+                                   "error": "Internal server error"})]
+
+
+def test_dropped_stream_sends_error_event_not_a_truncated_answer(chatbot_app, fake_mistral):
+    fake_mistral("--drop-after", "3")
+    question = "Where do I take the driving licence tests?"
+    received = stream(chatbot_app, question)
+
+    kinds = [event for event, _ in received]
+    assert kinds == ["message"] * 3 + ["error"]
+    # the partial answer was not cached as if it were complete
+    plan = chatbot_app.plan_chat(question)
+    assert not plan.cached
@@ -0,0 +1,236 @@
+import os
+import json
+import math
+import time
+from pathlib import Path
+
+import numpy as np
+
+from docstore import (
+    DOCSTORE_NAME, has_docstore, open_docstore, read_all, read_legacy, write_docstore,
+)
+
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+# JSON object overriding the defaults below, e.g. '{"M": 16, "efSearch": 32}'
+INDEX_PARAMS = json.loads(os.getenv("INDEX_PARAMS", "{}"))
+# Serve indexes memory-mapped so preforked workers share one page-cache copy
+INDEX_MMAP = os.getenv("INDEX_MMAP", "true").lower() == "true"
+
+MANIFEST_NAME = "manifest.json"
+ANN_INDEX_NAME = "ann.faiss"
+PARAMS_NAME = "index_params.json"
+
+# Build parameters go into the factory string; search parameters are
+# applied after loading. Values are clamped to what the corpus can train.
+DEFAULT_PARAMS = {
+    "flat": {},
+    "hnsw": {"M": 32, "efConstruction": 80, "efSearch": 64},
+    "ivf": {"nlist": 64, "nprobe": 8},
+    "ivfpq": {"nlist": 64, "m": 16, "nbits": 8, "nprobe": 8},
+    "pq": {"m": 48, "nbits": 8},
+    "sq8": {},
+    "fp16": {},
+}
+INDEX_TYPES = tuple(DEFAULT_PARAMS)
+SEARCH_PARAMS = ("efSearch", "nprobe")
+
+
+def _largest_divisor(d, limit):
+    return max(m for m in range(1, min(d, limit) + 1) if d % m == 0)
+
+
+def resolve_params(kind, ntotal, dim, overrides=None):
+    """Effective build/search parameters for ``kind`` on ``ntotal`` vectors."""
+    if kind not in DEFAULT_PARAMS:
+        raise ValueError(f"Unknown index type {kind!r}; expected one of {', '.join(INDEX_TYPES)}")
+    params = dict(DEFAULT_PARAMS[kind], **(overrides or {}))
+    if "nlist" in params:
+        # k-means wants ~39 training points per list
+        params["nlist"] = max(1, min(params["nlist"], ntotal // 39 or 1))
+        params["nprobe"] = min(params.get("nprobe", 1), params["nlist"])
+    if "m" in params:
+        params["m"] = _largest_divisor(dim, params["m"])
+    if "nbits" in params:
+        params["nbits"] = max(1, min(params["nbits"], int(math.log2(max(ntotal, 2)))))
+    return params
+
+
+def factory_string(kind, params):
+    return {
+        "flat": "Flat",
+        "hnsw": f"HNSW{params.get('M', 32)}",
+        "ivf": f"IVF{params.get('nlist')},Flat",
+        "ivfpq": f"IVF{params.get('nlist')},PQ{params.get('m')}x{params.get('nbits')}",
+        "pq": f"PQ{params.get('m')}x{params.get('nbits')}",
+        "sq8": "SQ8",
+        "fp16": "SQfp16",
+    }[kind]
+
+
+def apply_search_params(index, params):
+    """Set efSearch / nprobe on a loaded index."""
+    import faiss
+    values = ",".join(f"{k}={params[k]}" for k in SEARCH_PARAMS if k in params)
+    if values:
+        faiss.ParameterSpace().set_index_parameters(index, values)
+
+
+def build_index(vectors, kind, params):
+    """Train and fill a FAISS index of ``kind`` (L2, like the flat store)."""
+    import faiss
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = faiss.index_factory(vectors.shape[1], factory_string(kind, params), faiss.METRIC_L2)
+    if kind == "hnsw":
+        index.hnsw.efConstruction = params.get("efConstruction", 40)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    apply_search_params(index, params)
+    return index
+
+
+def flat_vectors(index):
+    """All vectors of an exact (flat) index, in id order."""
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def index_bytes(index):
+    import faiss
+    return int(faiss.serialize_index(index).nbytes)
+
+
+# -------------------------------------------------------------------
+# On-disk layout
+# -------------------------------------------------------------------
+# index.faiss / docstore.sqlite are the exact store the indexer updates
+# incrementally. For other types the served index is derived from it and
+# written to ann.faiss, with its parameters in index_params.json.
+#
+# Each build lives in its own build-* directory that is never modified;
+# manifest.json names the current one and is replaced atomically, so a
+# reader always gets an index and a docstore from the same build. Stores
+# written before builds were versioned keep their files in the top level.
+def store_dir(vector_dir):
+    """Directory holding the files of the build currently published in ``vector_dir``."""
+    try:
+        with open(Path(vector_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            build = json.load(f).get("build")
+    except (OSError, ValueError):
+        build = None
+    return Path(vector_dir, build) if build else Path(vector_dir)
+
+
+def read_params(vector_dir):
+    path = Path(vector_dir, PARAMS_NAME)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_ann_index(db, out_dir, kind=INDEX_TYPE, overrides=None):
+    """Build the ``kind`` index from the flat store ``db`` into ``out_dir``.
+
+    Returns ``(record, index)``; the record is also written to
+    ``index_params.json``. For ``flat`` nothing is written, ``index`` is
+    ``None`` and the store is served as is.
+    """
+    import faiss
+    if kind == "flat":
+        return {"type": "flat", "params": {}, "overrides": {}, "bytes": index_bytes(db.index)}, None
+
+    vectors = flat_vectors(db.index)
+    params = resolve_params(kind, len(vectors), vectors.shape[1], overrides)
+    start = time.perf_counter()
+    index = build_index(vectors, kind, params)
+    record = {
+        "type": kind,
+        "factory": factory_string(kind, params),
+        "params": params,
+        "overrides": overrides or {},
+        "dim": int(vectors.shape[1]),
+        "ntotal": int(index.ntotal),
+        "bytes": index_bytes(index),
+        "build_seconds": round(time.perf_counter() - start, 3),
+    }
+    faiss.write_index(index, str(Path(out_dir, ANN_INDEX_NAME)))
+    with open(Path(out_dir, PARAMS_NAME), "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    return record, index
+
+
+def with_index(db, index):
+    """A store sharing ``db``'s docstore and id map but searching ``index``."""
+    from langchain_community.vectorstores import FAISS
+    return FAISS(db.embedding_function, index, db.docstore, db.index_to_docstore_id)
+
+
+def read_index(path, mmap=INDEX_MMAP):
+    """Read a FAISS index for serving, memory-mapped and read-only if ``mmap``.
+
+    The indexer replaces files by rename, so a mapped index keeps its old
+    inode until the next reload. Falls back to a normal read for index types
+    this FAISS build cannot map.
+    """
+    import faiss
+    if mmap:
+        try:
+            return faiss.read_index(str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            print(f"[WARNING] Could not memory-map {path}, reading it instead: {e}")
+    return faiss.read_index(str(path))
+
+
+def read_ann_index(vector_dir):
+    """The derived index in ``vector_dir`` with search parameters applied, or ``None``."""
+    record = read_params(vector_dir)
+    path = Path(vector_dir, ANN_INDEX_NAME)
+    if not record or record.get("type") in (None, "flat") or not path.exists():
+        return None
+    index = read_index(path)
+    apply_search_params(index, record.get("params", {}))
+    return index
+
+
+def open_store(vector_dir, embeddings, exact=False):
+    """Open the store for serving, or ``None`` if it has no SQLite docstore yet.
+
+    Only the FAISS index is loaded (memory-mapped, see :func:`read_index`): the derived index if there is
+    one (unless ``exact``), else ``index.faiss``. Documents and the id map
+    stay in ``docstore.sqlite`` and are fetched per hit.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    vector_dir = store_dir(vector_dir)
+    if not has_docstore(vector_dir):
+        return None
+    # pin the docstore first; it must outlive any index file replaced after it
+    docstore, index_to_docstore_id = open_docstore(Path(vector_dir, DOCSTORE_NAME))
+    index = None if exact else read_ann_index(vector_dir)
+    if index is None:
+        index = read_index(Path(vector_dir, "index.faiss"))
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def load_mutable_store(vector_dir, embeddings):
+    """The exact store fully in memory, for the indexer to add to and delete from."""
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    vector_dir = store_dir(vector_dir)
+    index = faiss.read_index(str(Path(vector_dir, "index.faiss")))
+    if has_docstore(vector_dir):
+        docstore, index_to_docstore_id = read_all(Path(vector_dir, DOCSTORE_NAME))
+    else:
+        docstore, index_to_docstore_id = read_legacy(vector_dir)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def save_store(db, out_dir):
+    """Write ``index.faiss`` and ``docstore.sqlite`` (no pickle) into ``out_dir``."""
+    import faiss
+    faiss.write_index(db.index, str(Path(out_dir, "index.faiss")))
+    write_docstore(Path(out_dir, DOCSTORE_NAME), db.docstore, db.index_to_docstore_id)
@@ -23,6 +23,15 @@ interface Message {
   timestamp: Date;
 }
 
+// Identifies the conversation so the chatbot can answer follow-up questions.
+// Random (122 bits), so it cannot be guessed from another client's id.
+const newSessionId = () => {
+  if (typeof crypto.randomUUID === 'function') return crypto.randomUUID();
+  // randomUUID needs a secure context; plain-http dev servers fall back here
+  const bytes = crypto.getRandomValues(new Uint8Array(16));
+  return Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+};
+
 interface ChatBotProps {
   isMobile?: boolean;
 }
@@ -34,6 +43,7 @@ export const ChatBot = ({ isMobile = false }: ChatBotProps) => {
   const [inputText, setInputText] = useState('');
   const [isTyping, setIsTyping] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const sessionIdRef = useRef(newSessionId());
 
   // Initialize messages state
   const [messages, setMessages] = useState<Message[]>([{
@@ -45,6 +55,8 @@ export const ChatBot = ({ isMobile = false }: ChatBotProps) => {
 
   // Clear chat function
   const clearChat = () => {
+    axios.delete(`${CHATBOT_API_URL}/chat/session/${sessionIdRef.current}`).catch(() => {});
+    sessionIdRef.current = newSessionId();
     setMessages([{
       id: '1',
       text: 'Hello! I\'m your GovConnect assistant. How can I help you today?',
@@ -78,7 +90,8 @@ export const ChatBot = ({ isMobile = false }: ChatBotProps) => {
     try {
       // Call your Flask chatbot API
       const response = await axios.post(`${CHATBOT_API_URL}/chat`, {
-        message: inputText
+        message: inputText,
+        session_id: sessionIdRef.current
       });
 
       const botMessage: Message = {